@@ -13,11 +13,12 @@ if TYPE_CHECKING:
     from autogpt.memory.vector import VectorMemory
     from autogpt.models.command_registry import CommandRegistry
 
-from autogpt.json_utils.utilities import extract_dict_from_response, validate_dict
+from autogpt.json_utils.utilities import extract_dict_from_response, load_commands_interface, validate_dict
 from autogpt.llm.api_manager import ApiManager
 from autogpt.llm.base import Message
 from autogpt.llm.utils import count_string_tokens
 from autogpt.logs import logger
+from autogpt.logs.telemetry import get_telemetry
 from autogpt.logs.log_cycle import (
     CURRENT_CONTEXT_FILE_NAME,
     FULL_MESSAGE_HISTORY_FILE_NAME,
@@ -148,16 +149,17 @@ class Agent(BaseAgent):
                 if not plugin.can_handle_pre_command():
                     continue
                 command_name, arguments = plugin.pre_command(command_name, command_args)
-            command_result = execute_command(
-                command_name=command_name,
-                arguments=command_args,
-                agent=self,
-            )
+            with get_telemetry().span("command", str(command_name)):
+                command_result = execute_command(
+                    command_name=command_name,
+                    arguments=command_args,
+                    agent=self,
+                )
             if len(str(command_result)) < 4000:
                 result = f"Command {command_name} returned: " f"{command_result}"
             else:
                 result = f"Command {command_name} returned a lengthy response, we truncated it to the first 4000 characters: " f"{str(command_result)[:4000]}"
-            result_tlength = count_string_tokens(str(command_result), self.llm.name)
+            result_tlength = count_string_tokens(result, self.llm.name)
             memory_tlength = count_string_tokens(
                 str(self.history.summary_message()), self.llm.name
             )
@@ -184,11 +186,7 @@ class Agent(BaseAgent):
         if not llm_response.content:
             raise SyntaxError("Assistant response has no text content")
         
-        #with open("experimental_setups/experiments_list.txt") as eht:
-        #    exps = eht.read().splitlines()
-
-        exps = self.exps
-        response_dir = pathlib.Path(os.path.join("experimental_setups", exps[-1], "responses"))
+        response_dir = self.experiment_dir / "responses"
         response_dir.mkdir(parents=True, exist_ok=True)
         with open(os.path.join(response_dir, "model_responses_{}_{}".format(self.project_name, self.bug_index)), "a+") as patf:
             patf.write(llm_response.content)
@@ -198,8 +196,7 @@ class Agent(BaseAgent):
             assistant_reply_dict["command"] = {"name": "missing_command", "args":{}}
         command_dict = assistant_reply_dict["command"]
 
-        with open("commands_interface.json") as cif:
-            commands_interface = json.load(cif)
+        commands_interface = load_commands_interface()
 
         if command_dict.get("name", "") in list(commands_interface.keys()):
             ref_args = commands_interface[command_dict["name"]]
@@ -228,6 +225,12 @@ class Agent(BaseAgent):
                     "try_fixes", 
                     "read_range", 
                     "search_code_base", 
+                    "search_code_text",
+                    "semantic_code_search",
+                    "find_definition",
+                    "find_references",
+                    "type_hierarchy",
+                    "compile_diagnostics",
                     "get_classes_and_methods",
                     "extract_similar_functions_calls",
                     "extract_method_code",
@@ -240,6 +243,7 @@ class Agent(BaseAgent):
                 assistant_reply_dict["command"] = {"name": "unknown_command", "args":{}}
             
             if assistant_reply_dict["command"]["name"] == "write_fix":
+                mutants_start = time.perf_counter()
                 try:
                     fix_content = assistant_reply_dict["command"]["args"].get("changes_dicts", "[]")
                 except Exception as e:
@@ -251,17 +255,13 @@ class Agent(BaseAgent):
                 # create mutation prompt
                 mutant_prompt = self.construct_mutation_prompt(fix_content, detailed_buggies)
                 # save mutation prompt
-                mutation_dir = pathlib.Path(os.path.join("experimental_setups", exps[-1], "mutations_history"))
+                mutation_dir = self.experiment_dir / "mutations_history"
                 mutation_dir.mkdir(parents=True, exist_ok=True)
                 with open(os.path.join(mutation_dir, "mutations_prompt_{}_{}".format(self.project_name, self.bug_index)), "a") as mph:
                     mph.write(mutant_prompt)
                 
                 # Asking main agent for mutants
                 mutants = query_for_mutants(mutant_prompt)
-                #with open("experimental_setups/experiments_list.txt") as eht:
-                #    exps = eht.read().splitlines()
-                
-                exps = self.exps
                 existing_mutants = []
                 mutants_save_path = os.path.join(mutation_dir, "mutants_{}_{}.json".format(self.project_name, self.bug_index))
                 
@@ -290,12 +290,14 @@ class Agent(BaseAgent):
                             if " 0 failing test" in exec_result:
                                 logger.info("PLAUSIBLE PATCH FOUND. REASON = 0 FAILING TESTS.\n\n")
                                 ## writing the plausible patch
-                                plausible_patch_dir = pathlib.Path(os.path.join("experimental_setups", exps[-1], "plausible_patches"))
+                                plausible_patch_dir = self.experiment_dir / "plausible_patches"
                                 plausible_patch_dir.mkdir(parents=True, exist_ok=True)
                                 with open(os.path.join(plausible_patch_dir, "plausible_patches_{}_{}.json".format(self.project_name, self.bug_index)), "a+") as exps:
                                     exps.write("### PLAUSIBLE FIX\n{}\n".format(str(m)))
                 except Exception as e:
                     logger.info("Error in loading the mutants response: " + str(e) + "\n\n")
+                # Generating and validating the mutants, LLM call and test runs included
+                get_telemetry().record("mutants", "mutants", time.perf_counter() - mutants_start)
 
         valid, errors = validate_dict(assistant_reply_dict, self.config)
         
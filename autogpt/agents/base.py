@@ -13,18 +13,34 @@ if TYPE_CHECKING:
     from autogpt.models.command_registry import CommandRegistry
 
 from autogpt.llm.base import ChatModelResponse, ChatSequence, Message
+from autogpt.llm.client import get_llm_client
 from autogpt.llm.providers.openai import OPEN_AI_CHAT_MODELS, get_openai_command_specs
-from autogpt.llm.utils import count_message_tokens, create_chat_completion
+from autogpt.llm.utils import count_message_tokens, count_string_tokens, create_chat_completion
 from autogpt.logs import logger
+from autogpt.logs.telemetry import get_telemetry, telemetry_path
 from autogpt.memory.message_history import MessageHistory
+from autogpt.agents.context_packer import ContextPacker, ContextSection
+from autogpt.agents.context_store import ContextStore
+from autogpt.agents.read_ranges import resolve_source_file
+from autogpt.config.resources import get_resources
 from autogpt.prompts.prompt import DEFAULT_TRIGGERING_PROMPT
-from autogpt.json_utils.utilities import extract_dict_from_response
+from autogpt.json_utils.utilities import extract_dict_from_response, validate_command_args
+from autogpt.commands.failing_test_index import build_test_index
 from autogpt.commands.defects4j_static import get_info, run_tests, query_for_fix, query_for_commands, extract_command, execute_command, create_fix_template
 
 CommandName = str
 CommandArgs = dict[str, str]
 AgentThoughts = dict[str, Any]
 
+CONTEXT_PROMPT_INTRO = (
+    "What follows are sections of the most important information you gathered so far about the current bug."
+    "        Use the following info to suggest a fix for the buggy code:\n"
+)
+CONTEXT_PROMPT_END = "\n" + "**Important:** This is the end of information sections. After this, you will see the last command you executed (if you executed any so far) and the result of its execution. Continue your reasoning from there.\n"
+
+LOGGED_SECTIONS = ("extracted methods", "suggested fixes", "search queries", "similar calls")
+"""Context sections that only ever grow, sent as an append-only log in the prefix-stable layout"""
+
 class BaseAgent(metaclass=ABCMeta):
     """Base class for all Auto-GPT agents."""
 
@@ -76,11 +92,7 @@ class BaseAgent(metaclass=ABCMeta):
         self.cycle_count = 0
         """The number of cycles that the agent has run since its initialization."""
         
-        with open("commands_by_state.json") as cbs:
-            self.cmds_by_state = json.load(cbs)
-
-        with open("states_description.json") as sdj:
-            self.descriptions = json.load(sdj)
+        resources = get_resources()
 
         self.current_state = "collect information to understand the bug"
         self.prompt_dictionary = ai_config.construct_full_prompt(config)
@@ -96,8 +108,23 @@ class BaseAgent(metaclass=ABCMeta):
             self.project_name, self.bug_index= in_between.replace("bug within the project ", "").replace(' and bug index ', " ").replace('"', "").split(" ")[:2]
         except:
             print("PG:", self.prompt_dictionary["goals"][2])
+        get_telemetry().open(
+            telemetry_path(resources.experiment_dir, self.project_name, self.bug_index),
+            project=self.project_name,
+            bug=self.bug_index,
+            cycle=0,
+        )
         self.localization_info = get_info(self.project_name, self.bug_index,"auto_gpt_workspace")
         self.tests_results = run_tests(self.project_name, self.bug_index, "auto_gpt_workspace")
+        try:
+            self.failing_test_index = build_test_index(
+                "auto_gpt_workspace",
+                "{}_{}_buggy".format(self.project_name.lower(), self.bug_index),
+                self.tests_results,
+            )
+        except OSError as e:
+            logger.warn("Could not index the failing tests: {}".format(e))
+            self.failing_test_index = None
         """
         The system prompt sets up the AI's personality and explains its goals,
         available resources, and restrictions.
@@ -118,6 +145,15 @@ class BaseAgent(metaclass=ABCMeta):
             max_summary_tlength=summary_max_tlength or self.send_token_limit // 6,
         )
 
+        self.context_store = ContextStore()
+        """The context sections of the prompt, updated from the history once per message."""
+        self.context_packer = ContextPacker(lambda text: count_string_tokens(text, self.llm.name))
+        """Fits the context sections into the token budget left by the rest of the prompt."""
+        self.context_log: list[Message] = []
+        """In the prefix-stable layout, the append-only messages holding the logged sections."""
+        self.logged_entries: dict[str, int] = {}
+        """The number of entries of each logged section already in the context log."""
+
         # These are new attributes used to construct the prompt
         """
         {
@@ -176,8 +212,7 @@ class BaseAgent(metaclass=ABCMeta):
         self.buggy_lines = ""
         self.similar_calls = None
 
-        with open(experiment_file) as hper:
-            self.hyperparams = json.load(hper)
+        self.hyperparams = resources.load_json(experiment_file)
 
         self.extracted_methods = []
 
@@ -190,8 +225,19 @@ class BaseAgent(metaclass=ABCMeta):
         self.auto_complete = True
         self. generated_methods= None
         self.dummy_fix = False
-        with open("experimental_setups/experiments_list.txt") as eht:
-            self.exps = eht.read().splitlines()
+
+    # Read from the resource bundle at every use, so that edits are picked up
+    @property
+    def cmds_by_state(self) -> dict[str, Any]:
+        return get_resources().commands_by_state
+
+    @property
+    def descriptions(self) -> dict[str, str]:
+        return get_resources().states_description
+
+    @property
+    def experiment_dir(self) -> pathlib.Path:
+        return get_resources().experiment_dir
 
     def save_context(self,):
         return
@@ -223,10 +269,7 @@ class BaseAgent(metaclass=ABCMeta):
             "history": [{"role": msg.role, "content": msg.content} for _, msg in enumerate(self.history)]
         }
 
-        #with open("experimental_setups/experiments_list.txt") as eht:
-        exps =self.exps
-
-        with open(os.path.join("experimental_setups", exps[-1], "saved_contexts", "saved_context_{}_{}".format(self.project_name, self.bug_index)), "w") as patf:
+        with open(os.path.join(self.experiment_dir, "saved_contexts", "saved_context_{}_{}".format(self.project_name, self.bug_index)), "w") as patf:
             json.dump(context, patf)
         
 
@@ -289,10 +332,7 @@ please use the indicated format and produce a list, like this:
                 self.pre_similar += "Search query {} found the following similar functions calls:\n{}\n\n".format(str(args), exec_result)
 
     def load_context(self,):
-        #with open("experimental_setups/experiments_list.txt") as eht:
-        #    exps = eht.read().splitlines()
-        exps = self.exps
-        with open(os.path.join("experimental_setups", exps[-1], "saved_contexts", "saved_context_{}_{}".format(self.project_name, self.bug_index)), "r") as patf:
+        with open(os.path.join(self.experiment_dir, "saved_contexts", "saved_context_{}_{}".format(self.project_name, self.bug_index)), "r") as patf:
             context = json.load(patf)
 
         self.cycle_budget = context["cycle_budget"]
@@ -338,29 +378,14 @@ please use the indicated format and produce a list, like this:
         return context_prompt
 
     def validate_command_parsing(self, command_dict):
-        with open("commands_interface.json") as cif:
-            commands_interface = json.load(cif)
-
-        command_dict = command_dict.get("command", {"name": "", "args": {}})
-        if command_dict["name"] in list(commands_interface.keys()):
-            ref_args = commands_interface[command_dict["name"]]
-            if isinstance(command_dict["args"], dict):
-                command_args = list(command_dict["args"].keys())
-                if set(command_args) == set(ref_args):
-                    return True
-                else:
-                    return False
-            else:
-                return False
-        else:
-            return False
+        return validate_command_args(command_dict)
         
     def detect_command_repetition(self, ref_cmd):
         #with open("assistant_output_from_command_repetition.json", "w") as aocr:
         #    json.dump(assistant_outputs+[str(ref_cmd["command"])], aocr)
         try:
-            assistant_outputs = [str(extract_dict_from_response(msg.content)["command"]) for msg in self.history if msg.role == "assistant"]
-            if str(ref_cmd["command"]) in assistant_outputs:
+            self.context_store.sync(self.history)
+            if str(ref_cmd["command"]) in self.context_store.issued_commands:
                 logger.info("WARNING: REPETITION DETECTED!\n\n")
                 return True
             else:
@@ -381,297 +406,34 @@ please use the indicated format and produce a list, like this:
         else:
             raise ValueError("The value given to the param handling_strategy is unsuported: {}".format(handling_strategy))
         
-    def construct_read_files(self, command_name = "read_range"):
-        skip_next = False
-        read_files = {}
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        read_result = None
-        # check command dict
-        for i in range(len(messages_history)):
-            if skip_next:
-                skip_next = False
-                continue
-            skip_next = False
-            msg = messages_history[i]
-            if msg.role == "assistant":
-                command_dict = extract_dict_from_response(msg.content)
-                if not self.validate_command_parsing(command_dict):
-                    continue
-                if command_dict["command"]["name"] == command_name:
-                    lines_range=(
-                        command_dict["command"]["args"]["startline"],
-                        command_dict["command"]["args"]["endline"])
-                    file_path = command_dict["command"]["args"]["filepath"]
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        read_result = next_msg.content
-                        skip_next= True
-                    if read_result:
-                        if file_path in read_files:
-                            read_files[file_path][lines_range] = read_result
-                        else:
-                            read_files[file_path] = {
-                                lines_range: read_result
-                            }
-                    else:
-                        skip_next = False
-                else:
-                    skip_next = False
-        self.read_files = read_files
-
-    def construct_generated_methods(self, command_name = "AI_generate_method_code"):
-        skip_next = False
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        gen_result = None
-        # check command dict
-        for i in range(len(messages_history)):
-            if skip_next:
-                skip_next = False
-                continue
-            skip_next = False
-            msg = messages_history[i]
-            if msg.role == "assistant":
-                command_dict = extract_dict_from_response(msg.content)
-                if not self.validate_command_parsing(command_dict):
-                    continue
-                if command_dict["command"]["name"] == command_name:
-                    method_name = command_dict["command"]["args"]["method_name"]
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        gen_result = next_msg.content
-                        skip_next= True
-                    if gen_result:
-                        self.generated_methods = (method_name, gen_result)
-                    else:
-                        skip_next = False
-                else:
-                    skip_next = False
-
-    def construct_commands_history(self):
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        commands_history = []
-        for i in range(len(messages_history)):
-            msg = messages_history[i]
-            if msg.role == "assistant" and not msg.content.startswith("## As RepairAgentv0.5.0, this is the last command I have called in response to the users' input"):
-                command_dict = extract_dict_from_response(msg.content)
-                try:
-                    commands_history.append(command_dict["command"]["name"] + " , Your reasoning for calling this command was: '{}'".format(
-                            command_dict["thoughts"]
-                        )
-                    )
-                except:
-                    pass
-        self.commands_history = commands_history
-
-    def construct_suggested_fixes(self, command_names = ["write_range", "write_fix", "try_fixes"]):
-        skip_next = False
-        suggested_fixes = []
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        for i in range(len(messages_history)):
-            if skip_next:
-                continue
-            skip_next = False
-            msg = messages_history[i]
-            if msg.role == "assistant":
-                command_dict = extract_dict_from_response(msg.content)
-                if not self.validate_command_parsing(command_dict):
-                    continue
-                if command_dict["command"]["name"] in command_names:
-                    if command_dict["command"]["name"] in ["write_range", "write_fix"]:
-                        changes_dicts = command_dict["command"]["args"].get("changes_dicts", [])
-                        suggested_fixes.append(changes_dicts)
-                    else:
-                        for f in command_dict["command"]["args"]["fixes_list"]:
-                            changes_dicts = f["changes_dicts"]
-                            suggested_fixes.append(changes_dicts)
-
-        self.suggested_fixes = suggested_fixes
- 
-    def construct_human_feedback(self):
-        human_feedback = []
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        for i in range(len(messages_history)):
-            msg = messages_history[i]
-            if msg.role == "system":
-                if msg.content.startswith("Human feedback"):
-                    human_feedback.append(msg.content)
-        self.human_feedback = human_feedback
+    def update_context_sections(self):
+        """Fold the messages added to the history since the last cycle into the context sections"""
+        self.context_store.sync(self.history)
+        self.context_store.refresh_read_files(self.resolve_read_file)
+        store = self.context_store
+        self.read_files = store.read_files
+        self.suggested_fixes = store.suggested_fixes
+        self.search_queries = store.search_queries
+        self.bug_report = store.bug_report()
+        self.commands_history = store.commands_history
+        self.human_feedback = store.human_feedback
+        self.hypothesises = store.hypothesises
+        self.similar_calls = store.similar_calls
+        self.extracted_methods = store.extracted_methods
+        self.generated_methods = store.generated_methods
+
+    def resolve_read_file(self, filepath):
+        """The file of the buggy checkout that read_range read for filepath, if it can be found"""
+        if self.config.workspace_path is None:
+            return None
+        project_dir = os.path.join(
+            self.config.workspace_path, "{}_{}_buggy".format(self.project_name.lower(), self.bug_index))
+        return resolve_source_file(project_dir, filepath)
 
     def construct_unknown_commands(self,):
-        skip_next = False
-        unknown_commands = []
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        for i in range(len(messages_history)):
-            if skip_next:
-                continue
-            skip_next = False
-            msg = messages_history[i]
-            if msg.role == "assistant" and not msg.content.startswith("## As RepairAgentv0.5.0, this is the last command I have called in response to the users' input"):
-                try:
-                    command_dict = extract_dict_from_response(msg.content)
-                    command_name = command_dict["command"]["name"]
-                    
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        if next_msg.role == "user":
-                            if "unknown command. Do not try to use this command again." in next_msg.content:
-                                if command_name not in unknown_commands:
-                                    unknown_commands.append(command_name)
-                except:
-                    pass
-        return unknown_commands
-    
-    def construct_search_queries(self, command_name="search_code_base"):
-        skip_next = False
-        search_queries = []
-        search_result = None
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        for i in range(len(messages_history)):
-            if skip_next:
-                skip_next = False
-                continue
-            skip_next = False
-            msg = messages_history[i]
-            if msg.role == "assistant" and not msg.content.startswith("## As RepairAgentv0.5.0, this is the last command I have called in response to the users' input"):
-                command_dict = extract_dict_from_response(msg.content)
-                if not self.validate_command_parsing(command_dict):
-                    continue
-                if command_dict["command"]["name"] == command_name:
-                    key_words = command_dict["command"]["args"]["key_words"]
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        search_result = next_msg.content
-                        skip_next= True
-                    if search_result:
-                        search_queries.append({
-                            "query": key_words,
-                            "result": search_result
-                        })
-        self.search_queries = search_queries
-
-    def construct_similar_calls(self, command_name="extract_similar_functions_calls"):
-        skip_next = False
-        search_queries = []
-        search_result = None
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        for i in range(len(messages_history)):
-            if skip_next:
-                skip_next = False
-                continue
-            skip_next = False
-            msg = messages_history[i]
-            if msg.role == "assistant" :
-                command_dict = extract_dict_from_response(msg.content)
-                if not self.validate_command_parsing(command_dict):
-                    continue
-                if command_dict["command"]["name"] == command_name:
-                    code_snippet = command_dict["command"]["args"]["code_snippet"]
-                    file_path = command_dict["command"]["args"]["file_path"]
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        search_result = next_msg.content
-                        skip_next= True
-                    if search_result:
-                        search_queries.append({
-                            "code_snippet": code_snippet,
-                            "file_path": file_path,
-                            "result": search_result
-                        })
-        self.similar_calls = search_queries
-
-    def construct_extracted_methods(self, command_name="extract_method_code"):
-        skip_next = False
-        search_queries = []
-        search_result = None
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        for i in range(len(messages_history)):
-            if skip_next:
-                skip_next = False
-                continue
-            skip_next = False
-            msg = messages_history[i]
-            if msg.role == "assistant" :
-                command_dict = extract_dict_from_response(msg.content)
-                if not self.validate_command_parsing(command_dict):
-                    continue
-                if command_dict["command"]["name"] == command_name:
-                    method_name = command_dict["command"]["args"]["method_name"]
-                    file_path = command_dict["command"]["args"]["filepath"]
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        search_result = next_msg.content
-                        skip_next= True
-                    if search_result:
-                        search_queries.append({
-                            "method_name": method_name,
-                            "file_path": file_path,
-                            "result": search_result
-                        })
-        self.extracted_methods = search_queries
-
-    def construct_bug_report(self):
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        """
-        for i in range(len(messages_history)):
-            msg = messages_history[i]
-            if msg.role == "assistant" and not msg.content.startswith("## As RepairAgentv0.5.0, this is the last command I have called in response to the users' input"):
-                command_dict = extract_dict_from_response(msg.content)
-                if command_dict["command"]["name"] == "get_info":
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        get_info = next_msg.content
-                        self.prompt_dictionary["commands"][2].replace("2. get_info: Gets info about a specific bug in a specific project, params: (name: string, index: integer). This command can only be executed once\n", "")
-                        break
-        """
-        """
-        for i in range(len(messages_history)):
-            msg = messages_history[i]
-            if msg.role == "assistant" and not msg.content.startswith("## As RepairAgentv0.5.0, this is the last command I have called in response to the users' input"):
-                command_dict = extract_dict_from_response(msg.content)
-                if command_dict["command"]["name"] == "run_tests":
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        run_tests = next_msg.content
-                        self.prompt_dictionary["commands"][2].replace("3. run_tests: Runs the test cases of the project being analyzed, params: (name: string, index: integer). This command can only be executed once.\n", "")
-                        break
-        """
-        failing_test_code = ""
-        for i in range(len(messages_history)):
-            msg = messages_history[i]    
-            if msg.role == "assistant" and not msg.content.startswith("## As RepairAgentv0.5.0, this is the last command I have called in response to the users' input"):
-                command_dict = extract_dict_from_response(msg.content)
-                if not self.validate_command_parsing(command_dict):
-                    continue
-                if command_dict["command"]["name"] == "extract_test_code":
-                    if i < len(messages_history) - 1:
-                        j = i + 1
-                        next_msg = messages_history[j]
-                        failing_test_code += "Extracting test code from file {} returned: ".format(command_dict["command"]["args"]["test_file_path"]) + next_msg.content + "\n"
-
-        if get_info or run_tests or failing_test_code:
-            self.bug_report = {"get_info": "No longer needed for this version", "run_tests": "No longer needed for this version", "failing_test_code": failing_test_code}
-
-
-    def construct_hypothesises(self,):
-        self.hypothesises = []
-        messages_history = [msg for _, msg in enumerate(self.history)]
-        for i in range(len(messages_history)):
-            msg = messages_history[i]
-            if msg.role == "assistant" and not msg.content.startswith("## As RepairAgentv0.5.0, this is the last command I have called in response to the users' input"):
-                command_dict = extract_dict_from_response(msg.content)
-                if not self.validate_command_parsing(command_dict):
-                    continue
-                if command_dict["command"]["name"] == "express_hypothesis":
-                    self.hypothesises.append(command_dict["command"]["args"]["hypothesis"])
-    
+        self.context_store.sync(self.history)
+        return list(self.context_store.unknown_commands)
+
     def update_prompt_state(self, state_name):
         """
         Given a state name, this function would update the prompt dictionary to include the right description of the state 
@@ -794,28 +556,105 @@ please use the indicated format and produce a list, like this:
         generated_methods += "No AI generated code yet.\n"
         return generated_methods
     
-    def construct_context_prompt(self,):
-        
-        context_prompt = "What follows are sections of the most important information you gathered so far about the current bug.\
-        Use the following info to suggest a fix for the buggy code:\n"
-        
-        hypothesis_string = self.construct_hypothesises_context()
-        read_files_section = self.construct_read_files_context()
-        suggested_fixes_section = self.construct_fixes_context()
-        search_queries = self.construct_search_context()
+    def construct_context_sections(self,):
+        """The information sections of the context prompt, with their eviction priorities"""
+        hypothesises = ["- (Refuted) " + h + "\n" for h in self.hypothesises[:-1]]
+        if self.hypothesises:
+            hypothesises.append("- (Current hypothesis) " + self.hypothesises[-1] + "\n")
         bug_report = self.construct_bug_report_context()
-        commands_history = self.construct_commands_history_context()
-        similar_calls_context = self.construct_similar_calls_context()
-        extracted_methods_context = self.construct_extracted_methods_context()
-        generated_methods = self.construct_generated_methods_context()
+        bug_report_header = "## Info about the bug (bug report summary):\n"
+        unknown_commands = self.construct_unknown_commands()
+
+        return [
+            ContextSection("bug report", bug_report_header, [bug_report[len(bug_report_header):]], priority=100),
+            ContextSection("hypothesis", "## Hypothesis about the bug:\n", hypothesises, priority=90,
+                empty_text="No hypothesis made yet.\n", max_share=0.1),
+            ContextSection("read files", "## Read lines:\n",
+                ["Lines {} to {} from file: {}\n{}\n\n".format(r[0], r[1], f, self.read_files[f][r])
+                 for f in self.read_files for r in self.read_files[f]],
+                priority=80, empty_text="No files have been read so far.\n", max_share=0.4),
+            ContextSection("generated methods", self.construct_generated_methods_context(), [], priority=20),
+            ContextSection("extracted methods", "## The list of emplementations of some methods in the code base:\n",
+                [s["result"] + "\n" for s in self.extracted_methods],
+                priority=60, empty_text="No extracted methods so far.\n", max_share=0.25),
+            ContextSection("suggested fixes",
+                "## Suggested fixes:\n"+"This is the list of suggested fixes so far but none of them worked:\n",
+                ["###Fix:\n{}\n\n".format(str(f)) for f in self.suggested_fixes],
+                priority=70, empty_text="No fixes were suggested yet.\n", max_share=0.2),
+            ContextSection("search queries", "## Executed search queries within the code base:\n",
+                ["Searching keywords: {}, returned the following results:\n{}\n\n".format(s["query"], s["result"])
+                 for s in self.search_queries],
+                priority=40, empty_text="No search queries executed so far.\n", max_share=0.2),
+            ContextSection("similar calls", "## Functions calls extracted based on snippets of code and target files:\n",
+                ["Code snippet: {}\ntarget file: {}\nsimilar functions calls that were found:\n{}\n\n".format(
+                    s["code_snippet"], s["file_path"], s["result"]) for s in self.similar_calls or []],
+                priority=50, empty_text="No similar functions  calls were extracted.\n", max_share=0.2),
+            ContextSection("unknown commands",
+                "## DO NOT TRY TO USE THE FOLLOWING COMMANDS IN YOUR NEXT ACTION (NEVER AT ALL):\n",
+                ["\n".join(unknown_commands)] if unknown_commands else [], priority=95),
+        ]
+
+    def construct_context_prompt(self, token_budget: Optional[int] = None):
+        """Render the context sections, packed into token_budget tokens if one is given"""
+        context_prompt = CONTEXT_PROMPT_INTRO
+        end_of_sections = CONTEXT_PROMPT_END
 
-        unknow_cmd = "## DO NOT TRY TO USE THE FOLLOWING COMMANDS IN YOUR NEXT ACTION (NEVER AT ALL):\n" + "\n".join(self.construct_unknown_commands())
+        sections = self.construct_context_sections()
+        if token_budget is None:
+            sections_text = "\n".join(section.render() for section in sections)
+        else:
+            token_budget -= self.context_packer.tokens(context_prompt + end_of_sections)
+            sections_text = self.context_packer.pack(sections, max(token_budget, 0))
+            omitted = {s.name: s.omitted for s in sections if s.omitted}
+            if omitted:
+                logger.debug("Context sections packed into {} tokens, left out: {}".format(token_budget, omitted))
 
-        context_prompt += bug_report + "\n" + hypothesis_string + "\n" + read_files_section + "\n" + generated_methods +"\n"+ extracted_methods_context + "\n" + suggested_fixes_section + "\n" + search_queries + "\n" +\
-            similar_calls_context + "\n" + unknow_cmd + \
-            "\n" + "**Important:** This is the end of information sections. After this, you will see the last command you executed (if you executed any so far) and the result of its execution. Continue your reasoning from there.\n"
+        return context_prompt + sections_text + end_of_sections
 
-        return context_prompt
+    def use_prefix_stable_layout(self) -> bool:
+        return self.hyperparams.get("prompt_layout", "default") == "prefix_stable"
+
+    def construct_prefix_stable_messages(self, definitions_prompt: str, cycle_instruction: str, token_budget: int) -> list[Message]:
+        """The user messages of the prompt in the prefix-stable layout
+
+        The definitions and the bug report come first, followed by one message per cycle
+        holding the entries that the append-only sections gained since the previous cycle,
+        so that everything sent in earlier cycles stays a byte-identical prefix of the
+        prompt. The sections that are rewritten in place (hypotheses, read lines, ...) and
+        the cycle instruction come last.
+        """
+        sections = {section.name: section for section in self.construct_context_sections()}
+        leading = definitions_prompt + "\n" + CONTEXT_PROMPT_INTRO + sections["bug report"].render()
+
+        new_entries = []
+        for name in LOGGED_SECTIONS:
+            section = sections[name]
+            logged = self.logged_entries.get(name, 0)
+            if len(section.entries) > logged:
+                new_entries.append(section.header + "".join(section.entries[logged:]))
+                self.logged_entries[name] = len(section.entries)
+        if new_entries:
+            self.context_log.append(Message("user", "\n".join(new_entries)))
+
+        token_budget -= self.context_packer.tokens(leading) + self.context_packer.tokens(cycle_instruction)
+        token_budget -= self.context_packer.tokens(CONTEXT_PROMPT_END)
+        log_tokens = sum(self.context_packer.tokens(message.content) for message in self.context_log)
+        if log_tokens > token_budget // 2:
+            # Compact the log into one packed message: this breaks the cached prefix once
+            # instead of letting the log crowd out the rest of the context. Packing well
+            # below the trigger leaves room for the log to grow again for several cycles
+            logged_sections = [sections[name] for name in LOGGED_SECTIONS]
+            self.context_log = [Message("user", self.context_packer.pack(logged_sections, max(token_budget // 4, 0)))]
+            log_tokens = self.context_packer.tokens(self.context_log[0].content)
+            logger.debug("Compacted the context log into {} tokens".format(log_tokens))
+
+        tail_sections = [s for name, s in sections.items() if name not in LOGGED_SECTIONS and name != "bug report"]
+        tail = self.context_packer.pack(tail_sections, max(token_budget - log_tokens, 0))
+        return (
+            [Message("user", leading)]
+            + self.context_log
+            + [Message("user", tail + CONTEXT_PROMPT_END + "\n\n" + cycle_instruction)]
+        )
 
     def construct_mutation_prompt(self, last_patch, detailed_buggies):
         hypothesis_string = self.construct_hypothesises_context()
@@ -852,8 +691,7 @@ please use the indicated format and produce a list, like this:
         context_prompt += "\n".join(info_sections)
         context_prompt += "\n" + "\n".join(self.prompt_dictionary["fix format"])
         #context_prompt += "\n" + "For reference, here is a patch that you can start mutating from (if not available create your own):\n" + str(last_patch) +"\n\n"
-        with open("hints.txt") as htt:
-            hints = htt.read()
+        hints = get_resources().hints
 
         list_example = '[{"file_name": "org/apache/commons/codec/binary/Base64.java", "insertions": [], "deletions": [], "modifications": [{"line_number": 225, "modified_line": "        this(true);"}]}, {"file_name": "org/apache/commons/codec/binary/Base64.java", "insertions": [], "deletions": [], "modifications": [{"line_number": 225, "modified_line": "        this(null);"}]}, {"file_name": "org/apache/commons/codec/binary/Base64.java", "insertions": [], "deletions": [], "modifications": [{"line_number": 225, "modified_line": "        this(1==0);"}]}, {"file_name": "org/apache/commons/codec/binary/Base64.java", "insertions": [], "deletions": [], "modifications": [{"line_number": 225, "modified_line": "        this(1 - 2);"}]}, ...]'
         context_prompt += "Here are some hints that might help you in suggesting good mutations:\n" + hints + "\n\n"
@@ -937,11 +775,7 @@ please use the indicated format and produce a list, like this:
         in_between = prompt_text[start_i:end_i]
         project_name, bug_index= in_between.replace("bug within the project ", "").replace(' and bug index ', " ").replace('"', "").split(" ")[:2]
         
-        #with open("experimental_setups/experiments_list.txt") as eht:
-        #    exps = eht.read().splitlines()
-
-        exps = self.exps
-        log_dir = pathlib.Path("experimental_setups", exps[-1], "logs")
+        log_dir = self.experiment_dir / "logs"
         log_dir.mkdir(parents=True, exist_ok=True)
         with open(os.path.join(log_dir, "prompt_history_{}_{}".format(project_name, bug_index)), "a+") as patf:
             patf.write(prompt.dump())
@@ -949,11 +783,12 @@ please use the indicated format and produce a list, like this:
         # handle querying strategy
         # For now, we do not evaluate the external query
         # we just want to observe how good is it
+        # The external query runs alongside the agent's own completion
+        external_fixes = None
         if self.hyperparams["external_fix_strategy"] != 0:
             if self.cycle_count % self.hyperparams["external_fix_strategy"] == 0:
                 query = self.construct_fix_query()
-                suggested_fixes = query_for_fix(query, )
-                self.save_to_json(os.path.join("experimental_setups", exps[-1], "external_fixes", "external_fixes_{}_{}.json".format(project_name, bug_index)), json.loads(suggested_fixes))
+                external_fixes = get_llm_client().submit(query_for_fix, query)
 
         raw_response = create_chat_completion(
             prompt,
@@ -962,6 +797,9 @@ please use the indicated format and produce a list, like this:
             if self.config.openai_functions
             else None,
         )
+        if external_fixes is not None:
+            suggested_fixes = external_fixes.result()
+            self.save_to_json(os.path.join(self.experiment_dir, "external_fixes", "external_fixes_{}_{}.json".format(project_name, bug_index)), json.loads(suggested_fixes))
         
         try:
             response_dict = extract_dict_from_response(
@@ -1035,19 +873,10 @@ please use the indicated format and produce a list, like this:
         if len(self.history) >= 2:
             self.switch_state()
 
-        self.construct_read_files()
-        self.construct_suggested_fixes()
-        self.construct_search_queries()
-        self.construct_bug_report()
-        self.construct_commands_history()
-        self.construct_human_feedback()
-        self.construct_hypothesises()
-        self.construct_similar_calls()
-        self.construct_extracted_methods()
+        self.update_context_sections()
         self.save_context()
 
-        with open("cycle_instruction_text.txt") as cit:
-            cycle_instruction = cit.read()
+        cycle_instruction = get_resources().cycle_instruction
 
         if self.hyperparams["budget_control"]["name"] == "NO-TRACK":
             pass
@@ -1066,7 +895,6 @@ please use the indicated format and produce a list, like this:
                 self.update_prompt_state("collect information to fix the bug")
                 cycle_instruction += "\nBecause of budget constaints, you were forced to transition to the state 'collect information to fix the bug'" 
 
-        context_prompt = self.construct_context_prompt()
         prompt = ChatSequence.for_model(
             self.llm.name,
             [Message("system", self.prompt_dictionary["role"])])
@@ -1082,11 +910,32 @@ please use the indicated format and produce a list, like this:
                 definitions_prompt += self.prompt_dictionary[key] + "\n"
             else:
                 raise TypeError("For now we only support list and str types.")
-            
-        prompt.extend(ChatSequence.for_model(
-            self.llm.name,
-            [Message("user", definitions_prompt + "\n" + context_prompt + "\n\n" + cycle_instruction)] + prepend_messages,
-        ))
+
+        if len(self.history) > 2:
+            last_command = self.history[-2]
+            command_result = self.history[-1]
+            last_command_section = "{}\n".format(last_command.content)
+            append_messages.append(Message("assistant", last_command_section))
+            result_last_command = "The result of executing that last command is:\n {}".format(command_result.content)
+            append_messages.append((Message("user", result_last_command)))
+
+        if self.use_prefix_stable_layout():
+            fixed_messages = list(prompt) + prepend_messages + append_messages
+            context_budget = int(self.send_token_limit - reserve_tokens - count_message_tokens(fixed_messages, self.llm.name))
+            prompt.extend(ChatSequence.for_model(
+                self.llm.name,
+                self.construct_prefix_stable_messages(definitions_prompt, cycle_instruction, context_budget) + prepend_messages,
+            ))
+        else:
+            # The context sections get whatever the rest of the prompt leaves of the token limit
+            fixed_messages = list(prompt) + [Message("user", definitions_prompt + "\n" + "\n\n" + cycle_instruction)] + prepend_messages + append_messages
+            context_budget = int(self.send_token_limit - reserve_tokens - count_message_tokens(fixed_messages, self.llm.name))
+            context_prompt = self.construct_context_prompt(context_budget)
+
+            prompt.extend(ChatSequence.for_model(
+                self.llm.name,
+                [Message("user", definitions_prompt + "\n" + context_prompt + "\n\n" + cycle_instruction)] + prepend_messages,
+            ))
         #prompt.append(Message("user", context_prompt))
         
         ## The following is the original code, uncomment when needed to roll back
@@ -1108,13 +957,6 @@ please use the indicated format and produce a list, like this:
             prompt.insert(history_start_index, new_summary_msg)
 
         """
-        if len(self.history) > 2:
-            last_command = self.history[-2]
-            command_result = self.history[-1]
-            last_command_section = "{}\n".format(last_command.content)
-            append_messages.append(Message("assistant", last_command_section))
-            result_last_command = "The result of executing that last command is:\n {}".format(command_result.content)
-            append_messages.append((Message("user", result_last_command)))
         if append_messages:
             prompt.extend(append_messages)
 
@@ -0,0 +1,136 @@
+"""Token-budgeted packing of the context sections of the prompt.
+
+The context sections grow with every command the agent runs. The packer fits them
+into a token budget deterministically: each section has a priority and may be
+capped to a share of the budget, and entries are evicted oldest first, starting
+with the lowest priority sections. The latest entry of each section is kept as
+long as possible: when dropping all older entries is not enough, the largest
+entries are truncated, and they are dropped only if the budget cannot even fit
+the truncated entries. Evicted entries are replaced by a note so that
+the agent knows that part of its context was left out.
+
+Token counts are cached per entry text: entries are repeated unchanged from one
+cycle to the next, so only new entries are tokenized.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+
+OMISSION_NOTE = (
+    "({} older entries of this section were left out to fit the context window)\n"
+)
+TRUNCATION_NOTE = "\n[...] (truncated to fit the context window)\n"
+
+
+@dataclass
+class ContextSection:
+    """A prompt section: a header followed by entries, oldest first"""
+
+    name: str
+    header: str
+    entries: list[str]
+    priority: int
+    empty_text: str = ""
+    max_share: float = 1.0
+    """The share of the budget that the entries of this section may take"""
+
+    kept: list[str] = field(init=False)
+    omitted: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self.kept = list(self.entries)
+
+    def render(self) -> str:
+        if not self.entries:
+            return self.header + self.empty_text
+        note = OMISSION_NOTE.format(self.omitted) if self.omitted else ""
+        return self.header + note + "".join(self.kept)
+
+    def drop_oldest(self):
+        self.kept.pop(0)
+        self.omitted += 1
+
+
+class ContextPacker:
+    """Fits context sections into a token budget, caching the token counts of texts"""
+
+    def __init__(self, count_tokens: Callable[[str], int], cache_size: int = 4096):
+        self.count_tokens = count_tokens
+        self.cache_size = cache_size
+        self.token_counts: OrderedDict[str, int] = OrderedDict()
+
+    def tokens(self, text: str) -> int:
+        if text in self.token_counts:
+            self.token_counts.move_to_end(text)
+            return self.token_counts[text]
+        count = self.count_tokens(text)
+        self.token_counts[text] = count
+        if len(self.token_counts) > self.cache_size:
+            self.token_counts.popitem(last=False)
+        return count
+
+    def section_tokens(self, section: ContextSection) -> int:
+        if not section.entries:
+            return self.tokens(section.header + section.empty_text)
+        note = (
+            self.tokens(OMISSION_NOTE.format(section.omitted)) if section.omitted else 0
+        )
+        return (
+            self.tokens(section.header)
+            + note
+            + sum(self.tokens(e) for e in section.kept)
+        )
+
+    def total_tokens(self, sections: list[ContextSection]) -> int:
+        # One token per separator between sections
+        return sum(self.section_tokens(s) for s in sections) + len(sections)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text so that, with the truncation note, it takes at most max_tokens"""
+        max_tokens -= self.tokens(TRUNCATION_NOTE)
+        if max_tokens <= 0:
+            return TRUNCATION_NOTE
+        cut = len(text)
+        while cut > 0 and self.count_tokens(text[:cut]) > max_tokens:
+            cut = cut * max_tokens // self.count_tokens(text[:cut]) - 1
+        return text[: max(cut, 0)] + TRUNCATION_NOTE
+
+    def pack(
+        self, sections: list[ContextSection], budget: int, separator: str = "\n"
+    ) -> str:
+        """Render the sections joined by separator, evicting entries to fit budget"""
+        for section in sections:
+            cap = int(section.max_share * budget)
+            while len(section.kept) > 1 and self.section_tokens(section) > cap:
+                section.drop_oldest()
+
+        by_priority = sorted(sections, key=lambda s: s.priority)
+        # Older entries go first, lowest priority first
+        for section in by_priority:
+            while len(section.kept) > 1 and self.total_tokens(sections) > budget:
+                section.drop_oldest()
+
+        # Then the largest of the remaining entries are truncated
+        while self.total_tokens(sections) > budget:
+            candidates = [
+                (self.tokens(entry), -i, j)
+                for i, section in enumerate(sections)
+                for j, entry in enumerate(section.kept)
+                if not entry.endswith(TRUNCATION_NOTE)
+            ]
+            if not candidates:
+                break
+            size, minus_i, j = max(candidates)
+            section = sections[-minus_i]
+            excess = self.total_tokens(sections) - budget
+            section.kept[j] = self.truncate(section.kept[j], size - excess)
+
+        # The budget does not even fit the truncated entries: drop them as well
+        for section in by_priority:
+            while section.kept and self.total_tokens(sections) > budget:
+                section.drop_oldest()
+
+        return separator.join(section.render() for section in sections)
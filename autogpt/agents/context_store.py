@@ -0,0 +1,187 @@
+"""Incrementally maintained context sections of the agent's prompt.
+
+The prompt repeats, every cycle, what the agent has gathered so far: the lines it
+read, the fixes it tried, its searches, hypotheses and so on. All of these derive
+from the (command, result) pairs of the message history. Instead of re-parsing the
+whole history every cycle, the context store consumes each new message once, in
+order, and folds it into the sections. An assistant message is parsed when it is
+appended; its command is applied when the message holding its result follows.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from autogpt.agents.read_ranges import FileRanges, parse_read_lines
+from autogpt.commands.file_view import get_file_view
+from autogpt.llm.base import Message
+
+LAST_COMMAND_PREFIX = (
+    "## As RepairAgentv0.5.0, this is the last command I have called"
+    " in response to the users' input"
+)
+UNKNOWN_COMMAND_MESSAGE = "unknown command. Do not try to use this command again."
+
+FIX_COMMANDS = ("write_range", "write_fix", "try_fixes")
+
+
+@dataclass
+class _PendingCommand:
+    """An assistant command waiting for the message holding its result"""
+
+    command_dict: dict
+    valid: bool
+    is_last_command_summary: bool
+
+    @property
+    def name(self) -> str:
+        return self.command_dict["command"]["name"]
+
+    @property
+    def args(self) -> dict:
+        return self.command_dict["command"]["args"]
+
+
+class ContextStore:
+    """Context sections folded from the message history, one message at a time"""
+
+    def __init__(self):
+        self.processed_messages = 0
+        self.pending: Optional[_PendingCommand] = None
+
+        self.read_files: dict[str, FileRanges] = {}
+        self.suggested_fixes: list = []
+        self.search_queries: list[dict] = []
+        self.similar_calls: list[dict] = []
+        self.extracted_methods: list[dict] = []
+        self.failing_test_code = ""
+        self.commands_history: list[str] = []
+        self.human_feedback: list[str] = []
+        self.hypothesises: list[str] = []
+        self.unknown_commands: list[str] = []
+        self.generated_methods: Optional[tuple[str, str]] = None
+        self.issued_commands: set[str] = set()
+
+    def sync(self, messages: Sequence[Message]):
+        """Consume the messages appended to the history since the last call"""
+        for i in range(self.processed_messages, len(messages)):
+            self.append(messages[i])
+
+    def append(self, message: Message):
+        self.processed_messages += 1
+        if self.pending is not None:
+            self._apply_result(self.pending, message)
+            self.pending = None
+
+        if message.role == "assistant":
+            self._apply_command(message)
+        elif message.role == "system" and message.content.startswith("Human feedback"):
+            self.human_feedback.append(message.content)
+
+    def refresh_read_files(self, resolve: Callable[[str], Optional[str]]):
+        """Reload the read lines of the files that changed on disk
+
+        resolve maps the file paths given to read_range to the files they read.
+        """
+        for filepath, ranges in self.read_files.items():
+            source = resolve(filepath)
+            if source is not None and os.path.isfile(source):
+                ranges.refresh(get_file_view(source))
+
+    def bug_report(self) -> dict[str, str]:
+        return {
+            "get_info": "No longer needed for this version",
+            "run_tests": "No longer needed for this version",
+            "failing_test_code": self.failing_test_code,
+        }
+
+    def _apply_command(self, message: Message):
+        command_dict = message.parsed_response()
+        if not isinstance(command_dict, dict) or not isinstance(
+            command_dict.get("command"), dict
+        ):
+            return
+        is_summary = message.content.startswith(LAST_COMMAND_PREFIX)
+        self.issued_commands.add(str(command_dict["command"]))
+        if (
+            not is_summary
+            and "name" in command_dict["command"]
+            and "thoughts" in command_dict
+        ):
+            self.commands_history.append(
+                command_dict["command"]["name"]
+                + " , Your reasoning for calling this command was: '{}'".format(
+                    command_dict["thoughts"]
+                )
+            )
+
+        pending = _PendingCommand(command_dict, message.has_valid_command(), is_summary)
+        if pending.valid:
+            if pending.name in FIX_COMMANDS:
+                if pending.name == "try_fixes":
+                    for fix in pending.args["fixes_list"]:
+                        if isinstance(fix, dict):
+                            self.suggested_fixes.append(fix.get("changes_dicts", []))
+                else:
+                    self.suggested_fixes.append(pending.args.get("changes_dicts", []))
+            elif pending.name == "express_hypothesis" and not is_summary:
+                self.hypothesises.append(pending.args["hypothesis"])
+        self.pending = pending
+
+    def _apply_result(self, pending: _PendingCommand, message: Message):
+        result = message.content
+        if (
+            not pending.is_last_command_summary
+            and message.role == "user"
+            and UNKNOWN_COMMAND_MESSAGE in result
+            and pending.command_dict["command"].get("name") not in self.unknown_commands
+        ):
+            self.unknown_commands.append(pending.command_dict["command"].get("name"))
+
+        if not pending.valid or not result:
+            return
+        args = pending.args
+        match pending.name:
+            case "read_range":
+                lines = parse_read_lines(result)
+                if lines:
+                    self.read_files.setdefault(args["filepath"], FileRanges()).add(
+                        min(lines), max(lines), lines
+                    )
+            case (
+                "search_code_base" | "search_code_text"
+            ) if not pending.is_last_command_summary:
+                self.search_queries.append(
+                    {
+                        "query": args.get("key_words", args.get("query")),
+                        "result": result,
+                    }
+                )
+            case "extract_similar_functions_calls":
+                self.similar_calls.append(
+                    {
+                        "code_snippet": args["code_snippet"],
+                        "file_path": args["file_path"],
+                        "result": result,
+                    }
+                )
+            case "extract_method_code":
+                self.extracted_methods.append(
+                    {
+                        "method_name": args["method_name"],
+                        "file_path": args["filepath"],
+                        "result": result,
+                    }
+                )
+            case "extract_test_code" if not pending.is_last_command_summary:
+                self.failing_test_code += (
+                    "Extracting test code from file {} returned: ".format(
+                        args["test_file_path"]
+                    )
+                    + result
+                    + "\n"
+                )
+            case "AI_generate_method_code":
+                self.generated_methods = (args["method_name"], result)
@@ -0,0 +1,101 @@
+"""Merged line ranges of the files read by the agent.
+
+The agent often reads overlapping or adjacent ranges of the same file (lines 100 to
+150, then 120 to 180), and every read used to be repeated in the prompt as is, so
+the shared lines appeared once per read on every later cycle. Here the ranges of a
+file are kept as a set of disjoint intervals, merged as they are added, and each
+line is rendered once. The content of the lines is taken from the read results and
+refreshed from the file when it changes on disk, e.g. after a fix was written.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections.abc import Mapping
+from typing import Iterator, Optional
+
+from autogpt.commands.file_view import FileView
+
+LINE_PREFIX = re.compile(r"^Line (\d+):", re.MULTILINE)
+
+
+def parse_read_lines(result: str) -> dict[int, str]:
+    """Map line numbers to lines in the output of read_range ("Line 12:code\\n"...)"""
+    matches = list(LINE_PREFIX.finditer(result))
+    ends = [m.start() for m in matches[1:]] + [len(result)]
+    return {int(m.group(1)): result[m.end() : end] for m, end in zip(matches, ends)}
+
+
+def resolve_source_file(project_dir: str, filepath: str) -> Optional[str]:
+    """Find the file that read_range read for filepath, or None if it is ambiguous"""
+    if filepath.endswith(".java"):
+        filepath = filepath[:-5].replace(".", "/") + ".java"
+    else:
+        filepath = filepath.replace(".", "/")
+    if os.path.isfile(os.path.join(project_dir, filepath)):
+        return os.path.join(project_dir, filepath)
+
+    files_index = os.path.join(project_dir, "files_index.txt")
+    if not os.path.exists(files_index):
+        return None
+    with open(files_index) as fit:
+        candidates = [f for f in fit.read().splitlines() if filepath in f]
+    if len(candidates) != 1:
+        return None
+    return os.path.join(project_dir, candidates[0])
+
+
+class FileRanges(Mapping):
+    """The lines read from one file, as merged (startline, endline) ranges
+
+    As a mapping, it maps each merged range to its rendered lines, like the
+    read_range output for that range.
+    """
+
+    def __init__(self):
+        self.intervals: list[tuple[int, int]] = []
+        self.lines: dict[int, str] = {}
+        self.signature: Optional[tuple[int, int]] = None
+        """The (mtime, size) of the file when the lines were last refreshed from it"""
+
+    def add(self, startline: int, endline: int, lines: dict[int, str]):
+        """Add a read range, merging it with the ranges it overlaps or touches"""
+        merged = []
+        for start, end in self.intervals:
+            if end < startline - 1 or start > endline + 1:
+                merged.append((start, end))
+            else:
+                startline, endline = min(start, startline), max(end, endline)
+        merged.append((startline, endline))
+        self.intervals = sorted(merged)
+        self.lines.update(lines)
+
+    def refresh(self, view: FileView):
+        """Re-read the lines of the ranges if the file changed since the last refresh"""
+        if view.signature == self.signature:
+            return
+        self.lines = {}
+        for start, end in self.intervals:
+            start = max(1, start)
+            for i, line in enumerate(view.lines(start, end)):
+                self.lines[start + i] = line
+        self.signature = view.signature
+
+    def render(self, startline: int, endline: int) -> str:
+        return "".join(
+            "Line {}:".format(i) + self.lines[i]
+            for i in sorted(self.lines)
+            if startline <= i <= endline
+        )
+
+    def __getitem__(self, lines_range: tuple[int, int]) -> str:
+        if tuple(lines_range) not in self.intervals:
+            raise KeyError(lines_range)
+        return self.render(*lines_range)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return iter(list(self.intervals))
+
+    def __len__(self) -> int:
+        return len(self.intervals)
@@ -4,6 +4,7 @@ import logging
 import math
 import signal
 import sys
+import time
 from pathlib import Path
 from types import FrameType
 from typing import Optional
@@ -25,6 +26,7 @@ from autogpt.commands import COMMAND_CATEGORIES
 from autogpt.config import AIConfig, Config, ConfigBuilder, check_openai_api_key
 from autogpt.llm.api_manager import ApiManager
 from autogpt.logs import logger
+from autogpt.logs.telemetry import get_telemetry
 from autogpt.memory.vector import get_memory
 from autogpt.models.command_registry import CommandRegistry
 from autogpt.plugins import scan_plugins
@@ -244,18 +246,22 @@ def run_interaction_loop(
     # Set up an interrupt signal for the agent.
     signal.signal(signal.SIGINT, graceful_agent_interrupt)
 
+    telemetry = get_telemetry()
+
     #########################
     # Application Main Loop #
     #########################
 
     while cycles_remaining > 0:
         logger.debug(f"Cycle budget: {cycle_budget}; remaining: {cycles_remaining}")
+        telemetry.set_context(cycle=agent.cycle_count)
+        cycle_start = time.perf_counter()
 
         ########
         # Plan #
         ########
         # Have the agent determine the next action to take.
-        with spinner:
+        with spinner, telemetry.span("think", "think"):
             command_name, command_args, assistant_reply_dict = agent.think()
 
         ###############
@@ -325,6 +331,7 @@ def run_interaction_loop(
             logger.typewriter_log("SYSTEM: ", Fore.YELLOW, result)
         else:
             logger.typewriter_log("SYSTEM: ", Fore.YELLOW, "Unable to execute command")
+        telemetry.record("cycle", "cycle", time.perf_counter() - cycle_start)
 
 
 def update_user(
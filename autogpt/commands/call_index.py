@@ -0,0 +1,269 @@
+"""Project-wide index of method call sites in a Defects4J checkout.
+
+The index maps every callee name to the call expressions found in the project's
+Java files, together with their file, line and argument shape. It is built once
+per checkout, kept in memory for the lifetime of the process and persisted next
+to the checkout in the workspace, so that similar-call queries neither re-read
+nor re-scan any source file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import astuple, dataclass
+from typing import Optional
+
+from antlr4 import Token
+
+from autogpt.commands.java_extractor import AmbiguousSourceError, read_source, tokenize
+from autogpt.logs import logger
+from create_files_index import list_java_files
+from JavaLexer import JavaLexer
+
+# Tokens that, right before `name(`, mark a declaration rather than a call
+DECLARATION_PREFIXES = {
+    JavaLexer.Identifier,
+    JavaLexer.GT,
+    JavaLexer.RBRACK,
+    JavaLexer.VOID,
+    JavaLexer.AT,
+    JavaLexer.BOOLEAN,
+    JavaLexer.BYTE,
+    JavaLexer.CHAR,
+    JavaLexer.DOUBLE,
+    JavaLexer.FLOAT,
+    JavaLexer.INT,
+    JavaLexer.LONG,
+    JavaLexer.SHORT,
+}
+
+LITERAL_SHAPES = {
+    JavaLexer.StringLiteral: "string",
+    JavaLexer.CharacterLiteral: "char",
+    JavaLexer.IntegerLiteral: "number",
+    JavaLexer.FloatingPointLiteral: "number",
+    JavaLexer.BooleanLiteral: "boolean",
+    JavaLexer.NullLiteral: "null",
+}
+
+OPENING = {JavaLexer.LPAREN, JavaLexer.LBRACK, JavaLexer.LBRACE}
+CLOSING = {JavaLexer.RPAREN, JavaLexer.RBRACK, JavaLexer.RBRACE}
+
+
+@dataclass
+class CallSite:
+    """A call expression found in a Java file"""
+
+    callee: str
+    expression: str
+    file_path: str
+    line: int
+    shape: tuple[str, ...]
+
+
+def argument_shape(arg_tokens: list[Token]) -> str:
+    """Classify an argument expression, e.g. as a literal, a name or a nested call"""
+    if not arg_tokens:
+        return "empty"
+    first = arg_tokens[0]
+    if len(arg_tokens) == 1:
+        if first.type in LITERAL_SHAPES:
+            return LITERAL_SHAPES[first.type]
+        if first.type == JavaLexer.Identifier:
+            return "name"
+        if first.type == JavaLexer.THIS:
+            return "this"
+    if first.type == JavaLexer.NEW:
+        return "new"
+    if arg_tokens[-1].type == JavaLexer.RPAREN and any(
+        t.type == JavaLexer.LPAREN for t in arg_tokens
+    ):
+        return "call"
+    if all(
+        t.type in (JavaLexer.Identifier, JavaLexer.DOT, JavaLexer.THIS)
+        for t in arg_tokens
+    ):
+        return "name"
+    return "expr"
+
+
+def shape_similarity(shape: tuple[str, ...], other: tuple[str, ...]) -> float:
+    """Score in [0, 1] of how alike two argument lists look"""
+    if not shape and not other:
+        return 1.0
+    same_arity = 1.0 if len(shape) == len(other) else 0.0
+    matching = sum(a == b for a, b in zip(shape, other)) / max(len(shape), len(other))
+    return 0.5 * same_arity + 0.5 * matching
+
+
+def _split_arguments(tokens: list[Token]) -> list[list[Token]]:
+    if not tokens:
+        return []
+    args = [[]]
+    depth = 0
+    for token in tokens:
+        if token.type in OPENING:
+            depth += 1
+        elif token.type in CLOSING:
+            depth -= 1
+        elif token.type == JavaLexer.COMMA and depth == 0:
+            args.append([])
+            continue
+        args[-1].append(token)
+    return args
+
+
+def extract_calls(source: str, file_path: str = "") -> list[CallSite]:
+    """Return the call sites of a Java source (or snippet), in source order
+
+    Raises:
+        AmbiguousSourceError: If the source cannot be tokenized
+    """
+    tokens = tokenize(source)
+    calls = []
+    for i, token in enumerate(tokens[:-1]):
+        if token.type != JavaLexer.Identifier or tokens[i + 1].type != JavaLexer.LPAREN:
+            continue
+        if i > 0 and tokens[i - 1].type in DECLARATION_PREFIXES:
+            continue
+
+        depth = 0
+        close = None
+        for j in range(i + 1, len(tokens)):
+            if tokens[j].type == JavaLexer.LPAREN:
+                depth += 1
+            elif tokens[j].type == JavaLexer.RPAREN:
+                depth -= 1
+                if depth == 0:
+                    close = j
+                    break
+        if close is None:
+            continue
+
+        start = i
+        while (
+            start >= 2
+            and tokens[start - 1].type == JavaLexer.DOT
+            and tokens[start - 2].type
+            in (JavaLexer.Identifier, JavaLexer.THIS, JavaLexer.SUPER)
+        ):
+            start -= 2
+        if start >= 1 and tokens[start - 1].type == JavaLexer.NEW:
+            start -= 1
+
+        expression = re.sub(
+            r"\s+", " ", source[tokens[start].start : tokens[close].stop + 1]
+        )
+        shape = tuple(
+            argument_shape(arg) for arg in _split_arguments(tokens[i + 2 : close])
+        )
+        calls.append(CallSite(token.text, expression, file_path, token.line, shape))
+    return calls
+
+
+class CallSiteIndex:
+    """Maps callee names to the call sites of a project"""
+
+    def __init__(self, calls: Optional[list[CallSite]] = None):
+        self.calls_by_callee: dict[str, list[CallSite]] = {}
+        for call in calls or []:
+            self.add(call)
+
+    def add(self, call: CallSite):
+        self.calls_by_callee.setdefault(call.callee, []).append(call)
+
+    def __len__(self):
+        return sum(len(calls) for calls in self.calls_by_callee.values())
+
+    @classmethod
+    def build(cls, project_dir: str) -> CallSiteIndex:
+        index = cls()
+        for java_file in list_java_files(project_dir):
+            file_path = os.path.relpath(
+                os.path.join(project_dir, java_file), project_dir
+            )
+            try:
+                calls = extract_calls(
+                    read_source(os.path.join(project_dir, file_path)), file_path
+                )
+            except AmbiguousSourceError as e:
+                logger.debug("Skipping {} in call-site index: {}".format(file_path, e))
+                continue
+            for call in calls:
+                index.add(call)
+        return index
+
+    @classmethod
+    def load(cls, index_path: str) -> CallSiteIndex:
+        with open(index_path) as index_file:
+            rows = json.load(index_file)
+        return cls(
+            [
+                CallSite(callee, expr, path, line, tuple(shape))
+                for callee, expr, path, line, shape in rows
+            ]
+        )
+
+    def save(self, index_path: str):
+        rows = [
+            astuple(call) for calls in self.calls_by_callee.values() for call in calls
+        ]
+        with open(index_path, "w") as index_file:
+            json.dump(rows, index_file)
+
+    def query(self, callee: str, file_path: Optional[str] = None) -> list[CallSite]:
+        """Return the call sites of callee, project-wide or restricted to file_path"""
+        calls = self.calls_by_callee.get(callee, [])
+        if file_path is None:
+            return list(calls)
+        return [c for c in calls if c.file_path == file_path]
+
+    def similar_calls(
+        self,
+        call: CallSite,
+        file_path: Optional[str] = None,
+        limit: int = 10,
+    ) -> list[CallSite]:
+        """Return the call sites of the same callee, most similar arguments first
+
+        Calls from call.file_path win ties; file_path restricts the search to one file.
+        """
+        candidates = [
+            c
+            for c in self.query(call.callee, file_path)
+            if c.expression != call.expression
+        ]
+        candidates.sort(
+            key=lambda c: (
+                -shape_similarity(call.shape, c.shape),
+                c.file_path != call.file_path,
+                c.file_path,
+                c.line,
+            )
+        )
+        return candidates[:limit]
+
+
+_loaded_indexes: dict[str, CallSiteIndex] = {}
+
+
+def get_call_index(workspace: str, project_dir: str) -> CallSiteIndex:
+    """Return the call-site index of a checkout, building it on first use
+
+    The index is saved as `<project_dir>_calls_index.json` in the workspace, outside of
+    the checkout itself, so that it survives the re-checkouts done after each test run.
+    """
+    index_path = os.path.join(workspace, project_dir + "_calls_index.json")
+    if index_path in _loaded_indexes:
+        return _loaded_indexes[index_path]
+
+    if os.path.exists(index_path):
+        index = CallSiteIndex.load(index_path)
+    else:
+        index = CallSiteIndex.build(os.path.join(workspace, project_dir))
+        index.save(index_path)
+        logger.debug("Indexed {} call sites of {}".format(len(index), project_dir))
+    _loaded_indexes[index_path] = index
+    return index
@@ -7,8 +7,7 @@ import os
 import subprocess
 import re
 import json
-import random
-import time
+from collections import Counter
 
 import docker
 from docker.errors import DockerException, ImageNotFound
@@ -20,6 +19,21 @@ from autogpt.logs import logger
 
 import javalang
 from create_files_index import list_java_files
+from autogpt.commands.java_extractor import AmbiguousSourceError, classes_and_methods
+from autogpt.commands.defects4j_static import run_compile_and_test, run_timed
+from autogpt.commands.call_index import CallSite, extract_calls, get_call_index
+from autogpt.commands.failing_test_index import FailingTestIndex
+from autogpt.commands.file_view import get_file_view, invalidate_file_view
+from autogpt.commands.java_parsing import parse_file
+from autogpt.commands.lsp_session import LspError, get_lsp_session, uri_to_path
+from autogpt.commands.parse_service import ParseServiceError, drop_parse_service, get_parse_service
+from autogpt.commands.span_cache import LineEdit, file_signature, method_span_cache
+from autogpt.commands.trigram_index import get_trigram_index
+from autogpt.memory.vector.code_index import get_code_index
+
+MAX_TEXT_SEARCH_HITS = 50
+MAX_SEMANTIC_SEARCH_HITS = 10
+MAX_LSP_LOCATIONS = 50
 
 ALLOWLIST_CONTROL = "allowlist"
 DENYLIST_CONTROL = "denylist"
@@ -124,13 +138,7 @@ def run_checkout(project_name: str, bug_index:int, agent: Agent):
         logger.debug(
             f"Auto-GPT is running in a Docker container; executing tests directly..."
         )
-        result = subprocess.run(
-            [cmd],
-            capture_output=True,
-            encoding="utf8",
-            cwd=agent.config.workspace_path,
-            shell=True
-        )
+        result = run_timed(cmd, agent.config.workspace_path, "checkout")
         if result.returncode == 0:
             return "The changed files were restored to their original content"
         else:
@@ -202,9 +210,7 @@ def run_tests(project_name: str, bug_index: int, agent: Agent) -> str:
     return run_defects4j_tests(project_name, bug_index, agent)
 
 def run_defects4j_tests(project_name: str, bug_index:int, agent: Agent):
-    cmd_temp = "cd {} && defects4j compile && defects4j test"
     folder_name = "_".join([project_name.lower(), str(bug_index), "buggy"])
-    cmd = cmd_temp.format(folder_name)
 
     """Run tests on a given project and a bug number
 
@@ -222,13 +228,7 @@ def run_defects4j_tests(project_name: str, bug_index:int, agent: Agent):
         logger.debug(
             f"Auto-GPT is running in a Docker container; executing tests directly..."
         )
-        result = subprocess.run(
-            [cmd],
-            capture_output=True,
-            encoding="utf8",
-            cwd=agent.config.workspace_path,
-            shell=True
-        )
+        result = run_compile_and_test(folder_name, agent.config.workspace_path)
         if result.returncode == 0:
             logger.debug(
                 "NO ERROR IF: " +result.stdout)
@@ -388,13 +388,7 @@ def execute_get_info(project_name: str, bug_index:int, agent: Agent):
         logger.debug(
             f"Auto-GPT is running in a Docker container..."
         )
-        result = subprocess.run(
-            [cmd],
-            capture_output=True,
-            encoding="utf8",
-            cwd=agent.config.workspace_path,
-            shell=True
-        )
+        result = run_timed(cmd, agent.config.workspace_path, "info")
         if result.returncode == 0:
             root_cause = extract_root_cause(result.stdout)
             edited_files = get_edited_files(project_name, bug_index)
@@ -676,13 +670,13 @@ def execute_read_range(project_name, bug_index, filepath, startline, endline, ag
             return "The filepath {} does not exist.".format(filepath)
     """
     filepath = preprocess_paths(agent, project_name, bug_index, filepath)
-    with open(os.path.join(project_dir,filepath)) as fp:
-        lines = fp.readlines()
+    file_view = get_file_view(os.path.join(project_dir, filepath))
+    startline, endline = file_view.clamp(int(startline), int(endline))
+    if startline > endline:
+        return "The requested lines are out of range, the file {} has {} lines.".format(filepath, file_view.line_count)
 
-    lines_str = ""
-    for i in range(startline-1, endline, 1):
-        lines_str+="Line {}:".format(i+1) + lines[i]
-    return lines_str
+    lines = file_view.lines(startline, endline)
+    return "".join("Line {}:".format(startline + i) + line for i, line in enumerate(lines))
 
 
 def execute_write_range(project_name, bug_index, changes_dicts, agent):
@@ -707,12 +701,77 @@ def execute_write_range(project_name, bug_index, changes_dicts, agent):
         """
         filepath = preprocess_paths(agent, project_name, bug_index, filepath)
         change_dict["file_name"] = os.path.join(project_dir,filepath)
-    
+
+    if use_compile_prevalidation(agent):
+        rejection = prevalidate_changes(project_name, bug_index, changes_dicts, agent)
+        if rejection:
+            return rejection
+
+    for change_dict in changes_dicts:
         apply_changes(change_dict)
 
     run_ret = run_defects4j_tests(project_name, bug_index, agent)
     return "Lines written successfully, the result of running test cases on the modified code is the following:\n" + run_ret
 
+def use_compile_prevalidation(agent: Agent) -> bool:
+    hyperparams = getattr(agent, "hyperparams", None)
+    if not isinstance(hyperparams, dict):
+        return False
+    return bool(hyperparams.get("compile_prevalidation", False))
+
+def new_compile_errors(before, after):
+    """Return the errors of after that were not already reported in before
+
+    Errors are compared by message, since the patch shifts their lines.
+    """
+    known = Counter(d["message"] for d in before if d.get("severity", 1) == 1)
+    new_errors = []
+    for diagnostic in after:
+        if diagnostic.get("severity", 1) != 1:
+            continue
+        if known[diagnostic["message"]] > 0:
+            known[diagnostic["message"]] -= 1
+        else:
+            new_errors.append(diagnostic)
+    return new_errors
+
+def prevalidate_changes(project_name, bug_index, changes_dicts, agent):
+    """Type-check the patched files with the language server before building them
+
+    Returns a message listing the compilation errors introduced by the changes, or
+    None if there are none or the language server is unavailable.
+    """
+    project_dir = "{}_{}_buggy".format(project_name.lower(), bug_index)
+    # The changes to a file are applied one after the other, as apply_changes does
+    originals = {}
+    patched = {}
+    for change_dict in changes_dicts:
+        file_name = change_dict["file_name"]
+        if file_name not in patched:
+            with open(file_name) as file:
+                patched[file_name] = file.readlines()
+            originals[file_name] = "".join(patched[file_name])
+        patch_lines(patched[file_name], change_dict)
+
+    rejections = []
+    try:
+        session = get_lsp_session(str(agent.config.workspace_path), project_dir)
+        for file_name, lines in patched.items():
+            before = session.wait_for_diagnostics(file_name, originals[file_name])
+            after = session.wait_for_diagnostics(file_name, "".join(lines))
+            new_errors = new_compile_errors(before, after)
+            if new_errors:
+                rejections.append("{}:\n{}".format(
+                    os.path.relpath(file_name, session.project_path), format_diagnostics(new_errors)))
+    except LspError as e:
+        logger.debug("Skipping the compilation pre-check: {}".format(e))
+        return None
+
+    if not rejections:
+        return None
+    return "The fix was not applied because the patched code does not compile. "\
+        "The following compilation errors were reported (line numbers refer to the patched file):\n" + "\n".join(rejections)
+
 def get_edited_files(name, index):
     target_file = "defects4j/framework/projects/{name}/patches/{index}.src.patch".format(name=name, index=index)
     with open(target_file) as ptf:
@@ -807,6 +866,24 @@ def get_classes_and_methods(project_name: str, bug_index: str, file_path: str, a
     with open(os.path.join(workspace, project_dir, file_path)) as tfp:
         content = tfp.read()
 
+    return str(extract_classes_and_methods(content, agent))
+
+def extract_classes_and_methods(content: str, agent: Agent) -> dict:
+    """Map every class declared in content to the names of its methods"""
+    if use_fast_extractor(agent):
+        try:
+            return classes_and_methods(content)
+        except AmbiguousSourceError as e:
+            logger.debug("Fast extractor fell back to javalang: {}".format(e))
+
+    parse_service = get_parse_service()
+    if parse_service is not None:
+        try:
+            return parse_service.classes_and_methods(content)
+        except ParseServiceError as e:
+            logger.debug("Parse service failed, parsing with javalang: {}".format(e))
+            drop_parse_service()
+
     tree = javalang.parse.parse(content)
 
     classes = {}
@@ -815,7 +892,7 @@ def get_classes_and_methods(project_name: str, bug_index: str, file_path: str, a
             classes[node.name] = []
             for method in node.methods:
                 classes[node.name].append(method.name)
-    return str(classes)
+    return classes
 
 def list_files(start_path='.'):
     file_list = []
@@ -884,38 +961,345 @@ def search_code_base(project_name:str, bug_index:str, key_words: list, agent: Ag
         #logger.debug("searching file: " + file)
         with open(file) as jf:
             content = jf.read()
-        tree = javalang.parse.parse(content)
-        for path, node in tree:
-            if isinstance(node, javalang.tree.ClassDeclaration):
-                class_name = node.name
-                #logger.debug("searching class: " + class_name)
-                # Extract information about methods within the class
-                for method_declaration in node.methods:
-                    method_name = method_declaration.name
-                    #logger.debug("searching method: " + method_name)
-                    # Extract the code of the method
-                    #method_code = content[method_declaration.position[0]: method_declaration.position[1]]
-                    #method_code = method_declaration.body
-                    #logger.debug(str(method_declaration.position))
-                    #lower_code = method_code.lower()
-                    matched_keyworkds = []
-                    for kw in lower_kwords:
-                        if kw in method_name.lower():
-                            matched_keyworkds.append(kw)
-                    if matched_keyworkds:
-                        if file in matched_files:
-                            if class_name in matched_files[file]:
-                                matched_files[file][class_name][method_name] = matched_keyworkds
-                            else:
-                                matched_files[file][class_name]={method_name:matched_keyworkds}
+        classes = extract_classes_and_methods(content, agent)
+        for class_name in classes:
+            #logger.debug("searching class: " + class_name)
+            # Extract information about methods within the class
+            for method_name in classes[class_name]:
+                #logger.debug("searching method: " + method_name)
+                # Extract the code of the method
+                #method_code = content[method_declaration.position[0]: method_declaration.position[1]]
+                #method_code = method_declaration.body
+                #logger.debug(str(method_declaration.position))
+                #lower_code = method_code.lower()
+                matched_keyworkds = []
+                for kw in lower_kwords:
+                    if kw in method_name.lower():
+                        matched_keyworkds.append(kw)
+                if matched_keyworkds:
+                    if file in matched_files:
+                        if class_name in matched_files[file]:
+                            matched_files[file][class_name][method_name] = matched_keyworkds
                         else:
-                            matched_files[file] = {class_name:{method_name:matched_keyworkds}}
+                            matched_files[file][class_name]={method_name:matched_keyworkds}
+                    else:
+                        matched_files[file] = {class_name:{method_name:matched_keyworkds}}
     logger.debug(str(matched_files))
     matched_names = [f for f in java_files if f.endswith(".java") and any(k in f.lower() for k in lower_kwords)]
     return "The following matches were found:\n"+str(matched_files) + "\nThe search also matched the following files names: \n" + "\n".join(matched_names)
 
 
 
+@command(
+    "search_code_text",
+    "This function searches the text of all java files for a string or a regular expression, it returns the matching lines\
+    with their file path and line number. It is useful to find where a string literal, a field, a constant or a given expression\
+    is used, which search_code_base cannot do since it only matches methods and files names.",
+    {
+        "project_name": {
+            "type": "string",
+            "description": "The name of the project under scope",
+            "required": True,
+        },
+        "bug_index":{
+            "type": "integer",
+            "description": "The index (number) of the bug that you are trying to fix.",
+            "required": True
+
+        },
+        "query":{
+            "type": "string",
+            "description": "The text (or regular expression) to search for",
+            "required": True
+        },
+        "is_regex":{
+            "type": "boolean",
+            "description": "Whether the query is a regular expression rather than plain text",
+            "required": True
+        }
+    },
+)
+def search_code_text(project_name:str, bug_index:str, query: str, is_regex: bool, agent: Agent):
+    workspace = agent.config.workspace_path
+    project_dir = "{}_{}_buggy".format(project_name.lower(), bug_index)
+    if isinstance(is_regex, str):
+        is_regex = is_regex.lower() == "true"
+
+    index = get_trigram_index(workspace, project_dir)
+    try:
+        hits = index.search(query, is_regex, max_hits=MAX_TEXT_SEARCH_HITS + 1)
+    except re.error as e:
+        return "The query {} is not a valid regular expression: {}".format(query, e)
+
+    if not hits:
+        return "No matches were found for {}".format(query)
+    results = "\n".join("{}:{}: {}".format(h.file_path, h.line, h.text) for h in hits[:MAX_TEXT_SEARCH_HITS])
+    if len(hits) > MAX_TEXT_SEARCH_HITS:
+        results += "\nOnly the first {} matches are shown, try a more specific query.".format(MAX_TEXT_SEARCH_HITS)
+    return "The following lines matched {}:\n".format(query) + results
+
+
+@command(
+    "semantic_code_search",
+    "This function finds the methods of the project whose code is the most similar to a given code snippet, for example\
+    a buggy snippet, even when they do not share the same names. It returns for each method its file, class, name and lines.",
+    {
+        "project_name": {
+            "type": "string",
+            "description": "The name of the project under scope",
+            "required": True,
+        },
+        "bug_index":{
+            "type": "integer",
+            "description": "The index (number) of the bug that you are trying to fix.",
+            "required": True
+
+        },
+        "code_snippet":{
+            "type": "string",
+            "description": "The code for which similar methods should be found",
+            "required": True
+        }
+    },
+)
+def semantic_code_search(project_name:str, bug_index:str, code_snippet: str, agent: Agent):
+    workspace = agent.config.workspace_path
+    project_dir = "{}_{}_buggy".format(project_name.lower(), bug_index)
+    hyperparams = getattr(agent, "hyperparams", None)
+    embedder_name = hyperparams.get("semantic_search_embedder", "local") if isinstance(hyperparams, dict) else "local"
+
+    index = get_code_index(str(workspace), project_dir, embedder_name, agent.config)
+    matches = index.query(code_snippet, k=MAX_SEMANTIC_SEARCH_HITS)
+    if not matches:
+        return "No methods were found in the project."
+    return "The following methods are the most similar to the given snippet:\n" + "\n".join(
+        "{} {}.{} (lines {}-{}), similarity {:.2f}".format(
+            m.entry.file_path, m.entry.class_name, m.entry.method_name, m.entry.start_line, m.entry.end_line, m.score
+        )
+        for m in matches
+    )
+
+
+SEVERITIES = {1: "error", 2: "warning", 3: "info", 4: "hint"}
+
+
+def open_lsp_document(project_name, bug_index, file_path, agent):
+    """Return the language server session of a checkout and the absolute path of one of its files"""
+    workspace = agent.config.workspace_path
+    project_dir = "{}_{}_buggy".format(project_name.lower(), bug_index)
+    file_path = preprocess_paths(agent, project_name, bug_index, file_path)
+    session = get_lsp_session(str(workspace), project_dir)
+    return session, os.path.join(session.project_path, file_path)
+
+
+def format_location(location, project_path):
+    """Render an LSP Location or LocationLink as 'file:line: code'"""
+    uri = location.get("uri", location.get("targetUri", ""))
+    target_range = location.get("range", location.get("targetSelectionRange"))
+    line = target_range["start"]["line"] + 1
+    if not uri.startswith("file:"):
+        # Library classes are served under jdt:// URIs and have no file to read from
+        return "{}:{}".format(uri, line)
+    file_path = uri_to_path(uri)
+    try:
+        code = "".join(get_file_view(file_path).lines(line, line)).strip()
+    except OSError:
+        # Generated or deleted sources have no file to read from either
+        return "{}:{}".format(os.path.relpath(file_path, project_path), line)
+    return "{}:{}: {}".format(os.path.relpath(file_path, project_path), line, code)
+
+
+def format_locations(locations, project_path, what):
+    if not locations:
+        return "No {} found.".format(what)
+    result = "\n".join(format_location(l, project_path) for l in locations[:MAX_LSP_LOCATIONS])
+    if len(locations) > MAX_LSP_LOCATIONS:
+        result += "\nOnly the first {} of {} {} are shown.".format(MAX_LSP_LOCATIONS, len(locations), what)
+    return result
+
+
+@command(
+    "find_definition",
+    "Finds where the symbol (method, field, variable or type) at the given line and column of a file is declared,\
+    using the Java language server.",
+    {
+        "project_name": {
+            "type": "string",
+            "description": "The name of the project under scope",
+            "required": True,
+        },
+        "bug_index":{
+            "type": "integer",
+            "description": "The index (number) of the bug that you are trying to fix.",
+            "required": True
+
+        },
+        "file_path":{
+            "type": "string",
+            "description": "The path of the file containing the symbol",
+            "required": True
+        },
+        "line_number":{
+            "type": "integer",
+            "description": "The line of the symbol, as numbered by read_range",
+            "required": True
+        },
+        "column":{
+            "type": "integer",
+            "description": "The column of the symbol in that line, starting at 1",
+            "required": True
+        }
+    },
+)
+def find_definition(project_name:str, bug_index:str, file_path:str, line_number:int, column:int, agent: Agent):
+    try:
+        session, full_path = open_lsp_document(project_name, bug_index, file_path, agent)
+        locations = session.definition(full_path, int(line_number), int(column))
+    except LspError as e:
+        return "ERROR: the language server could not answer: {}".format(e)
+    return format_locations(locations, session.project_path, "definitions")
+
+
+@command(
+    "find_references",
+    "Finds all the places where the symbol (method, field, variable or type) at the given line and column of a file\
+    is used, using the Java language server.",
+    {
+        "project_name": {
+            "type": "string",
+            "description": "The name of the project under scope",
+            "required": True,
+        },
+        "bug_index":{
+            "type": "integer",
+            "description": "The index (number) of the bug that you are trying to fix.",
+            "required": True
+
+        },
+        "file_path":{
+            "type": "string",
+            "description": "The path of the file containing the symbol",
+            "required": True
+        },
+        "line_number":{
+            "type": "integer",
+            "description": "The line of the symbol, as numbered by read_range",
+            "required": True
+        },
+        "column":{
+            "type": "integer",
+            "description": "The column of the symbol in that line, starting at 1",
+            "required": True
+        }
+    },
+)
+def find_references(project_name:str, bug_index:str, file_path:str, line_number:int, column:int, agent: Agent):
+    try:
+        session, full_path = open_lsp_document(project_name, bug_index, file_path, agent)
+        locations = session.references(full_path, int(line_number), int(column))
+    except LspError as e:
+        return "ERROR: the language server could not answer: {}".format(e)
+    return format_locations(locations, session.project_path, "references")
+
+
+@command(
+    "type_hierarchy",
+    "Lists the super types and the sub types of the class or interface at the given line and column of a file,\
+    using the Java language server.",
+    {
+        "project_name": {
+            "type": "string",
+            "description": "The name of the project under scope",
+            "required": True,
+        },
+        "bug_index":{
+            "type": "integer",
+            "description": "The index (number) of the bug that you are trying to fix.",
+            "required": True
+
+        },
+        "file_path":{
+            "type": "string",
+            "description": "The path of the file containing the symbol",
+            "required": True
+        },
+        "line_number":{
+            "type": "integer",
+            "description": "The line of the symbol, as numbered by read_range",
+            "required": True
+        },
+        "column":{
+            "type": "integer",
+            "description": "The column of the symbol in that line, starting at 1",
+            "required": True
+        }
+    },
+)
+def type_hierarchy(project_name:str, bug_index:str, file_path:str, line_number:int, column:int, agent: Agent):
+    try:
+        session, full_path = open_lsp_document(project_name, bug_index, file_path, agent)
+        hierarchy = session.type_hierarchy(full_path, int(line_number), int(column))
+    except LspError as e:
+        return "ERROR: the language server could not answer: {}".format(e)
+    if hierarchy["item"] is None:
+        return "There is no type at line {}, column {} of {}.".format(line_number, column, file_path)
+
+    def describe(item):
+        location = {"uri": item["uri"], "range": item["selectionRange"]}
+        return "{} ({})".format(item.get("detail") or item["name"], format_location(location, session.project_path))
+
+    return "\n".join(
+        ["Type: " + describe(hierarchy["item"])]
+        + ["Super types:"] + ["  " + describe(item) for item in hierarchy["supertypes"]]
+        + ["Sub types:"] + ["  " + describe(item) for item in hierarchy["subtypes"]]
+    )
+
+
+@command(
+    "compile_diagnostics",
+    "Returns the compilation errors and warnings that the Java language server reports for a file.",
+    {
+        "project_name": {
+            "type": "string",
+            "description": "The name of the project under scope",
+            "required": True,
+        },
+        "bug_index":{
+            "type": "integer",
+            "description": "The index (number) of the bug that you are trying to fix.",
+            "required": True
+
+        },
+        "file_path":{
+            "type": "string",
+            "description": "The path of the file to check",
+            "required": True
+        }
+    },
+)
+def compile_diagnostics(project_name:str, bug_index:str, file_path:str, agent: Agent):
+    try:
+        session, full_path = open_lsp_document(project_name, bug_index, file_path, agent)
+        diagnostics = session.wait_for_diagnostics(full_path)
+    except LspError as e:
+        return "ERROR: the language server could not answer: {}".format(e)
+    if not diagnostics:
+        return "The file {} compiles without errors or warnings.".format(file_path)
+    return format_diagnostics(diagnostics)
+
+
+def format_diagnostics(diagnostics):
+    return "\n".join(
+        "Line {}, column {}: {}: {}".format(
+            d["range"]["start"]["line"] + 1,
+            d["range"]["start"]["character"] + 1,
+            SEVERITIES.get(d.get("severity"), "error"),
+            d["message"],
+        )
+        for d in sorted(diagnostics, key=lambda d: (d.get("severity", 1), d["range"]["start"]["line"]))
+    )
+
+
 def extract_root_cause(info):
     separator = "--------------------------------------------------------------------------------"
     start_cause = info.find("Root cause")
@@ -948,6 +1332,22 @@ def extract_failing_test(output_message):
         return None
 
 
+def render_failing_tests(test_index: FailingTestIndex, test_file_path: str) -> str:
+    """Return the code of all indexed failing tests, those of test_file_path first"""
+    requested = test_file_path.split("::")[0].replace("/", ".")
+    if requested.endswith(".java"):
+        requested = requested[:-5]
+    requested_class = requested.split(".")[-1]
+    test_ids = sorted(
+        test_index.locations,
+        key=lambda test_id: test_id.split("::")[0].split(".")[-1] != requested_class,
+    )
+    message = "Code of the {} failing test(s):\n".format(len(test_ids)) + test_index.render(test_ids)
+    if test_index.unresolved:
+        message += "\nCould not locate the code of: {}".format(", ".join(test_index.unresolved))
+    return message
+
+
 @command(
     "extract_test_code",
     "This function allows you to extract the code of the failing test cases which will help you understand the test case that led to failure\
@@ -974,6 +1374,10 @@ def extract_failing_test(output_message):
 )
 def extract_test_code(project_name:str, bug_index:str, test_file_path: str, agent:Agent):
 
+    test_index = getattr(agent, "failing_test_index", None)
+    if test_index:
+        return render_failing_tests(test_index, test_file_path)
+
     workspace = agent.config.workspace_path
     project_dir = "{}_{}_buggy".format(project_name.lower(), bug_index)
     test_dir = ""
@@ -1079,127 +1483,40 @@ def extract_fail_report(name: str, index: str, agent: Agent):
     return "There are {} failing test cases, here is the full log of failing cases:\n".format(len(failing_test_cases))+\
         "\n\n".join(["\n".join(ftc) for ftc in failing_test_cases])
 
-def prepare_init_file(root_path, root_uri, workspace_folder, workspace, project_dir):
-    with open("lsp_init_template.json") as lit:
-        lsp_template = json.load(lit)
-
-    lsp_template["params"]["rootPath"] = root_path
-    lsp_template["params"]["rootUri"] = root_uri
-    lsp_template["params"]["initializationOptions"]["workspaceFolders"] = [workspace_folder]
-    lsp_template["params"]["workspaceFolders"][0]["uri"] = workspace_folder
-    lsp_template["params"]["workspaceFolders"][0]["name"] = project_dir
-
-    with open(os.path.join(workspace, project_dir, "lspeclipse", "lsp_init_file.json"), "w") as json_handler:
-        json.dump(lsp_template, json_handler)
-
-def execute_command(command, init_req, req):
-    # Open the subprocess with stdout redirected to a file
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stdin=subprocess.PIPE, text=True, shell=True)
-    content_length = len(init_req)
-    request = "Content-Length: {}\r\n\r\n{}".format(content_length, init_req)
-    print(request)
-    # Send the input to the subprocess
-    process.stdin.write(request)
-    #
-
-    time.sleep(3)
-    content_length = len(req)
-    request = "Content-Length: {}\r\n\r\n{}".format(content_length, req)
-    print(request)
-    process.stdin.flush()
-    process.stdin.write(request)
-    #process.stdin.flush()
-    time.sleep(2)
-    process.kill()
-
-def prepare_command(workspace, project_dir):
-    cmd = ['cd {} &&'.format(os.path.join(workspace, project_dir, "lspeclipse")),
-        '/usr/lib/jvm/java-17-openjdk-amd64/bin/java',
-        '-Declipse.application=org.eclipse.jdt.ls.core.id1',
-        '-Dosgi.bundles.defaultStartLevel=4',
-        '-Declipse.product=org.eclipse.jdt.ls.core.product',
-        '-Dlog.level=ALL',
-        '-Xmx1G',
-        '--add-modules=ALL-SYSTEM',
-        '--add-opens java.base/java.util=ALL-UNNAMED',
-        '--add-opens java.base/java.lang=ALL-UNNAMED',
-        '-jar',
-        './plugins/org.eclipse.equinox.launcher_1.6.600.v20231012-1237.jar',
-        '-configuration',
-        './config_linux',
-        '-data',
-        './workspace',
-        '> lsp_output.txt'
-    ]
-    return " ".join(cmd)
-
-def prepare_lsp_env(name, index, workspace):
-    source_path = "lspeclipse"
-    destination_path = os.path.join(workspace, "_".join([name.lower(), str(index), "buggy"]))
-
-    # Using subprocess to execute the cp command
-    command = ["cp", "-r", source_path, destination_path]
-
-    try:
-        subprocess.run(command, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error: {e}")
-
+def hover_text(hover) -> str:
+    """Flatten the contents of an LSP hover response into plain text"""
+    if not hover:
+        return ""
+    contents = hover.get("contents", "")
+    if isinstance(contents, dict):
+        return contents.get("value", "")
+    if isinstance(contents, list):
+        return "\n".join(c.get("value", "") if isinstance(c, dict) else c for c in contents)
+    return contents
 
 
 def lsp_hover(name:str, index:str, file_path:str, line_number:int, column:int, agent: Agent):
-    base_dir = "home/isleem/research_projects_repos/AutoGPT"
-    workspace = agent.config.workspace
+    workspace = agent.config.workspace_path
     project_dir = "_".join([name.lower(), str(index), "buggy"])
-    id = random.randint(100, 9999999999)
-    hover_request = {
-        "jsonrpc": "2.0",
-        "id": id,
-        "method": "textDocument/hover","params": {
-	        "textDocument": {
-		        "uri": "file:///{base_dir}/{workspace}/{project_dir}/{file_path}".format(
-                    base_dir=base_dir, workspace=workspace, project_dir=project_dir, file_path=file_path)
-	        },
-	        "position": {
-		    "line": line_number,
-		    "character": column
-	        }
-        }}
-
-    string_request = json.dumps(hover_request)
-    command = prepare_command(workspace, project_dir)
-    logger.debug("COMMAND: " + command)
-    if not os.path.exists(os.path.join(workspace, project_dir, "lspeclipse")):
-        prepare_lsp_env(name, index, workspace)
-
-    if not os.path.exists(os.path.join(workspace, project_dir, "lspeclipse", "lsp_init_file.json")):
-        root_path = str(os.path.join(base_dir, workspace, project_dir))
-        root_uri = "file://" + root_path
-        workspace_folder = root_uri
-
-        prepare_init_file(root_path, root_uri, workspace_folder, workspace, project_dir)
-
-    with open(os.path.join(workspace, project_dir, "lspeclipse", "lsp_init_file.json")) as inif:
-        init_content = inif.read()
-
-    execute_command(command, init_content, string_request)
-
-    if not os.path.exists(os.path.join(workspace, project_dir, "lsp_output.txt")):
-        return "ERROR NO OUTPUT: LSP command was not executed correctly, shutting down LSP server, do not use again."
-    else:
-        with open(os.path.join(workspace, project_dir, "lsp_output.txt")) as lspf:
-            tmpf_content = lspf.read()
+    file_path = preprocess_paths(agent, name, index, file_path)
+    try:
+        session = get_lsp_session(workspace, project_dir)
+        hover = session.hover(
+            os.path.join(workspace, project_dir, file_path), int(line_number), int(column)
+        )
+    except LspError as e:
+        return "ERROR: the language server could not answer: {}".format(e)
 
-        if len(tmpf_content) <2:
-            return "ERROR EMPTY OUTPUT: LSP command was not executed correctly, shutting down LSP server, do not use again."
-        else:
-            return tmpf_content
+    text = hover_text(hover)
+    if not text:
+        return "No information is available at line {}, column {} of {}.".format(line_number, column, file_path)
+    return text
 
 
 ## TO BE PUT TEMPORARILY HERE
 
-from langchain.chat_models import ChatOpenAI
 from langchain.schema.messages import HumanMessage, SystemMessage, AIMessage
+from autogpt.commands.defects4j_static import invoke_chat
 
 """@command(
     "ask_chatgpt",
@@ -1215,7 +1532,6 @@ from langchain.schema.messages import HumanMessage, SystemMessage, AIMessage
 )
 """
 def ask_chatgpt(question: str, agent: Agent):
-    chat = ChatOpenAI(openai_api_key=os.getenv("OPENAI_KEY"))
 
     if not agent.ask_chatgpt:
         messages = [
@@ -1228,13 +1544,12 @@ If the details in the given quetion are not enough, you should ask the user to a
         messages = agent.ask_chatgpt
         messages.append(HumanMessage(content=question))
 
-    response = chat.invoke(messages)
-    agent.ask_chatgpt.append(response)
+    response = invoke_chat(messages, model="gpt-3.5-turbo")
+    agent.ask_chatgpt.append(AIMessage(content=response))
 
-    return response.content
+    return response
 
 def validate_fix_against_hypothesis(bug_report, hypothesis, fix, model = "gpt-3.5-turbo-0125"):
-    chat = ChatOpenAI(openai_api_key=os.getenv("OPENAI_KEY"), model=model)
 
     messages = [
         SystemMessage(
@@ -1253,9 +1568,7 @@ def validate_fix_against_hypothesis(bug_report, hypothesis, fix, model = "gpt-3.
                      "Is the fix consistent with the hypothesis? Does the hypothesis about the bug make sense? Also, check if the lines numbers are consistent or not and if some lines are unncessarily changed or rewritten. For example, if the buggy line is line 445, it would make sense to change that line only. If not, explain why and suggest a correction. Keep your answer very short and concise."
             )  
     ]
-    response = chat.invoke(messages)
-
-    return response.content
+    return invoke_chat(messages, model)
 
 def remove_comments(java_code):
     # Remove both single-line and multi-line comments
@@ -1324,22 +1637,17 @@ def extract_similar_functions_calls(project_name:str, bug_index: str, file_path:
     """
 
     file_path = preprocess_paths(agent, project_name, bug_index, file_path)
-    with open(os.path.join(workspace, project_dir, file_path)) as fpt:
-        java_code = fpt.read()
-
-    all_calls = extract_function_calls(java_code)
-    calls = extract_function_calls(code_snippet)
-    #logger.debug("ALL CALLS: " + str(all_calls))
-    #logger.debug("CALLS: " + str(calls))
+    calls_index = get_call_index(workspace, project_dir)
+    try:
+        calls = extract_calls(code_snippet, file_path)
+    except AmbiguousSourceError:
+        calls = [CallSite(c[:c.find('(')].split(".")[-1].strip(), c, file_path, 0, ()) for c in extract_function_calls(code_snippet)]
     if not calls:
         return "No function calls were found. There is no need to call this command again."
     similar_calls = {}
     for c in calls:
-        ec = c[:c.find('(')]
-        similar_calls[c] = []
-        for ac in all_calls:
-            if (ec in ac) and c!=ac:
-                similar_calls[c].append(ac)
+        similar_calls[c.expression] = [
+            "{} ({}:{})".format(sc.expression, sc.file_path, sc.line) for sc in calls_index.similar_calls(c)]
 
     logger.debug("SIMILAR: "+str(similar_calls))
     for c in similar_calls:
@@ -1348,7 +1656,7 @@ def extract_similar_functions_calls(project_name:str, bug_index: str, file_path:
     else:
         return "No similar functions calls were found. There is no need to use this command again."
     
-    return "The following similar calls were found. The keys of the dictionary are calls from the code snippet, and the values are similar calls from the file.\n"+str(similar_calls)
+    return "The following similar calls were found. The keys of the dictionary are calls from the code snippet, and the values are similar calls from the project (most similar arguments first, calls from the same file first on ties).\n"+str(similar_calls)
 
 
 def get_localization(name, index):
@@ -1377,9 +1685,6 @@ def get_localization(name, index):
     return lines_info + "\n" + methods_info
 
 
-from antlr4 import FileStream, CommonTokenStream
-from JavaLexer import JavaLexer
-from JavaParser import JavaParser
 from JavaListener import JavaListener
 from antlr4 import ParseTreeWalker
 
@@ -1400,6 +1705,42 @@ class FunctionExtractor(JavaListener):
         except Exception as e:
             print(e)
 
+def antlr_method_spans(file_path, method_name):
+    parse_service = get_parse_service()
+    if parse_service is not None:
+        try:
+            return parse_service.method_spans(file_path, method_name)
+        except ParseServiceError as e:
+            logger.debug("Parse service failed, parsing in-process: {}".format(e))
+            drop_parse_service()
+
+    tree = parse_file(file_path)
+
+    extractor = FunctionExtractor()
+    extractor.target_name = method_name
+    walker = ParseTreeWalker()
+    walker.walk(extractor, tree)
+    return [(m[-2][0], m[-1][0]) for m in extractor.matched_methods]
+
+def use_fast_extractor(agent: Agent) -> bool:
+    hyperparams = getattr(agent, "hyperparams", None)
+    if not isinstance(hyperparams, dict):
+        return True
+    return hyperparams.get("method_extractor", "fast") == "fast"
+
+def find_method_spans(file_path, method_name, agent: Agent):
+    """Return the (start_line, end_line) span of every declaration of method_name in file_path.
+
+    The token-level extractor is used unless the experiment file selects "antlr" as
+    method_extractor; files it finds ambiguous are parsed with the FunctionExtractor.
+    """
+    if use_fast_extractor(agent):
+        try:
+            return [(m.start_line, m.end_line) for m in method_span_cache.find(file_path, method_name)]
+        except AmbiguousSourceError as e:
+            logger.debug("Fast extractor fell back to ANTLR for {}: {}".format(file_path, e))
+    return antlr_method_spans(file_path, method_name)
+
 @command(
     "extract_method_code",
     "This command allows you to extract possible implementation of a given method name inside a file.",
@@ -1456,29 +1797,18 @@ def extract_method_code(project_name: str, bug_index: str, filepath: str, method
     """
     filepath = preprocess_paths(agent, project_name, bug_index, filepath)
 
-    input_stream = FileStream(os.path.join(workspace, project_dir, filepath))
-    
-    lexer = JavaLexer(input_stream)
-    token_stream = CommonTokenStream(lexer)
-    parser = JavaParser(token_stream)
-    
-    tree = parser.compilationUnit()
-    
-    extractor = FunctionExtractor()
-    extractor.target_name = method_name
-    walker = ParseTreeWalker()
-    walker.walk(extractor, tree)
+    method_spans = find_method_spans(os.path.join(workspace, project_dir, filepath), method_name, agent)
     ret_val = "We found the following implementations for the method name {} (we give the body of the method):\n".format(method_name)
     with open(os.path.join(workspace, project_dir, filepath)) as wpf:
         file_content = wpf.read().splitlines()
     
-    for i, m in enumerate(extractor.matched_methods):
+    for i, (start_line, end_line) in enumerate(method_spans):
         ret_val += "### Implementation candidate {}:\n".format(i)
-        ret_val += "\n".join(file_content[m[-2][0]-1: m[-1][0]])
+        ret_val += "\n".join(file_content[start_line-1: end_line])
         ret_val += "\n"
     return ret_val
 
-import tiktoken
+from autogpt.llm.utils.token_counter import encoding_for_model
 from unittest.mock import MagicMock
 
 def extract_function_def_context(project_name, bug_index, method_name, filepath, agent):
@@ -1510,19 +1840,16 @@ def extract_function_def_context(project_name, bug_index, method_name, filepath,
             return "The filepath {} does not exist.".format(filepath)
     """
     filepath = preprocess_paths(agent, project_name, bug_index, filepath)
-    extracted_methods = extract_method_code(project_name, bug_index, filepath, method_name, agent)
-    if len(extracted_methods) == 0:
+    method_spans = find_method_spans(os.path.join(workspace, project_dir, filepath), method_name, agent)
+    if len(method_spans) == 0:
         raise ValueError("NO EXTRACTED METHODS, SHOULD NOT HAPPEN")
     
-    method_body = extracted_methods[0]
+    start_line = method_spans[0][0]
     with open(os.path.join(workspace, project_dir, filepath)) as wpf:
-        file_content = wpf.read()
+        file_lines = wpf.read().splitlines(keepends=True)
 
-    start_index = file_content.find(method_body)
-    if start_index == -1:
-        raise ValueError("METHOD BODY NOT FOUD, INDEX = -1, SHOULD NOT HAPPEN")
-    context = file_content[:start_index]
-    enc = tiktoken.encoding_for_model("gpt-3.5-turbo")
+    context = "".join(file_lines[:start_line])
+    enc = encoding_for_model("gpt-3.5-turbo")
     encoded_context = enc.encode(context)
     if len(encoded_context) < input_limit:
         return context
@@ -1557,7 +1884,6 @@ def extract_function_def_context(project_name, bug_index, method_name, filepath,
 )
 def auto_complete_functions(project_name, bug_index, filepath, method_name, agent, model="gpt-3.5-turbo-0125"):
     context = extract_function_def_context(project_name, bug_index, method_name, filepath, agent)
-    chat = ChatOpenAI(openai_api_key=os.getenv("OPENAI_KEY"), model=model)
     messages = [
             SystemMessage(
                 content="You are a code implementer and autocompletion engine. Basically, you would be given some already written code up to some line and you would be asked to implement the function/method that is declared at the last line. Always give full implementation of the method starting from declaration (public void myFunc(...)) to all the body. Take the given context into considration. Only give the implementation of the method and nothing else. If you want to add some explanation you can write it as comments above each line of code."),
@@ -1565,25 +1891,25 @@ def auto_complete_functions(project_name, bug_index, filepath, method_name, agen
                 content="Implement the code for the method {}. Here is the code preceeding the method definition:\n{}".format(method_name, context))
         ]
         #response_format={ "type": "json_object" }
-    response = chat.invoke(messages)
-    return response.content
+    return invoke_chat(messages, model)
 
 from fuzzywuzzy import fuzz
-def apply_changes(change_dict):
-    file_name = change_dict.get("file_name", "")
+def patch_lines(lines, change_dict):
+    """Apply the insertions, deletions and modifications of change_dict to lines, in place
+
+    Returns the edited ranges in the original line numbers.
+    """
     insertions = change_dict.get("insertions", [])
     deletions = change_dict.get("deletions", [])
     modifications = change_dict.get("modifications", [])
 
-    # Read the original code from the file
-    with open(file_name, 'r') as file:
-        lines = file.readlines()
-
     # Apply deletions first to avoid conflicts with line number changes
-    affected_lines = set()
+    # Edited ranges in the original line numbers, reported to the method span cache
+    line_edits = []
     for line_number in deletions:
         if 1 <= int(line_number) <= len(lines):
             lines[int(line_number) - 1] = "\n"
+            line_edits.append(LineEdit(int(line_number), int(line_number), 1))
 
     # Apply modifications
     for modification in modifications:
@@ -1597,6 +1923,7 @@ def apply_changes(change_dict):
                 lines[int(line_number) - 1] = modified_line
             else:
                 lines[int(line_number) - 1] = modified_line + "\n"
+            line_edits.append(LineEdit(int(line_number), int(line_number), lines[int(line_number) - 1].count("\n")))
 
     # Apply insertions and record affected lines
     line_offset = 0
@@ -1608,13 +1935,25 @@ def apply_changes(change_dict):
         for new_line in insertion.get("new_lines", []):
             lines.insert(int(line_number) - 1, new_line)
             line_offset += 1
+        inserted_text = "".join(insertion.get("new_lines", []))
+        line_edits.append(LineEdit(int(insertion.get("line_number", 0)), int(insertion.get("line_number", 0)) - 1, inserted_text.count("\n")))
 
+    return line_edits
+
+def apply_changes(change_dict):
+    file_name = change_dict.get("file_name", "")
+
+    # Read the original code from the file
+    with open(file_name, 'r') as file:
+        lines = file.readlines()
+    line_edits = patch_lines(lines, change_dict)
 
     # Write the modified code back to the file
+    invalidate_file_view(file_name)
+    signature_before = file_signature(file_name)
     with open(file_name, 'w') as file:
         file.writelines(lines)
-
-    return affected_lines
+    method_span_cache.apply_patch(file_name, line_edits, signature_before)
 
 def extract_targeted_lines(changes_dicts):
     targeted_lines = []
@@ -4,6 +4,7 @@ from pathlib import Path
 import re
 import json
 from autogpt.logs import logger
+from autogpt.logs.telemetry import get_telemetry
 
 
 STATIC_MODEL = "gpt-3.5-turbo-0125"
@@ -43,13 +44,7 @@ def execute_get_info(name: str, index:int, workspace):
         logger.debug(
             f"Auto-GPT is running in a Docker container..."
         )
-        result = subprocess.run(
-            [cmd],
-            capture_output=True,
-            encoding="utf8",
-            cwd=workspace,
-            shell=True
-        )
+        result = run_timed(cmd, workspace, "info")
         if result.returncode == 0:
             root_cause = extract_root_cause(result.stdout)
             edited_files = get_edited_files(name, index)
@@ -77,10 +72,38 @@ def run_tests(name: str, index: int, workspace) -> str:
 
     return run_defects4j_tests(name, index, workspace)
 
+def run_timed(cmd: str, cwd, name: str) -> subprocess.CompletedProcess:
+    """Run a shell command, recording its duration in the telemetry under name"""
+    with get_telemetry().span("subprocess", name) as span:
+        result = subprocess.run(
+            [cmd],
+            capture_output=True,
+            encoding="utf8",
+            cwd=cwd,
+            shell=True
+        )
+        span["returncode"] = result.returncode
+    return result
+
+def run_compile_and_test(folder_name: str, cwd) -> subprocess.CompletedProcess:
+    """`defects4j compile && defects4j test` in folder_name, timed as two steps
+
+    The result is that of the shell conjunction: the test suite only runs if the
+    compilation succeeded, and the outputs of both steps are concatenated.
+    """
+    compiled = run_timed("cd {} && defects4j compile".format(folder_name), cwd, "compile")
+    if compiled.returncode != 0:
+        return compiled
+    tested = run_timed("cd {} && defects4j test".format(folder_name), cwd, "test")
+    return subprocess.CompletedProcess(
+        tested.args,
+        tested.returncode,
+        compiled.stdout + tested.stdout,
+        compiled.stderr + tested.stderr,
+    )
+
 def run_defects4j_tests(name: str, index:int, workspace):
-    cmd_temp = "cd {} && defects4j compile && defects4j test"
     folder_name = "_".join([name.lower(), str(index), "buggy"])
-    cmd = cmd_temp.format(folder_name)
 
     """Run tests on a given project and a bug number
 
@@ -98,13 +121,7 @@ def run_defects4j_tests(name: str, index:int, workspace):
         logger.debug(
             f"Auto-GPT is running in a Docker container; executing tests directly..."
         )
-        result = subprocess.run(
-            [cmd],
-            capture_output=True,
-            encoding="utf8",
-            cwd=workspace,
-            shell=True
-        )
+        result = run_compile_and_test(folder_name, workspace)
         if result.returncode == 0:
             logger.debug(
                 "NO ERROR IF: " +result.stdout)
@@ -160,13 +177,7 @@ def run_checkout(name: str, index:int, workspace):
         logger.debug(
             f"Auto-GPT is running in a Docker container; executing tests directly..."
         )
-        result = subprocess.run(
-            [cmd],
-            capture_output=True,
-            encoding="utf8",
-            cwd=workspace,
-            shell=True
-        )
+        result = run_timed(cmd, workspace, "checkout")
         if result.returncode == 0:
             return "The changed files were restored to their original content"
         else:
@@ -326,11 +337,18 @@ def extract_fail_report(name: str, index: str, workspace):
     return "There are {} failing test cases, here is the full log of failing cases:\n".format(len(failing_test_cases))+\
         "\n\n".join(["\n".join(ftc) for ftc in failing_test_cases])
 
-from langchain.chat_models import ChatOpenAI
 from langchain.schema.messages import HumanMessage, SystemMessage, AIMessage
+from autogpt.llm.client import get_llm_client
+
+MESSAGE_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+def invoke_chat(messages, model=STATIC_MODEL):
+    """Send the (langchain) messages to the chat model with the shared LLM client and return the reply's content"""
+    return get_llm_client().chat(
+        [{"role": MESSAGE_ROLES[m.type], "content": m.content} for m in messages], model
+    )
 
 def query_for_fix(query, model=STATIC_MODEL):
-    chat = ChatOpenAI(openai_api_key=os.getenv("OPENAI_KEY"), model=model)
 
     messages = [
         SystemMessage(
@@ -342,12 +360,9 @@ def query_for_fix(query, model=STATIC_MODEL):
             content=query
             )  
     ]
-    response = chat.invoke(messages)
-
-    return response.content
+    return invoke_chat(messages, model)
 
 def query_for_mutants(query, model=STATIC_MODEL):
-    chat = ChatOpenAI(openai_api_key=os.getenv("OPENAI_KEY"), model=model)
 
     messages = [
         SystemMessage(
@@ -362,9 +377,7 @@ def query_for_mutants(query, model=STATIC_MODEL):
             )  
     ]
     #response_format={ "type": "json_object" }
-    response = chat.invoke(messages)
-
-    return response.content
+    return invoke_chat(messages, model)
 
 
 def construct_fix_command(fix_object, project_name, bug_index):
@@ -394,7 +407,6 @@ def construct_fix_command(fix_object, project_name, bug_index):
 
 
 def query_for_commands(query, model=STATIC_MODEL):
-    chat = ChatOpenAI(openai_api_key=os.getenv("OPENAI_KEY"), model=model)
 
     messages = [
         SystemMessage(
@@ -405,9 +417,7 @@ def query_for_commands(query, model=STATIC_MODEL):
             )  
     ]
     #response_format={ "type": "json_object" }
-    response = chat.invoke(messages)
-
-    return response.content
+    return invoke_chat(messages, model)
 
 def list_java_files(main_dir) -> list:
     directory = main_dir
@@ -419,10 +429,8 @@ def list_java_files(main_dir) -> list:
 
     return java_files
 
-from antlr4 import FileStream, CommonTokenStream
-from JavaLexer import JavaLexer
-from JavaParser import JavaParser
 from JavaListener import JavaListener
+from autogpt.commands.java_parsing import parse_file
 from antlr4 import ParseTreeWalker
 
 class FunctionExtractor(JavaListener):
@@ -462,13 +470,7 @@ def extract_method_code(project_name, bug_index, method_name, file_path):
         else:
             return "The filepath {} does not exist.".format(filepath)
     
-    input_stream = FileStream(os.path.join(workspace, project_dir, filepath))
-    
-    lexer = JavaLexer(input_stream)
-    token_stream = CommonTokenStream(lexer)
-    parser = JavaParser(token_stream)
-    
-    tree = parser.compilationUnit()
+    tree = parse_file(os.path.join(workspace, project_dir, filepath))
     
     extractor = FunctionExtractor()
     extractor.target_name = method_name
@@ -476,7 +478,7 @@ def extract_method_code(project_name, bug_index, method_name, file_path):
     walker.walk(extractor, tree)
     return [b[1] for i, b in enumerate(extractor.matched_methods)]
     
-import tiktoken
+from autogpt.llm.utils.token_counter import encoding_for_model
 def extract_function_def_context(project_name, bug_index, method_name, file_path):
     input_limit = 12000
     extracted_methods = extract_method_code(project_name, bug_index, method_name, file_path)
@@ -492,7 +494,7 @@ def extract_function_def_context(project_name, bug_index, method_name, file_path
     if start_index == -1:
         raise ValueError("METHOD BODY NOT FOUD, INDEX = -1, SHOULD NOT HAPPEN")
     context = file_content[:start_index]
-    enc = tiktoken.encoding_for_model("gpt-3.5-turbo")
+    enc = encoding_for_model("gpt-3.5-turbo")
     encoded_context = enc.encode(context)
     if len(encoded_context) < input_limit:
         return context
@@ -501,7 +503,6 @@ def extract_function_def_context(project_name, bug_index, method_name, file_path
     
 def auto_complete_functions(project_name, bug_index, file_path, method_name, model=STATIC_MODEL):
     context = extract_function_def_context(project_name, bug_index, method_name, file_path)
-    chat = ChatOpenAI(openai_api_key=os.getenv("OPENAI_KEY"), model=model)
     messages = [
             SystemMessage(
                 content="implement the code for the method {}, here is the code before the method:".format(method_name)),
@@ -510,8 +511,7 @@ def auto_complete_functions(project_name, bug_index, file_path, method_name, mod
                 )  
         ]
         #response_format={ "type": "json_object" }
-    response = chat.invoke(messages)
-    return response.content
+    return invoke_chat(messages, model)
 
 def extract_command(
     assistant_reply_json: dict, assistant_reply, config
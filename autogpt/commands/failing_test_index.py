@@ -0,0 +1,205 @@
+"""Index of the failing tests of a Defects4J bug.
+
+Each failing test id of the baseline run (`org.pkg.FooTest::testBar`) is mapped to
+the exact line span of its method, which may be declared in a superclass of the
+test class (JUnit 3 suites commonly inherit test methods). The index is built once
+when the agent starts, right after the initial test run, so that the code of all
+failing tests can be returned without scanning the checkout again.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from autogpt.commands.java_extractor import (
+    AmbiguousSourceError,
+    TypeSpan,
+    extract_declarations,
+    read_source,
+)
+from autogpt.logs import logger
+from create_files_index import list_java_files
+
+FAILING_TEST_PATTERN = re.compile(r"^--- ([\w.$]+)::([\w$]+)", re.MULTILINE)
+PACKAGE_PATTERN = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.MULTILINE)
+IMPORT_PATTERN = re.compile(r"^\s*import\s+([\w.]+)\s*;", re.MULTILINE)
+
+# Guards against cyclic or very deep hierarchies
+MAX_SUPERCLASS_DEPTH = 8
+
+
+@dataclass
+class FailingTestLocation:
+    """Where the method of a failing test is declared"""
+
+    test_id: str
+    file_path: str
+    class_name: str
+    start_line: int
+    end_line: int
+
+    @property
+    def inherited(self) -> bool:
+        test_class = self.test_id.split("::")[0]
+        return self.class_name != test_class.split(".")[-1].split("$")[-1]
+
+
+def parse_failing_test_ids(fail_report: str) -> list[str]:
+    """Return the `Class::method` ids listed in a failing_tests report, once each"""
+    test_ids = []
+    for class_name, method_name in FAILING_TEST_PATTERN.findall(fail_report):
+        test_id = "{}::{}".format(class_name, method_name)
+        if test_id not in test_ids:
+            test_ids.append(test_id)
+    return test_ids
+
+
+class _SourceFile:
+    def __init__(self, file_path: str, source: str):
+        self.file_path = file_path
+        self.lines = source.splitlines(keepends=True)
+        self.types, _ = extract_declarations(source)
+        package = PACKAGE_PATTERN.search(source)
+        self.package = package.group(1) if package else ""
+        self.imports = IMPORT_PATTERN.findall(source)
+
+    def find_type(self, simple_name: str) -> Optional[TypeSpan]:
+        return next(
+            (t for t in self.types if t.name == simple_name and t.kind == "class"), None
+        )
+
+
+class FailingTestIndex:
+    """Maps failing test ids to the spans of their test methods"""
+
+    def __init__(self, project_dir: str, java_files: list[str]):
+        self.project_dir = project_dir
+        self.java_files = java_files
+        self.locations: dict[str, FailingTestLocation] = {}
+        self.unresolved: list[str] = []
+        self._sources: dict[str, Optional[_SourceFile]] = {}
+
+    def __len__(self):
+        return len(self.locations)
+
+    @classmethod
+    def build(cls, project_dir: str, test_ids: list[str]) -> FailingTestIndex:
+        java_files = [
+            os.path.relpath(os.path.join(project_dir, f), project_dir)
+            for f in list_java_files(project_dir)
+        ]
+        index = cls(project_dir, java_files)
+        for test_id in test_ids:
+            location = index.locate(test_id)
+            if location is None:
+                index.unresolved.append(test_id)
+            else:
+                index.locations[test_id] = location
+        return index
+
+    def source_file(self, file_path: str) -> Optional[_SourceFile]:
+        if file_path not in self._sources:
+            try:
+                self._sources[file_path] = _SourceFile(
+                    file_path, read_source(os.path.join(self.project_dir, file_path))
+                )
+            except AmbiguousSourceError as e:
+                logger.debug("Cannot index tests of {}: {}".format(file_path, e))
+                self._sources[file_path] = None
+        return self._sources[file_path]
+
+    def resolve_class(
+        self, class_name: str, context: Optional[_SourceFile] = None
+    ) -> Optional[str]:
+        """Return the file declaring class_name, which may be simple or fully qualified
+
+        Simple names are resolved like javac would from context: explicit imports, then
+        the package of context, then any unique file of that name in the project.
+        """
+        candidates = []
+        if "." in class_name:
+            candidates.append(class_name)
+        elif context is not None:
+            candidates += [i for i in context.imports if i.split(".")[-1] == class_name]
+            if context.package:
+                candidates.append(context.package + "." + class_name)
+        for qualified_name in candidates:
+            suffix = (
+                os.sep + qualified_name.split("$")[0].replace(".", os.sep) + ".java"
+            )
+            matches = [f for f in self.java_files if (os.sep + f).endswith(suffix)]
+            if matches:
+                return min(matches, key=len)
+
+        simple_name = class_name.split(".")[-1].split("$")[0]
+        matches = [
+            f for f in self.java_files if os.path.basename(f) == simple_name + ".java"
+        ]
+        return matches[0] if len(matches) == 1 else None
+
+    def locate(self, test_id: str) -> Optional[FailingTestLocation]:
+        class_name, method_name = test_id.split("::")
+        file_path = self.resolve_class(class_name)
+        simple_name = class_name.split(".")[-1].split("$")[-1]
+        for _ in range(MAX_SUPERCLASS_DEPTH):
+            source_file = self.source_file(file_path) if file_path else None
+            type_span = source_file.find_type(simple_name) if source_file else None
+            if type_span is None:
+                return None
+            for method in type_span.methods:
+                if (
+                    method.name == method_name
+                    and method.has_body
+                    and not method.is_constructor
+                ):
+                    return FailingTestLocation(
+                        test_id,
+                        file_path,
+                        type_span.name,
+                        method.start_line,
+                        method.end_line,
+                    )
+            if not type_span.superclass:
+                return None
+            file_path = self.resolve_class(type_span.superclass, source_file)
+            simple_name = type_span.superclass.split(".")[-1]
+        return None
+
+    def test_code(self, test_id: str) -> Optional[str]:
+        location = self.locations.get(test_id)
+        if location is None:
+            return None
+        lines = self.source_file(location.file_path).lines
+        return "".join(lines[location.start_line - 1 : location.end_line])
+
+    def render(self, test_ids: Optional[list[str]] = None) -> str:
+        """Return the code of the given failing tests (all of them by default)"""
+        sections = []
+        for test_id in test_ids if test_ids is not None else list(self.locations):
+            location = self.locations[test_id]
+            header = "// {} ({}, lines {}-{}{})".format(
+                test_id,
+                location.file_path,
+                location.start_line,
+                location.end_line,
+                ", inherited from " + location.class_name if location.inherited else "",
+            )
+            sections.append(header + "\n" + self.test_code(test_id))
+        return "\n".join(sections)
+
+
+def build_test_index(
+    workspace: str, project_dir: str, fail_report: str
+) -> FailingTestIndex:
+    """Index the failing tests reported by the baseline test run of a checkout"""
+    test_ids = parse_failing_test_ids(fail_report)
+    index = FailingTestIndex.build(os.path.join(workspace, project_dir), test_ids)
+    logger.debug(
+        "Indexed {} of {} failing tests of {}".format(
+            len(index), len(test_ids), project_dir
+        )
+    )
+    return index
@@ -18,6 +18,7 @@ from autogpt.logs import logger
 from autogpt.memory.vector import MemoryItem, VectorMemory
 
 from .decorators import sanitize_path_arg
+from .file_view import invalidate_file_view
 from .file_operations_utils import read_textual_file
 
 Operation = Literal["write", "append", "delete"]
@@ -224,6 +225,7 @@ def write_to_file(filename: str, text: str, agent: Agent) -> str:
     try:
         directory = os.path.dirname(filename)
         os.makedirs(directory, exist_ok=True)
+        invalidate_file_view(filename)
         with open(filename, "w", encoding="utf-8") as f:
             f.write(text)
         log_operation("write", filename, agent, checksum)
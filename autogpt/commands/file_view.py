@@ -0,0 +1,99 @@
+"""Read-only, line-indexed views of the source files of a checkout.
+
+The agent reads overlapping line ranges of the same (often large) files many times
+per bug. A FileView memory-maps a file once and records the byte offset at which
+every line starts, so that any range of lines is served by slicing the map instead
+of re-reading and splitting the whole file. Views are kept in a small LRU cache
+keyed by path; a view is rebuilt when the file's mtime or size changes and must be
+invalidated explicitly before the file is rewritten in place.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import re
+from array import array
+from collections import OrderedDict
+
+MAX_OPEN_VIEWS = 64
+
+NEWLINE = re.compile(rb"\n")
+
+
+class FileView:
+    """Line-offset index over a memory-mapped file"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        stat = os.stat(file_path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self._file = open(file_path, "rb")
+        if stat.st_size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+
+        self._offsets = array("q", [0])
+        self._offsets.extend(m.end() for m in NEWLINE.finditer(self._data))
+        if self._offsets[-1] != len(self._data):
+            # The last line has no trailing newline
+            self._offsets.append(len(self._data))
+
+    @property
+    def line_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def is_stale(self) -> bool:
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return True
+        return (stat.st_mtime_ns, stat.st_size) != self.signature
+
+    def clamp(self, startline: int, endline: int) -> tuple[int, int]:
+        """Restrict a 1-based inclusive line range to the lines of the file"""
+        return max(1, startline), min(self.line_count, endline)
+
+    def lines(self, startline: int, endline: int) -> list[str]:
+        """Return the lines startline..endline (1-based, inclusive, clamped to file)"""
+        startline, endline = self.clamp(startline, endline)
+        return [
+            self._data[self._offsets[i] : self._offsets[i + 1]]
+            .decode("utf-8", errors="replace")
+            .replace("\r\n", "\n")
+            for i in range(startline - 1, endline)
+        ]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+_views: OrderedDict[str, FileView] = OrderedDict()
+
+
+def get_file_view(file_path: str) -> FileView:
+    """Return the cached view of file_path, (re)building it if needed"""
+    key = os.path.abspath(file_path)
+    view = _views.get(key)
+    if view is not None and not view.is_stale():
+        _views.move_to_end(key)
+        return view
+    if view is not None:
+        invalidate_file_view(key)
+
+    view = FileView(key)
+    _views[key] = view
+    if len(_views) > MAX_OPEN_VIEWS:
+        _, evicted = _views.popitem(last=False)
+        evicted.close()
+    return view
+
+
+def invalidate_file_view(file_path: str):
+    """Drop the view of file_path; call this before writing to the file"""
+    view = _views.pop(os.path.abspath(file_path), None)
+    if view is not None:
+        view.close()
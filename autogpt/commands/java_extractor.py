@@ -0,0 +1,434 @@
+"""Token-level extraction of Java type and method declarations.
+
+Building a full `compilationUnit` parse tree with JavaParser is the slowest part of
+the Defects4J commands. Locating method signatures and bodies only needs the
+JavaLexer token stream: braces are matched on the default channel and the tokens
+preceding each `{` are classified as a type, method, constructor or plain block.
+Whenever a header cannot be classified with confidence, AmbiguousSourceError is
+raised so that callers can fall back to the ANTLR FunctionExtractor.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from antlr4 import InputStream, Token
+from antlr4.error.ErrorListener import ErrorListener
+
+from JavaLexer import JavaLexer
+
+TYPE_KEYWORDS = {
+    JavaLexer.CLASS: "class",
+    JavaLexer.INTERFACE: "interface",
+    JavaLexer.ENUM: "enum",
+}
+
+MODIFIERS = {
+    JavaLexer.PUBLIC,
+    JavaLexer.PROTECTED,
+    JavaLexer.PRIVATE,
+    JavaLexer.STATIC,
+    JavaLexer.ABSTRACT,
+    JavaLexer.FINAL,
+    JavaLexer.STRICTFP,
+    JavaLexer.NATIVE,
+    JavaLexer.SYNCHRONIZED,
+    JavaLexer.TRANSIENT,
+    JavaLexer.VOLATILE,
+}
+
+CLASS_LIKE_SCOPES = ("unit", "class", "interface", "enum", "anonymous")
+
+
+class AmbiguousSourceError(Exception):
+    """Raised when the token scanner cannot reliably delimit a file's declarations"""
+
+
+@dataclass
+class MethodSpan:
+    """A method (or constructor) declaration located in a Java source file"""
+
+    name: str
+    class_name: str
+    params: str
+    start_line: int
+    end_line: int = -1
+    is_constructor: bool = False
+    has_body: bool = True
+
+
+@dataclass
+class TypeSpan:
+    """A class, interface, enum or anonymous class body located in a Java source file"""
+
+    name: str
+    kind: str
+    start_line: int
+    end_line: int = -1
+    methods: list[MethodSpan] = field(default_factory=list)
+    superclass: Optional[str] = None
+
+
+@dataclass
+class _Scope:
+    kind: str
+    type_span: Optional[TypeSpan] = None
+    method_span: Optional[MethodSpan] = None
+    header: list[Token] = field(default_factory=list)
+    paren_depth: int = 0
+    resume_header: bool = False
+    enum_constants_done: bool = False
+
+
+class _LexerErrorFlag(ErrorListener):
+    def __init__(self):
+        self.errors = []
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.errors.append("line {}:{} {}".format(line, column, msg))
+
+
+def tokenize(source: str) -> list[Token]:
+    """Return the default-channel tokens of a Java source, raising on lexer errors"""
+    lexer = JavaLexer(InputStream(source))
+    error_flag = _LexerErrorFlag()
+    lexer.removeErrorListeners()
+    lexer.addErrorListener(error_flag)
+
+    tokens = []
+    token = lexer.nextToken()
+    while token.type != Token.EOF:
+        if token.channel == Token.DEFAULT_CHANNEL:
+            tokens.append(token)
+        token = lexer.nextToken()
+
+    if error_flag.errors:
+        raise AmbiguousSourceError("Lexer errors: " + "; ".join(error_flag.errors[:3]))
+    return tokens
+
+
+def _skip_balanced(tokens: list[Token], i: int, open_type: int, close_type: int) -> int:
+    """Given tokens[i] of type open_type, return the index right after its match"""
+    depth = 0
+    while i < len(tokens):
+        if tokens[i].type == open_type:
+            depth += 1
+        elif tokens[i].type == close_type:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise AmbiguousSourceError("Unbalanced declaration header")
+
+
+def _strip_annotations(header: list[Token]) -> list[Token]:
+    stripped = []
+    i = 0
+    while i < len(header):
+        if header[i].type == JavaLexer.AT and not (
+            i + 1 < len(header) and header[i + 1].type == JavaLexer.INTERFACE
+        ):
+            i += 1
+            while i < len(header) and header[i].type in (
+                JavaLexer.Identifier,
+                JavaLexer.DOT,
+            ):
+                i += 1
+            if i < len(header) and header[i].type == JavaLexer.LPAREN:
+                i = _skip_balanced(header, i, JavaLexer.LPAREN, JavaLexer.RPAREN)
+            continue
+        stripped.append(header[i])
+        i += 1
+    return stripped
+
+
+def _anonymous_class_name(header: list[Token]) -> Optional[str]:
+    """Return the instantiated type if the header ends with `new Type(...)`"""
+    if not header or header[-1].type != JavaLexer.RPAREN:
+        return None
+    depth = 0
+    i = len(header) - 1
+    while i >= 0:
+        if header[i].type == JavaLexer.RPAREN:
+            depth += 1
+        elif header[i].type == JavaLexer.LPAREN:
+            depth -= 1
+            if depth == 0:
+                break
+        i -= 1
+    i -= 1
+    if i >= 0 and header[i].type == JavaLexer.GT:
+        depth = 0
+        while i >= 0:
+            if header[i].type == JavaLexer.GT:
+                depth += 1
+            elif header[i].type == JavaLexer.LT:
+                depth -= 1
+                if depth == 0:
+                    break
+            i -= 1
+        i -= 1
+    name_parts = []
+    while i >= 0 and header[i].type == JavaLexer.Identifier:
+        name_parts.insert(0, header[i].text)
+        if i >= 1 and header[i - 1].type == JavaLexer.DOT:
+            i -= 2
+        else:
+            i -= 1
+            break
+    if name_parts and i >= 0 and header[i].type == JavaLexer.NEW:
+        return ".".join(name_parts)
+    return None
+
+
+def _type_declaration(header: list[Token]) -> Optional[tuple[str, str]]:
+    for i, token in enumerate(header):
+        if token.type not in TYPE_KEYWORDS:
+            continue
+        if i > 0 and header[i - 1].type == JavaLexer.DOT:
+            continue
+        if i + 1 < len(header) and header[i + 1].type == JavaLexer.Identifier:
+            return TYPE_KEYWORDS[token.type], header[i + 1].text
+        raise AmbiguousSourceError(
+            "Type keyword without a name at line {}".format(token.line)
+        )
+    return None
+
+
+def _superclass(header: list[Token]) -> Optional[str]:
+    """Return the (possibly qualified) name following `extends` in a class header"""
+    angle_depth = 0
+    for i, token in enumerate(header):
+        if token.type == JavaLexer.LT:
+            angle_depth += 1
+        elif token.type == JavaLexer.GT:
+            angle_depth -= 1
+        if token.type != JavaLexer.EXTENDS or angle_depth > 0:
+            continue
+        name_parts = []
+        for t in header[i + 1 :]:
+            if t.type not in (JavaLexer.Identifier, JavaLexer.DOT):
+                break
+            name_parts.append(t.text)
+        return "".join(name_parts) or None
+    return None
+
+
+def _method_declaration(
+    header: list[Token], source: str, class_name: str, with_body: bool
+) -> Optional[MethodSpan]:
+    """Match `modifiers <T> Type name(params) [] throws X` against a header"""
+    lparen = next((i for i, t in enumerate(header) if t.type == JavaLexer.LPAREN), None)
+    if lparen is None or lparen == 0 or header[lparen - 1].type != JavaLexer.Identifier:
+        return None
+    if any(t.type == JavaLexer.ASSIGN for t in header[:lparen]):
+        return None
+    after_params = _skip_balanced(header, lparen, JavaLexer.LPAREN, JavaLexer.RPAREN)
+
+    # Only array dimensions, a throws clause or an annotation default may follow
+    trailer = header[after_params:]
+    allowed = {JavaLexer.LBRACK, JavaLexer.RBRACK}
+    if trailer and trailer[0].type == JavaLexer.THROWS:
+        allowed |= {
+            JavaLexer.THROWS,
+            JavaLexer.Identifier,
+            JavaLexer.DOT,
+            JavaLexer.COMMA,
+        }
+    if any(t.type not in allowed for t in trailer):
+        if with_body or not any(t.type == JavaLexer.DEFAULT for t in trailer):
+            return None
+
+    prefix = [t for t in header[: lparen - 1] if t.type not in MODIFIERS]
+    if prefix and prefix[0].type == JavaLexer.LT:
+        prefix = prefix[_skip_balanced(prefix, 0, JavaLexer.LT, JavaLexer.GT) :]
+    name_token = header[lparen - 1]
+    start_token = prefix[0] if prefix else name_token
+    rparen = header[after_params - 1]
+    return MethodSpan(
+        name=name_token.text,
+        class_name=class_name,
+        params=source[header[lparen].start : rparen.stop + 1],
+        start_line=start_token.line,
+        is_constructor=not prefix,
+        has_body=with_body,
+    )
+
+
+class _Scanner:
+    def __init__(self, source: str):
+        self.source = source
+        self.types: list[TypeSpan] = []
+        self.methods: list[MethodSpan] = []
+        self.stack = [_Scope("unit")]
+
+    def enclosing_type(self) -> Optional[TypeSpan]:
+        for scope in reversed(self.stack):
+            if scope.type_span is not None:
+                return scope.type_span
+        return None
+
+    def open_brace(self, token: Token) -> _Scope:
+        scope = self.stack[-1]
+        header = scope.header
+        resume_header = scope.paren_depth > 0
+
+        anonymous = _anonymous_class_name(header)
+        if anonymous is not None:
+            type_span = TypeSpan(anonymous, "anonymous", token.line)
+            self.types.append(type_span)
+            return _Scope("anonymous", type_span=type_span, resume_header=resume_header)
+
+        if resume_header:
+            return _Scope("block", resume_header=True)
+
+        if scope.kind == "enum" and not scope.enum_constants_done:
+            # An enum constant with a body, e.g. `PLUS(1) { ... }`
+            header = _strip_annotations(header)
+            constant_start = 0
+            depth = 0
+            for i, t in enumerate(header):
+                if t.type == JavaLexer.LPAREN:
+                    depth += 1
+                elif t.type == JavaLexer.RPAREN:
+                    depth -= 1
+                elif t.type == JavaLexer.COMMA and depth == 0:
+                    constant_start = i + 1
+            name = header[constant_start].text if constant_start < len(header) else ""
+            type_span = TypeSpan(name, "anonymous", token.line)
+            self.types.append(type_span)
+            return _Scope("anonymous", type_span=type_span)
+
+        if scope.kind not in CLASS_LIKE_SCOPES:
+            declaration = _type_declaration(header)
+            if declaration is None:
+                return _Scope("block")
+            return self.open_type(declaration, header, token)
+
+        header = _strip_annotations(header)
+        declaration = _type_declaration(header)
+        if declaration is not None:
+            return self.open_type(declaration, header, token)
+        if not header or [t.type for t in header] == [JavaLexer.STATIC]:
+            return _Scope("block")
+        if any(t.type == JavaLexer.ASSIGN for t in header):
+            return _Scope("block")
+        enclosing = self.enclosing_type()
+        method = _method_declaration(
+            header, self.source, enclosing.name if enclosing else "", with_body=True
+        )
+        if method is None:
+            raise AmbiguousSourceError(
+                "Cannot classify the declaration opened at line {}".format(token.line)
+            )
+        self.methods.append(method)
+        if enclosing is not None:
+            enclosing.methods.append(method)
+        return _Scope("method", method_span=method)
+
+    def open_type(
+        self, declaration: tuple[str, str], header: list[Token], token: Token
+    ) -> _Scope:
+        kind, name = declaration
+        first = next((t for t in header if t.type not in MODIFIERS), token)
+        type_span = TypeSpan(name, kind, first.line)
+        if kind == "class":
+            type_span.superclass = _superclass(header)
+        self.types.append(type_span)
+        return _Scope(kind, type_span=type_span)
+
+    def semicolon(self, token: Token):
+        scope = self.stack[-1]
+        if scope.paren_depth > 0:
+            scope.header.append(token)
+            return
+        if scope.kind in CLASS_LIKE_SCOPES and scope.kind != "unit":
+            if scope.kind == "enum" and not scope.enum_constants_done:
+                scope.enum_constants_done = True
+            else:
+                header = _strip_annotations(scope.header)
+                method = _method_declaration(
+                    header, self.source, scope.type_span.name, with_body=False
+                )
+                if method is not None:
+                    method.end_line = token.line
+                    self.methods.append(method)
+                    scope.type_span.methods.append(method)
+        scope.header = []
+
+    def close_brace(self, token: Token):
+        if len(self.stack) == 1:
+            raise AmbiguousSourceError("Unbalanced '}}' at line {}".format(token.line))
+        closed = self.stack.pop()
+        if closed.type_span is not None:
+            closed.type_span.end_line = token.line
+        if closed.method_span is not None:
+            closed.method_span.end_line = token.line
+
+        parent = self.stack[-1]
+        if closed.resume_header:
+            parent.header.append(token)
+        else:
+            parent.header = []
+            parent.paren_depth = 0
+
+    def scan(self, tokens: Iterable[Token]):
+        for token in tokens:
+            scope = self.stack[-1]
+            if token.type == JavaLexer.LBRACE:
+                self.stack.append(self.open_brace(token))
+                if self.stack[-1].resume_header:
+                    scope.header.append(token)
+            elif token.type == JavaLexer.RBRACE:
+                self.close_brace(token)
+            elif token.type == JavaLexer.SEMI:
+                self.semicolon(token)
+            else:
+                if token.type == JavaLexer.LPAREN:
+                    scope.paren_depth += 1
+                elif token.type == JavaLexer.RPAREN:
+                    scope.paren_depth -= 1
+                scope.header.append(token)
+        if len(self.stack) != 1:
+            raise AmbiguousSourceError("Unbalanced braces at end of file")
+
+
+def extract_declarations(source: str) -> tuple[list[TypeSpan], list[MethodSpan]]:
+    """Locate all type and method declarations of a Java source
+
+    Args:
+        source (str): The content of a Java file
+
+    Returns:
+        tuple: The type spans and the method spans, in declaration order
+
+    Raises:
+        AmbiguousSourceError: If the declarations cannot be delimited reliably
+    """
+    scanner = _Scanner(source)
+    scanner.scan(tokenize(source))
+    return scanner.types, scanner.methods
+
+
+def find_methods(source: str, method_name: str) -> list[MethodSpan]:
+    """Return the spans of all methods called method_name (constructors excluded)"""
+    _, methods = extract_declarations(source)
+    return [m for m in methods if m.name == method_name and not m.is_constructor]
+
+
+def classes_and_methods(source: str) -> dict[str, list[str]]:
+    """Map every named class of a Java source to the names of its methods"""
+    types, _ = extract_declarations(source)
+    classes = {}
+    for type_span in types:
+        if type_span.kind == "class":
+            classes[type_span.name] = [
+                m.name for m in type_span.methods if not m.is_constructor
+            ]
+    return classes
+
+
+def read_source(file_path: str) -> str:
+    with open(file_path, encoding="utf-8", errors="replace") as source_file:
+        return source_file.read()
@@ -0,0 +1,146 @@
+"""Two-stage parsing front-end for the bundled ANTLR JavaParser.
+
+Full LL prediction is the slowest path of the Python ANTLR runtime. Most real-world
+Java files parse correctly with the cheaper SLL prediction, so every file is first
+parsed in SLL mode with a bail-out error strategy. Only if that stage fails, which
+happens on genuine syntax errors and on the rare inputs that need full context, is
+the file re-parsed in LL mode with the default error recovery. The resulting trees
+are identical to a plain LL parse whenever the SLL stage succeeds.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from antlr4 import CommonTokenStream, InputStream, ParseTreeWalker
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ConsoleErrorListener
+from antlr4.error.Errors import ParseCancellationException
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+
+from autogpt.commands.java_extractor import read_source
+from autogpt.logs import logger
+from autogpt.logs.telemetry import get_telemetry
+from JavaLexer import JavaLexer
+from JavaListener import JavaListener
+from JavaParser import JavaParser
+
+# Number of per-file timings kept for reporting
+MAX_PARSE_TIMINGS = 1000
+
+# Rule contexts that open a new type body
+TYPE_BODY_CONTEXTS = (
+    JavaParser.ClassDeclarationContext,
+    JavaParser.EnumDeclarationContext,
+    JavaParser.InterfaceDeclarationContext,
+    JavaParser.ClassCreatorRestContext,
+    JavaParser.EnumConstantContext,
+)
+
+
+@dataclass
+class ParseTiming:
+    """How long parsing a file took, and in which prediction mode it succeeded"""
+
+    file_path: str
+    mode: str
+    seconds: float
+
+
+parse_timings: deque[ParseTiming] = deque(maxlen=MAX_PARSE_TIMINGS)
+
+
+def parse_compilation_unit(
+    source: str, file_path: str = "<string>"
+) -> JavaParser.CompilationUnitContext:
+    """Parse a Java source, trying SLL prediction before falling back to full LL"""
+    start = time.perf_counter()
+    token_stream = CommonTokenStream(JavaLexer(InputStream(source)))
+    parser = JavaParser(token_stream)
+
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    try:
+        tree = parser.compilationUnit()
+        mode = "SLL"
+    except ParseCancellationException:
+        token_stream.seek(0)
+        parser.reset()
+        parser.addErrorListener(ConsoleErrorListener.INSTANCE)
+        parser._errHandler = DefaultErrorStrategy()
+        parser._interp.predictionMode = PredictionMode.LL
+        tree = parser.compilationUnit()
+        mode = "LL"
+
+    timing = ParseTiming(file_path, mode, time.perf_counter() - start)
+    parse_timings.append(timing)
+    get_telemetry().record("parse", mode, timing.seconds, file=file_path)
+    logger.debug(
+        "Parsed {} in {:.3f}s ({} prediction)".format(file_path, timing.seconds, mode)
+    )
+    return tree
+
+
+def parse_file(file_path: str) -> JavaParser.CompilationUnitContext:
+    return parse_compilation_unit(read_source(file_path), file_path)
+
+
+def summarize_parse_timings() -> str:
+    """Return the number of files and total parse time per prediction mode"""
+    totals = {}
+    for timing in parse_timings:
+        count, seconds = totals.get(timing.mode, (0, 0.0))
+        totals[timing.mode] = (count + 1, seconds + timing.seconds)
+    return ", ".join(
+        "{}: {} files in {:.2f}s".format(mode, count, seconds)
+        for mode, (count, seconds) in sorted(totals.items())
+    )
+
+
+class _MethodCollector(JavaListener):
+    def __init__(self):
+        self.classes = []
+        self.methods = []
+
+    def enterClassDeclaration(self, ctx):
+        self.classes.append(ctx.Identifier().getText())
+
+    def enterMethodDeclaration(self, ctx):
+        ctx_owner = ctx.parentCtx
+        while ctx_owner is not None and not isinstance(ctx_owner, TYPE_BODY_CONTEXTS):
+            ctx_owner = ctx_owner.parentCtx
+        class_name = None
+        if isinstance(ctx_owner, JavaParser.ClassDeclarationContext):
+            class_name = ctx_owner.Identifier().getText()
+        self.methods.append(
+            (ctx.Identifier().getText(), class_name, ctx.start.line, ctx.stop.line)
+        )
+
+
+def _collect(tree: JavaParser.CompilationUnitContext) -> _MethodCollector:
+    collector = _MethodCollector()
+    ParseTreeWalker().walk(collector, tree)
+    return collector
+
+
+def method_declarations(
+    tree: JavaParser.CompilationUnitContext,
+) -> list[tuple[str, str | None, int, int]]:
+    """Return (name, class name, start line, end line) for every method of a parse tree
+
+    The class name is None for methods of enums, interfaces and anonymous classes.
+    """
+    return _collect(tree).methods
+
+
+def class_methods(tree: JavaParser.CompilationUnitContext) -> dict[str, list[str]]:
+    """Map every named class of a parse tree to the names of the methods it declares"""
+    collector = _collect(tree)
+    classes = {name: [] for name in collector.classes}
+    for name, class_name, _, _ in collector.methods:
+        if class_name is not None:
+            classes[class_name].append(name)
+    return classes
@@ -0,0 +1,456 @@
+"""Persistent Eclipse JDT Language Server sessions, one per checkout.
+
+A session starts the language server once and keeps it running for the lifetime of
+the agent. It speaks JSON-RPC over the server's stdin/stdout with proper
+`Content-Length` framing: requests get increasing ids and the caller waits on a
+future that the reader thread resolves when the response with the same id arrives.
+Notifications sent by the server (e.g. `textDocument/publishDiagnostics`) are
+recorded so that diagnostics can be awaited after a document change.
+
+The server installation is looked up in $JDTLS_HOME (default: `lspeclipse` at the
+root of the repository) and run with $JDTLS_JAVA (default: the JDK 17 `java`).
+Each checkout gets its own server data directory next to it in the workspace, so
+that the project import survives the re-checkouts done after each test run.
+"""
+
+from __future__ import annotations
+
+import atexit
+import glob
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import Future, TimeoutError
+from pathlib import Path
+from typing import Any, Callable, Optional
+from urllib.parse import unquote, urlparse
+
+from autogpt.logs import logger
+
+JDTLS_HOME = os.getenv("JDTLS_HOME", str(Path(__file__).parents[2] / "lspeclipse"))
+JDTLS_JAVA = os.getenv("JDTLS_JAVA", "/usr/lib/jvm/java-17-openjdk-amd64/bin/java")
+
+REQUEST_TIMEOUT = 30
+DIAGNOSTICS_TIMEOUT = 20
+
+METHOD_NOT_FOUND = -32601
+
+
+class LspError(Exception):
+    """Raised when the language server cannot be started or a request fails"""
+
+
+def path_to_uri(file_path: str) -> str:
+    return Path(file_path).absolute().as_uri()
+
+
+def uri_to_path(uri: str) -> str:
+    return unquote(urlparse(uri).path)
+
+
+def answer_server_request(method: str, params: Any) -> dict:
+    """The result (or error) part of the response to a request sent by the server"""
+    match method:
+        case "workspace/configuration":
+            # No settings of our own: one null entry per requested item
+            return {"result": [None] * len((params or {}).get("items", []))}
+        case (
+            "client/registerCapability"
+            | "client/unregisterCapability"
+            | "window/workDoneProgress/create"
+            | "window/showMessageRequest"
+        ):
+            return {"result": None}
+        case _:
+            return {
+                "error": {
+                    "code": METHOD_NOT_FOUND,
+                    "message": f"Unsupported method {method}",
+                }
+            }
+
+
+def jdtls_command(data_dir: str) -> list[str]:
+    launchers = glob.glob(
+        os.path.join(JDTLS_HOME, "plugins", "org.eclipse.equinox.launcher_*.jar")
+    )
+    if not launchers:
+        raise LspError(f"No JDT Language Server installation found in {JDTLS_HOME}")
+    java = JDTLS_JAVA if os.path.exists(JDTLS_JAVA) else "java"
+    return [
+        java,
+        "-Declipse.application=org.eclipse.jdt.ls.core.id1",
+        "-Dosgi.bundles.defaultStartLevel=4",
+        "-Declipse.product=org.eclipse.jdt.ls.core.product",
+        "-Xmx1G",
+        "--add-modules=ALL-SYSTEM",
+        "--add-opens",
+        "java.base/java.util=ALL-UNNAMED",
+        "--add-opens",
+        "java.base/java.lang=ALL-UNNAMED",
+        "-jar",
+        launchers[0],
+        "-configuration",
+        os.path.join(JDTLS_HOME, "config_linux"),
+        "-data",
+        data_dir,
+    ]
+
+
+class JsonRpcConnection:
+    """JSON-RPC 2.0 over the stdin/stdout of a language server process"""
+
+    def __init__(
+        self,
+        process: subprocess.Popen,
+        on_notification: Callable[[str, Any], None],
+    ):
+        self.process = process
+        self.on_notification = on_notification
+        self.pending: dict[int, Future] = {}
+        self.next_id = 1
+        self.write_lock = threading.Lock()
+        self.closed = False
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def _write(self, message: dict):
+        body = json.dumps(message).encode("utf-8")
+        with self.write_lock:
+            if self.closed:
+                raise LspError("The language server connection is closed")
+            self.process.stdin.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+            self.process.stdin.flush()
+
+    def _read_message(self) -> Optional[dict]:
+        content_length = None
+        while True:
+            header = self.process.stdout.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.decode("ascii").partition(":")
+            if name.lower() == "content-length":
+                content_length = int(value)
+        if content_length is None:
+            raise LspError("Message without Content-Length header")
+        return json.loads(self.process.stdout.read(content_length))
+
+    def _read_loop(self):
+        try:
+            while (message := self._read_message()) is not None:
+                self._dispatch(message)
+        except (OSError, ValueError, LspError) as e:
+            logger.debug(f"Language server connection failed: {e}")
+        finally:
+            self.closed = True
+            for future in list(self.pending.values()):
+                if not future.done():
+                    future.set_exception(LspError("The language server exited"))
+
+    def _dispatch(self, message: dict):
+        if "method" not in message:
+            future = self.pending.pop(message.get("id"), None)
+            if future is None:
+                return
+            if "error" in message:
+                future.set_exception(LspError(message["error"].get("message", "")))
+            else:
+                future.set_result(message.get("result"))
+        elif "id" in message:
+            # Requests from the server (configuration, capability registration,
+            # progress) need an answer but no action
+            self._write(
+                {
+                    "jsonrpc": "2.0",
+                    "id": message["id"],
+                    **answer_server_request(message["method"], message.get("params")),
+                }
+            )
+        else:
+            self.on_notification(message["method"], message.get("params"))
+
+    def request_async(self, method: str, params: Any) -> Future:
+        future = Future()
+        with self.write_lock:
+            request_id = self.next_id
+            self.next_id += 1
+        self.pending[request_id] = future
+        self._write(
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+        )
+        return future
+
+    def request(
+        self, method: str, params: Any, timeout: float = REQUEST_TIMEOUT
+    ) -> Any:
+        future = self.request_async(method, params)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            raise LspError(f"No response to {method} within {timeout}s")
+
+    def notify(self, method: str, params: Any):
+        self._write({"jsonrpc": "2.0", "method": method, "params": params})
+
+
+class LspSession:
+    """A running language server for one project, with the documents it has opened"""
+
+    def __init__(self, project_path: str, command: list[str]):
+        self.project_path = os.path.abspath(project_path)
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.diagnostics: dict[str, list[dict]] = {}
+        # Document version each diagnostics list was computed for, if the server says
+        self.diagnostics_versions: dict[str, Optional[int]] = {}
+        self.diagnostics_updated = threading.Condition()
+        self.versions: dict[str, int] = {}
+        self.texts: dict[str, str] = {}
+        # Responses to position requests, valid until any document changes
+        self.responses: dict[tuple, Any] = {}
+        self.connection = JsonRpcConnection(self.process, self._on_notification)
+        try:
+            self._initialize()
+        except BaseException:
+            # The session is not registered yet, so nothing else would stop the server
+            self.process.kill()
+            self.process.wait()
+            raise
+
+    def _initialize(self):
+        root_uri = path_to_uri(self.project_path)
+        self.capabilities = self.connection.request(
+            "initialize",
+            {
+                "processId": os.getpid(),
+                "rootUri": root_uri,
+                "rootPath": self.project_path,
+                "workspaceFolders": [
+                    {"uri": root_uri, "name": os.path.basename(self.project_path)}
+                ],
+                "capabilities": {
+                    "textDocument": {
+                        "synchronization": {"didSave": True},
+                        "hover": {"contentFormat": ["plaintext", "markdown"]},
+                        "definition": {},
+                        "references": {},
+                        "typeHierarchy": {},
+                        "publishDiagnostics": {"versionSupport": True},
+                    },
+                    "workspace": {"workspaceFolders": True},
+                },
+            },
+            # The first response waits for the project import
+            timeout=REQUEST_TIMEOUT * 4,
+        ).get("capabilities", {})
+        self.connection.notify("initialized", {})
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None and not self.connection.closed
+
+    def _on_notification(self, method: str, params: Any):
+        if method == "textDocument/publishDiagnostics":
+            with self.diagnostics_updated:
+                self.diagnostics[params["uri"]] = params.get("diagnostics", [])
+                self.diagnostics_versions[params["uri"]] = params.get("version")
+                self.diagnostics_updated.notify_all()
+
+    def sync_document(self, file_path: str, text: Optional[str] = None) -> int:
+        """Make the server see text (default: the file on disk)
+
+        Returns the version of the document.
+        """
+        file_path = os.path.abspath(file_path)
+        if text is None:
+            with open(file_path, encoding="utf-8", errors="replace") as source_file:
+                text = source_file.read()
+        uri = path_to_uri(file_path)
+        if uri not in self.versions:
+            self.versions[uri] = 1
+            self.connection.notify(
+                "textDocument/didOpen",
+                {
+                    "textDocument": {
+                        "uri": uri,
+                        "languageId": "java",
+                        "version": 1,
+                        "text": text,
+                    }
+                },
+            )
+        elif self.texts[uri] != text:
+            self.versions[uri] += 1
+            self.responses.clear()
+            self.connection.notify(
+                "textDocument/didChange",
+                {
+                    "textDocument": {"uri": uri, "version": self.versions[uri]},
+                    "contentChanges": [{"text": text}],
+                },
+            )
+        self.texts[uri] = text
+        return self.versions[uri]
+
+    def position_params(self, file_path: str, line: int, column: int) -> dict:
+        """Build LSP position params from 1-based line and column numbers"""
+        self.sync_document(file_path)
+        return {
+            "textDocument": {"uri": path_to_uri(file_path)},
+            "position": {"line": max(0, line - 1), "character": max(0, column - 1)},
+        }
+
+    def request(
+        self, method: str, params: Any, timeout: float = REQUEST_TIMEOUT
+    ) -> Any:
+        return self.connection.request(method, params, timeout)
+
+    def _position_request(
+        self,
+        method: str,
+        file_path: str,
+        line: int,
+        column: int,
+        extra: Optional[dict] = None,
+    ) -> Any:
+        params = self.position_params(file_path, line, column)
+        key = (method, params["textDocument"]["uri"], line, column)
+        if key not in self.responses:
+            self.responses[key] = self.request(method, {**params, **(extra or {})})
+        return self.responses[key]
+
+    def hover(self, file_path: str, line: int, column: int) -> Any:
+        return self._position_request("textDocument/hover", file_path, line, column)
+
+    def definition(self, file_path: str, line: int, column: int) -> list[dict]:
+        locations = self._position_request(
+            "textDocument/definition", file_path, line, column
+        )
+        if isinstance(locations, dict):
+            return [locations]
+        return locations or []
+
+    def references(self, file_path: str, line: int, column: int) -> list[dict]:
+        return (
+            self._position_request(
+                "textDocument/references",
+                file_path,
+                line,
+                column,
+                {"context": {"includeDeclaration": False}},
+            )
+            or []
+        )
+
+    def type_hierarchy(self, file_path: str, line: int, column: int) -> dict[str, Any]:
+        items = self._position_request(
+            "textDocument/prepareTypeHierarchy", file_path, line, column
+        )
+        if not items:
+            return {"item": None, "supertypes": [], "subtypes": []}
+        key = ("typeHierarchy", path_to_uri(file_path), line, column)
+        if key not in self.responses:
+            self.responses[key] = {
+                "item": items[0],
+                "supertypes": self.request(
+                    "typeHierarchy/supertypes", {"item": items[0]}
+                )
+                or [],
+                "subtypes": self.request("typeHierarchy/subtypes", {"item": items[0]})
+                or [],
+            }
+        return self.responses[key]
+
+    def wait_for_diagnostics(
+        self,
+        file_path: str,
+        text: Optional[str] = None,
+        timeout: float = DIAGNOSTICS_TIMEOUT,
+    ) -> list[dict]:
+        """Push text (default: the file on disk), wait for the diagnostics it produces
+
+        Diagnostics published for an earlier version of the document, which may still
+        arrive after the change was sent, are not taken for those of the new text.
+        """
+        uri = path_to_uri(os.path.abspath(file_path))
+        with self.diagnostics_updated:
+            previous = self.diagnostics.pop(uri, None)
+        previous_version = self.versions.get(uri)
+        # The change is sent without holding the condition, which the reader thread
+        # needs to publish diagnostics while the server is still reading its input
+        version = self.sync_document(file_path, text)
+
+        def published() -> bool:
+            if uri not in self.diagnostics:
+                return False
+            # Servers that do not report versions publish for the latest text
+            published_version = self.diagnostics_versions.get(uri)
+            return published_version is None or published_version >= version
+
+        with self.diagnostics_updated:
+            if version == previous_version and previous is not None:
+                # Nothing changed, the server will not publish again
+                return self.diagnostics.setdefault(uri, previous)
+            if not self.diagnostics_updated.wait_for(published, timeout=timeout):
+                raise LspError(
+                    f"No diagnostics published for {file_path} within {timeout}s"
+                )
+            return self.diagnostics[uri]
+
+    def close(self):
+        if self.alive:
+            try:
+                self.connection.request("shutdown", None, timeout=5)
+                self.connection.notify("exit", None)
+            except LspError:
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+_sessions: dict[str, LspSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_lsp_session(
+    workspace: str, project_dir: str, command: Optional[list[str]] = None
+) -> LspSession:
+    """Return the running session of a checkout, starting the server on first use
+
+    Raises:
+        LspError: If the language server cannot be started
+    """
+    project_path = os.path.abspath(os.path.join(workspace, project_dir))
+    with _sessions_lock:
+        session = _sessions.get(project_path)
+        if session is not None and session.alive:
+            return session
+        if command is None:
+            data_dir = os.path.abspath(
+                os.path.join(workspace, project_dir + "_jdtls_data")
+            )
+            command = jdtls_command(data_dir)
+        try:
+            session = LspSession(project_path, command)
+        except OSError as e:
+            raise LspError(f"Could not start the language server: {e}") from e
+        _sessions[project_path] = session
+        return session
+
+
+@atexit.register
+def close_lsp_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,202 @@
+"""Optional long-lived process serving Java parse requests.
+
+The ANTLR Python runtime fills its DFA cache lazily, per process. Since every bug
+is repaired by a fresh agent process, the first parses of every run pay for a cold
+cache. The parse service is a single process that keeps that cache warm across
+commands, bugs and agents: agents on the same machine send it the source of a file
+and get back method spans or class listings.
+
+Start it with `python -m autogpt.commands.parse_service [--address host:port]` and
+point agents at it by exporting JAVA_PARSE_SERVICE=host:port. Without that variable,
+or when the service cannot be reached, agents parse in-process as before.
+
+Requests are pickled, so the service and its agents must share a secret key, given
+in JAVA_PARSE_SERVICE_AUTHKEY and generated anew for every run (run_on_defects4j.sh
+does so); there is no default key, and the service refuses to start without one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Optional
+
+from autogpt.commands.java_extractor import read_source
+from autogpt.commands.java_parsing import (
+    class_methods,
+    method_declarations,
+    parse_compilation_unit,
+    parse_timings,
+)
+from autogpt.logs import logger
+from autogpt.logs.telemetry import get_telemetry
+from create_files_index import list_java_files
+
+ADDRESS_ENV = "JAVA_PARSE_SERVICE"
+AUTHKEY_ENV = "JAVA_PARSE_SERVICE_AUTHKEY"
+DEFAULT_ADDRESS = "localhost:6010"
+
+
+class ParseServiceError(Exception):
+    """Raised when the parse service cannot be reached or fails to serve a request"""
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port)
+
+
+def get_authkey() -> bytes:
+    authkey = os.getenv(AUTHKEY_ENV)
+    if not authkey:
+        raise ParseServiceError(f"{AUTHKEY_ENV} is not set")
+    return authkey.encode()
+
+
+def handle_request(request: dict) -> Any:
+    """Serve one request, given as a dict with an "op" and the source to parse"""
+    op = request["op"]
+    if op == "ping":
+        return "pong"
+
+    tree = parse_compilation_unit(
+        request["source"], request.get("file_path", "<string>")
+    )
+    match op:
+        case "parse":
+            timing = parse_timings[-1]
+            return {"mode": timing.mode, "seconds": timing.seconds}
+        case "method_spans":
+            return [
+                (start, end)
+                for name, _, start, end in method_declarations(tree)
+                if name == request["method_name"]
+            ]
+        case "classes_and_methods":
+            return class_methods(tree)
+        case _:
+            raise ValueError(f"Unknown parse service operation '{op}'")
+
+
+def _serve_connection(connection: Connection, lock: threading.Lock):
+    with connection:
+        while True:
+            try:
+                request = connection.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                # The ANTLR runtime is not thread-safe: one request is parsed at a time
+                with lock:
+                    result = handle_request(request)
+                connection.send({"ok": True, "result": result})
+            except Exception as e:
+                connection.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+def serve(address: str = DEFAULT_ADDRESS, warmup_dir: Optional[str] = None):
+    """Run the parse service until interrupted"""
+    authkey = get_authkey()
+    lock = threading.Lock()
+    if warmup_dir:
+        start = time.perf_counter()
+        java_files = list_java_files(warmup_dir)
+        for java_file in java_files:
+            file_path = os.path.join(warmup_dir, java_file)
+            parse_compilation_unit(read_source(file_path), file_path)
+        logger.info(
+            f"Parse service warmed up on {len(java_files)} files"
+            f" in {time.perf_counter() - start:.1f}s"
+        )
+
+    with Listener(parse_address(address), authkey=authkey) as listener:
+        logger.info(f"Parse service listening on {address}")
+        while True:
+            connection = listener.accept()
+            threading.Thread(
+                target=_serve_connection, args=(connection, lock), daemon=True
+            ).start()
+
+
+class ParseServiceClient:
+    """Connection of an agent to the parse service"""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.connection = Client(parse_address(address), authkey=get_authkey())
+
+    def request(self, op: str, **kwargs) -> Any:
+        try:
+            with get_telemetry().span(
+                "parse", f"service:{op}", file=kwargs.get("file_path")
+            ):
+                self.connection.send({"op": op, **kwargs})
+                response = self.connection.recv()
+        except (EOFError, OSError) as e:
+            raise ParseServiceError(f"Lost connection to {self.address}: {e}") from e
+        if not response["ok"]:
+            raise ParseServiceError(response["error"])
+        return response["result"]
+
+    def method_spans(self, file_path: str, method_name: str) -> list[tuple[int, int]]:
+        return [
+            tuple(span)
+            for span in self.request(
+                "method_spans",
+                source=read_source(file_path),
+                file_path=file_path,
+                method_name=method_name,
+            )
+        ]
+
+    def classes_and_methods(self, source: str) -> dict[str, list[str]]:
+        return self.request("classes_and_methods", source=source)
+
+    def close(self):
+        self.connection.close()
+
+
+_client: Optional[ParseServiceClient] = None
+
+
+def get_parse_service() -> Optional[ParseServiceClient]:
+    """Return a client of the parse service configured in the environment, if up"""
+    global _client
+    address = os.getenv(ADDRESS_ENV)
+    if not address:
+        return None
+    if _client is None or _client.address != address:
+        try:
+            _client = ParseServiceClient(address)
+        except (OSError, EOFError, AuthenticationError, ParseServiceError) as e:
+            logger.debug(f"Parse service at {address} is unavailable: {e}")
+            return None
+    return _client
+
+
+def drop_parse_service():
+    """Forget the connection, e.g. after it failed, so that the next call reconnects"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument(
+        "--address", default=os.getenv(ADDRESS_ENV, DEFAULT_ADDRESS)
+    )
+    arg_parser.add_argument(
+        "--warmup-dir", help="Parse every Java file of this directory before serving"
+    )
+    args = arg_parser.parse_args()
+    try:
+        serve(args.address, args.warmup_dir)
+    except ParseServiceError as e:
+        logger.error(f"Not starting the parse service: {e}")
+        raise SystemExit(1)
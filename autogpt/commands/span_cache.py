@@ -0,0 +1,223 @@
+"""Patch-aware cache of the method spans of Java files.
+
+Method spans are extracted once per file and cached until the file changes. When
+the patch engine edits a cached file it reports the edited line ranges: only the
+method enclosing the edits is re-lexed and re-scanned, and the spans of all other
+methods are shifted by the line delta of the edits preceding them. Post-patch
+queries thus cost in proportion to the edited method rather than the whole file.
+
+Edits that are not enclosed by a method body (new members, import changes, ...)
+or whose result does not re-scan as a single method of the same name fall back to
+a full extraction.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from autogpt.commands.java_extractor import (
+    AmbiguousSourceError,
+    MethodSpan,
+    extract_declarations,
+    read_source,
+)
+from autogpt.logs import logger
+
+WRAPPER_CLASS = "__PatchedMethod__"
+
+
+@dataclass
+class LineEdit:
+    """Replacement of the old lines start..end (inclusive) by new_line_count lines
+
+    An insertion before old line L is represented as start=L, end=L-1.
+    """
+
+    start: int
+    end: int
+    new_line_count: int
+
+    @property
+    def delta(self) -> int:
+        return self.new_line_count - (self.end - self.start + 1)
+
+
+@dataclass
+class _FileSpans:
+    signature: tuple[int, int]
+    line_count: int
+    methods: list[MethodSpan]
+
+
+def file_signature(file_path: str) -> tuple[int, int]:
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def shift_line(line: int, edits: list[LineEdit]) -> int:
+    """Map an old line number that no edit touches to its new number"""
+    return line + sum(edit.delta for edit in edits if edit.end < line)
+
+
+def _encloses(method: MethodSpan, edit: LineEdit) -> bool:
+    if edit.end < edit.start:
+        # Insertions must land after the method header and up to its closing line
+        return method.start_line < edit.start <= method.end_line
+    return method.start_line <= edit.start and edit.end <= method.end_line
+
+
+def rescan_method(
+    method: MethodSpan, lines: list[str], start_line: int, end_line: int
+) -> list[MethodSpan]:
+    """Re-scan a single method found at start_line..end_line of the patched file
+
+    Returns the spans of the method and of the methods nested in it, in file lines.
+
+    Raises:
+        AmbiguousSourceError: If the lines do not hold exactly that method anymore
+    """
+    text = "".join(lines[start_line - 1 : end_line])
+    _, methods = extract_declarations("class " + WRAPPER_CLASS + " {\n" + text + "\n}")
+    top_level = [m for m in methods if m.class_name == WRAPPER_CLASS]
+    if (
+        len(top_level) != 1
+        or top_level[0].name != method.name
+        or top_level[0].start_line != 2
+        or top_level[0].end_line != end_line - start_line + 2
+    ):
+        raise AmbiguousSourceError(
+            "Patched lines {}-{} are not the method {} anymore".format(
+                start_line, end_line, method.name
+            )
+        )
+
+    offset = start_line - 2
+    rescanned = []
+    for m in methods:
+        shifted = replace(
+            m, start_line=m.start_line + offset, end_line=m.end_line + offset
+        )
+        if m is top_level[0]:
+            shifted.class_name = method.class_name
+        rescanned.append(shifted)
+    return rescanned
+
+
+class MethodSpanCache:
+    """Method spans of the Java files read by the agent, kept in sync with patches"""
+
+    def __init__(self):
+        self.files: dict[str, _FileSpans] = {}
+        self.full_extractions = 0
+        self.incremental_updates = 0
+
+    def _extract(self, key: str) -> _FileSpans:
+        signature = file_signature(key)
+        source = read_source(key)
+        _, methods = extract_declarations(source)
+        self.full_extractions += 1
+        spans = _FileSpans(signature, len(source.splitlines()), methods)
+        self.files[key] = spans
+        return spans
+
+    def methods(self, file_path: str) -> list[MethodSpan]:
+        """Return all method spans of file_path
+
+        Raises:
+            AmbiguousSourceError: If the declarations cannot be delimited reliably
+        """
+        key = os.path.abspath(file_path)
+        spans = self.files.get(key)
+        if spans is None or spans.signature != file_signature(key):
+            spans = self._extract(key)
+        return spans.methods
+
+    def find(self, file_path: str, method_name: str) -> list[MethodSpan]:
+        """Return the spans of all methods called method_name (constructors excluded)"""
+        return [
+            m
+            for m in self.methods(file_path)
+            if m.name == method_name and not m.is_constructor
+        ]
+
+    def apply_patch(
+        self, file_path: str, edits: list[LineEdit], signature_before: tuple[int, int]
+    ) -> Optional[list[MethodSpan]]:
+        """Update the spans of a file that was just rewritten with the given edits
+
+        signature_before is the file_signature of the file just before the rewrite:
+        the cached spans are only updated if they describe that version of the file.
+
+        Returns the re-scanned method spans, or None when the file was not cached or
+        had to be extracted again in full.
+        """
+        key = os.path.abspath(file_path)
+        spans = self.files.pop(key, None)
+        if spans is None or not edits:
+            return None
+        if spans.signature != signature_before:
+            # The file changed since it was cached, e.g. reverted by a checkout
+            logger.debug("Cached spans of {} are stale".format(file_path))
+            return None
+
+        source = read_source(key)
+        lines = source.splitlines(keepends=True)
+        expected_line_count = spans.line_count + sum(edit.delta for edit in edits)
+        if len(source.splitlines()) != expected_line_count:
+            logger.debug("Edits of {} do not match its line count".format(file_path))
+            return None
+
+        # The outermost method body enclosing each edit is re-scanned as a whole
+        with_body = [m for m in spans.methods if m.has_body]
+        patched = []
+        for edit in edits:
+            enclosing = [m for m in with_body if _encloses(m, edit)]
+            if not enclosing:
+                return None
+            outermost = min(enclosing, key=lambda m: (m.start_line, -m.end_line))
+            if outermost not in patched:
+                patched.append(outermost)
+
+        methods = []
+        rescanned = []
+        try:
+            for method in spans.methods:
+                container = next(
+                    (
+                        p
+                        for p in patched
+                        if p.start_line <= method.start_line
+                        and method.end_line <= p.end_line
+                    ),
+                    None,
+                )
+                if container is None:
+                    methods.append(
+                        replace(
+                            method,
+                            start_line=shift_line(method.start_line, edits),
+                            end_line=shift_line(method.end_line, edits),
+                        )
+                    )
+                elif container is method:
+                    start_line = shift_line(method.start_line, edits)
+                    # Unlike untouched lines, the closing line moves with edits inside
+                    end_line = method.end_line + sum(
+                        edit.delta for edit in edits if edit.start <= method.end_line
+                    )
+                    new_spans = rescan_method(method, lines, start_line, end_line)
+                    rescanned.extend(new_spans)
+                    methods.extend(new_spans)
+        except AmbiguousSourceError as e:
+            logger.debug("Incremental update of {} failed: {}".format(file_path, e))
+            return None
+
+        methods.sort(key=lambda m: (m.start_line, -m.end_line))
+        self.files[key] = _FileSpans(file_signature(key), expected_line_count, methods)
+        self.incremental_updates += 1
+        return rescanned
+
+
+method_span_cache = MethodSpanCache()
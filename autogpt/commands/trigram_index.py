@@ -0,0 +1,231 @@
+"""Trigram index for full-text search over the Java files of a checkout.
+
+Every file is indexed by the set of 3-character substrings it contains. A query is
+answered by intersecting the posting lists of the trigrams the query must contain,
+then running the actual literal or regex match on the few candidate files only.
+For regexes, the required trigrams are taken from the literal runs that every match
+must contain; patterns without such runs fall back to matching every file.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from autogpt.commands.java_extractor import read_source
+from autogpt.logs import logger
+from create_files_index import list_java_files
+
+REGEX_METACHARS = set(".^$*+?()[]{}|")
+OPTIONAL_QUANTIFIERS = set("*?{")
+# Number of characters that follow the letter of a fixed-length escape like \x41
+ESCAPE_LENGTHS = {"x": 2, "u": 4, "U": 8}
+
+
+def escape_end(pattern: str, i: int) -> int:
+    """Index just past the escape sequence whose letter is at pattern[i]"""
+    escaped = pattern[i]
+    if escaped in ESCAPE_LENGTHS:
+        return min(i + 1 + ESCAPE_LENGTHS[escaped], len(pattern))
+    if escaped == "N" and pattern.startswith("{", i + 1):
+        close = pattern.find("}", i)
+        return close + 1 if close != -1 else len(pattern)
+    if escaped.isdigit():
+        # Octal escapes (\0, \012) and group references (\1, \12)
+        end = i + 1
+        while end < len(pattern) and end < i + 3 and pattern[end].isdigit():
+            end += 1
+        return end
+    return i + 1
+
+
+def class_end(pattern: str, i: int) -> int:
+    """Index just past the character class that opens at pattern[i]"""
+    end = i + 1
+    if pattern.startswith("^", end):
+        end += 1
+    if pattern.startswith("]", end):
+        # A leading "]" is a member of the class, not its end
+        end += 1
+    while end < len(pattern):
+        if pattern[end] == "\\":
+            end += 2
+        elif pattern[end] == "]":
+            return end + 1
+        else:
+            end += 1
+    return len(pattern)
+
+
+@dataclass
+class TextHit:
+    """A line of a file that matches a search query"""
+
+    file_path: str
+    line: int
+    text: str
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def required_literals(pattern: str) -> list[str]:
+    """Return literal substrings that every match of the regex pattern contains
+
+    The analysis is conservative: alternations and inline flags disable it, and only
+    runs outside of groups and character classes are considered.
+    """
+    if "|" in pattern or "(?" in pattern:
+        return []
+    literals = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            i = escape_end(pattern, i + 1)
+            if escaped.isalnum():
+                # Character classes like \d or \s, anchors like \b, and the character
+                # codes and group references like \x41 or \1, which are skipped whole
+                literals.append(current)
+                current = ""
+            elif depth == 0:
+                current += escaped
+            continue
+        if char == "[":
+            literals.append(current)
+            current = ""
+            i = class_end(pattern, i)
+            continue
+        if char in REGEX_METACHARS:
+            if char in OPTIONAL_QUANTIFIERS:
+                current = current[:-1]
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth = max(0, depth - 1)
+            literals.append(current)
+            current = ""
+            if char == "{":
+                close = pattern.find("}", i)
+                i = close if close != -1 else len(pattern)
+        elif depth == 0:
+            current += char
+        i += 1
+    literals.append(current)
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+class TrigramIndex:
+    """Maps trigrams to the files of a project that contain them"""
+
+    def __init__(self):
+        self.files: list[str] = []
+        self.contents: list[str] = []
+        # Posting lists are sorted, since file ids are assigned in insertion order
+        self.postings: defaultdict[str, list[int]] = defaultdict(list)
+        self._line_offsets: dict[int, list[int]] = {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def add(self, file_path: str, content: str):
+        file_id = len(self.files)
+        self.files.append(file_path)
+        self.contents.append(content)
+        for trigram in trigrams(content):
+            self.postings[trigram].append(file_id)
+
+    @classmethod
+    def build(cls, project_dir: str) -> TrigramIndex:
+        index = cls()
+        for java_file in list_java_files(project_dir):
+            file_path = os.path.relpath(
+                os.path.join(project_dir, java_file), project_dir
+            )
+            index.add(file_path, read_source(os.path.join(project_dir, file_path)))
+        return index
+
+    def candidates(self, literals: list[str]) -> list[int]:
+        """Return the ids of the files containing all trigrams of all literals"""
+        required = set().union(*(trigrams(literal) for literal in literals))
+        if not required:
+            return list(range(len(self.files)))
+        posting_lists = sorted(
+            (self.postings.get(trigram, []) for trigram in required), key=len
+        )
+        file_ids = set(posting_lists[0])
+        for posting_list in posting_lists[1:]:
+            file_ids.intersection_update(posting_list)
+            if not file_ids:
+                break
+        return sorted(file_ids)
+
+    def line_number(self, file_id: int, offset: int) -> int:
+        if file_id not in self._line_offsets:
+            content = self.contents[file_id]
+            self._line_offsets[file_id] = [0] + [
+                m.end() for m in re.finditer("\n", content)
+            ]
+        return bisect_right(self._line_offsets[file_id], offset)
+
+    def search(
+        self, query: str, is_regex: bool = False, max_hits: Optional[int] = 50
+    ) -> list[TextHit]:
+        """Return the lines matching a literal or regex query, in file order
+
+        Raises:
+            re.error: If query is an invalid regex
+        """
+        if is_regex:
+            pattern = re.compile(query, re.MULTILINE)
+            literals = required_literals(query)
+        else:
+            pattern = re.compile(re.escape(query))
+            literals = [query]
+
+        hits = []
+        for file_id in self.candidates(literals):
+            content = self.contents[file_id]
+            last_line = 0
+            for match in pattern.finditer(content):
+                line = self.line_number(file_id, match.start())
+                if line == last_line:
+                    continue
+                last_line = line
+                line_start = self._line_offsets[file_id][line - 1]
+                line_end = content.find("\n", line_start)
+                text = content[
+                    line_start : line_end if line_end != -1 else len(content)
+                ]
+                hits.append(TextHit(self.files[file_id], line, text.strip()))
+                if max_hits is not None and len(hits) >= max_hits:
+                    return hits
+        return hits
+
+
+_loaded_indexes: dict[str, TrigramIndex] = {}
+
+
+def get_trigram_index(workspace: str, project_dir: str) -> TrigramIndex:
+    """Return the trigram index of a checkout, building it on first use
+
+    Checkouts are restored after every test run, so the index of the original
+    sources stays valid for the whole session.
+    """
+    project_path = os.path.join(workspace, project_dir)
+    if project_path not in _loaded_indexes:
+        _loaded_indexes[project_path] = TrigramIndex.build(project_path)
+        logger.debug(
+            "Built trigram index of {} files for {}".format(
+                len(_loaded_indexes[project_path]), project_dir
+            )
+        )
+    return _loaded_indexes[project_path]
@@ -0,0 +1,125 @@
+"""Prompt assets and command metadata shared by all agents of a process.
+
+The files are resolved relative to the repository root rather than the working
+directory, read once when the bundle is created, and kept in memory. Accessing a
+resource only checks the modification time of its file, so edits made while an
+agent runs (e.g. regenerating `commands_by_state.json` or a new entry in the
+experiments list) are picked up on the next access without re-reading unchanged
+files every cycle.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+PROJECT_ROOT = Path(__file__).parents[2]
+
+
+def read_text(path: Path) -> str:
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def read_json(path: Path) -> Any:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def read_lines(path: Path) -> list[str]:
+    return read_text(path).splitlines()
+
+
+class Resource:
+    """The content of a file, reloaded when the file's modification time changes"""
+
+    def __init__(self, path: Path, loader: Callable[[Path], Any]):
+        self.path = path
+        self.loader = loader
+        self.mtime_ns: Optional[int] = None
+        self.value: Any = None
+
+    def get(self) -> Any:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if mtime_ns != self.mtime_ns:
+            self.value = self.loader(self.path)
+            self.mtime_ns = mtime_ns
+        return self.value
+
+
+class ResourceBundle:
+    """The prompt assets of the repository, loaded once and hot-reloaded on change"""
+
+    def __init__(self, root: Path = PROJECT_ROOT):
+        self.root = root
+        self.resources = {
+            "commands_interface": Resource(root / "commands_interface.json", read_json),
+            "commands_by_state": Resource(root / "commands_by_state.json", read_json),
+            "states_description": Resource(root / "states_description.json", read_json),
+            "cycle_instruction": Resource(
+                root / "cycle_instruction_text.txt", read_text
+            ),
+            "hints": Resource(root / "hints.txt", read_text),
+            "experiments": Resource(
+                root / "experimental_setups" / "experiments_list.txt", read_lines
+            ),
+        }
+
+    def preload(self):
+        """Read every resource that exists, so that agents start with a warm bundle"""
+        for resource in self.resources.values():
+            if resource.path.exists():
+                resource.get()
+
+    def resolve(self, path: str | Path) -> Path:
+        """Resolve a user-given path, falling back to the repository root if relative"""
+        path = Path(path)
+        if path.is_absolute() or path.exists():
+            return path
+        return self.root / path
+
+    def load_json(self, path: str | Path) -> Any:
+        return read_json(self.resolve(path))
+
+    @property
+    def commands_interface(self) -> dict[str, list[str]]:
+        return self.resources["commands_interface"].get()
+
+    @property
+    def commands_by_state(self) -> dict[str, str]:
+        return self.resources["commands_by_state"].get()
+
+    @property
+    def states_description(self) -> dict[str, str]:
+        return self.resources["states_description"].get()
+
+    @property
+    def cycle_instruction(self) -> str:
+        return self.resources["cycle_instruction"].get()
+
+    @property
+    def hints(self) -> str:
+        return self.resources["hints"].get()
+
+    @property
+    def experiments(self) -> list[str]:
+        return self.resources["experiments"].get()
+
+    @property
+    def experiment_dir(self) -> Path:
+        """Output folder of the current experiment, the last of the experiments list"""
+        return self.root / "experimental_setups" / self.experiments[-1]
+
+
+_bundle: Optional[ResourceBundle] = None
+
+
+def get_resources() -> ResourceBundle:
+    """Return the resource bundle of the process, loading it on first use"""
+    global _bundle
+    if _bundle is None:
+        _bundle = ResourceBundle()
+        _bundle.preload()
+    return _bundle
@@ -65,7 +65,7 @@ async def interaction_step(
     if command_name is not None:
         result = agent.execute(command_name, command_args, user_input)
         if " 0 failing test" in result:
-            with open(os.path.join("experimental_setups", exps[-1], "plausible_patches", "plausible_patches_{}_{}.json".format(agent.project_name, agent.bug_index)), "a+") as exps:
+            with open(os.path.join(agent.experiment_dir, "plausible_patches", "plausible_patches_{}_{}.json".format(agent.project_name, agent.bug_index)), "a+") as exps:
                 exps.write("### PLAUSIBLE FIX\n{}\n".format(str(command_args["changes_dicts"])))
         if result is None:
             logger.typewriter_log("SYSTEM: ", Fore.YELLOW, "Unable to execute command")
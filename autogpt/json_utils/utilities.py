@@ -7,6 +7,7 @@ from typing import Any, Literal
 from jsonschema import Draft7Validator
 
 from autogpt.config import Config
+from autogpt.config.resources import get_resources
 from autogpt.logs import logger
 
 LLM_DEFAULT_RESPONSE_FORMAT = "llm_response_format_1"
@@ -44,6 +45,26 @@ def extract_dict_from_response(response_content: str) -> dict[str, Any]:
         return {}
 
 
+def load_commands_interface() -> dict[str, list[str]]:
+    """Return the arguments expected by each command, kept in memory by the resource bundle"""
+    return get_resources().commands_interface
+
+
+def validate_command_args(response_dict: dict[str, Any]) -> bool:
+    """Whether the command of a parsed response names a known command with exactly its arguments"""
+    if not isinstance(response_dict, dict):
+        return False
+    command_dict = response_dict.get("command", {"name": "", "args": {}})
+    if not isinstance(command_dict, dict):
+        return False
+    commands_interface = load_commands_interface()
+    if command_dict.get("name") not in commands_interface:
+        return False
+    if not isinstance(command_dict.get("args"), dict):
+        return False
+    return set(command_dict["args"].keys()) == set(commands_interface[command_dict["name"]])
+
+
 def llm_response_schema(
     config: Config, schema_name: str = LLM_DEFAULT_RESPONSE_FORMAT
 ) -> dict[str, Any]:
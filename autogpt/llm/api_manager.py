@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 from typing import List, Optional
 
 import openai
@@ -7,6 +8,7 @@ from openai import Model
 
 from autogpt.llm.base import CompletionModelInfo
 from autogpt.logs import logger
+from autogpt.logs.telemetry import get_telemetry
 from autogpt.singleton import Singleton
 
 
@@ -17,6 +19,7 @@ class ApiManager(metaclass=Singleton):
         self.total_cost = 0
         self.total_budget = 0
         self.models: Optional[list[Model]] = None
+        self.lock = threading.Lock()
 
     def reset(self):
         self.total_prompt_tokens = 0
@@ -33,6 +36,9 @@ class ApiManager(metaclass=Singleton):
         prompt_tokens (int): The number of tokens used in the prompt.
         completion_tokens (int): The number of tokens used in the completion.
         model (str): The model used for the API call.
+
+        Returns:
+        float: The cost of the API call.
         """
         # the .model property in API responses can contain version suffixes like -v2
         from autogpt.llm.providers.openai import OPEN_AI_MODELS
@@ -40,15 +46,40 @@ class ApiManager(metaclass=Singleton):
         model = model[:-3] if model.endswith("-v2") else model
         model_info = OPEN_AI_MODELS[model]
 
-        self.total_prompt_tokens += prompt_tokens
-        self.total_completion_tokens += completion_tokens
-        self.total_cost += prompt_tokens * model_info.prompt_token_cost / 1000
+        cost = prompt_tokens * model_info.prompt_token_cost / 1000
         if issubclass(type(model_info), CompletionModelInfo):
-            self.total_cost += (
-                completion_tokens * model_info.completion_token_cost / 1000
-            )
+            cost += completion_tokens * model_info.completion_token_cost / 1000
+
+        # Requests may complete concurrently on several threads
+        with self.lock:
+            self.total_prompt_tokens += prompt_tokens
+            self.total_completion_tokens += completion_tokens
+            self.total_cost += cost
 
         logger.debug(f"Total running cost: ${self.total_cost:.3f}")
+        return cost
+
+    def record_call(self, model, seconds, status, prompt_tokens=0, completion_tokens=0, cost=0.0):
+        """
+        Record the latency, tokens and cost of one API call in the telemetry.
+
+        Args:
+        model (str): The model used for the API call.
+        seconds (float): The duration of the call, retries included.
+        status (str): "ok", or "error" if the call failed.
+        prompt_tokens (int): The number of tokens used in the prompt.
+        completion_tokens (int): The number of tokens used in the completion.
+        cost (float): The cost of the call, as returned by update_cost.
+        """
+        get_telemetry().record(
+            "llm",
+            model,
+            seconds,
+            status=status,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=round(cost, 6),
+        )
 
     def set_total_budget(self, total_budget):
         """
@@ -38,10 +38,35 @@ class Message:
     role: MessageRole
     content: str
     type: MessageType | None = None
+    _parsed: Optional[tuple[str, dict, bool]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def raw(self) -> MessageDict:
         return {"role": self.role, "content": self.content}
 
+    def _parse(self) -> tuple[str, dict, bool]:
+        from autogpt.json_utils.utilities import (
+            extract_dict_from_response,
+            validate_command_args,
+        )
+
+        if self._parsed is None or self._parsed[0] is not self.content:
+            response_dict = extract_dict_from_response(self.content)
+            self._parsed = (self.content, response_dict, validate_command_args(response_dict))
+        return self._parsed
+
+    def parsed_response(self) -> dict:
+        """The dict in the content of an assistant reply, parsed once per content
+
+        The returned dict is shared between calls and must not be modified.
+        """
+        return self._parse()[1]
+
+    def has_valid_command(self) -> bool:
+        """Whether the reply calls a known command with exactly its arguments"""
+        return self._parse()[2]
+
 
 @dataclass
 class ModelInfo:
@@ -92,6 +117,10 @@ class ChatSequence:
 
     model: ChatModelInfo
     messages: list[Message] = field(default_factory=list[Message])
+    _counted: list[tuple[Message, str, str, int]] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    """(message, role, content, tokens) of the leading messages counted by token_length"""
 
     @overload
     def __getitem__(self, key: int) -> Message:
@@ -150,9 +179,21 @@ class ChatSequence:
 
     @property
     def token_length(self) -> int:
-        from autogpt.llm.utils import count_message_tokens
-
-        return count_message_tokens(self.messages, self.model.name)
+        """The token length of the sequence, counting only the messages changed since the last call"""
+        from autogpt.llm.utils import REPLY_PRIMING_TOKENS, count_single_message_tokens
+
+        counted = self._counted
+        unchanged = 0
+        for (message, role, content, _), current in zip(counted, self.messages):
+            if current is not message or current.role != role or current.content is not content:
+                break
+            unchanged += 1
+        del counted[unchanged:]
+        for message in self.messages[unchanged:]:
+            counted.append(
+                (message, message.role, message.content, count_single_message_tokens(message, self.model.name))
+            )
+        return sum(tokens for *_, tokens in counted) + REPLY_PRIMING_TOKENS
 
     def raw(self) -> list[MessageDict]:
         return [m.raw() for m in self.messages]
@@ -0,0 +1,143 @@
+"""Record/replay cache of LLM requests.
+
+Every LLM call of the agent and of the Defects4J helper commands goes through
+`LLMCache.fetch`, which keys the request by a hash of its content (model, messages
+and sampling parameters, never the credentials). The mode is selected with the
+LLM_CACHE_MODE environment variable:
+
+* passthrough (default): requests go to the API and nothing is stored;
+* record: requests go to the API and their responses are stored;
+* replay: responses are served from the cache only; a request that was not
+  recorded raises LLMCacheMiss instead of calling the API.
+
+Identical requests made several times in a run are told apart by their occurrence
+number, so a replay returns the recorded responses in the recorded order and the
+agent follows the same trajectory, without any API call. Responses are stored in
+an SQLite database (LLM_CACHE_PATH), which processes running bugs in parallel can
+share. When parallel runs record the same request and occurrence (e.g. two runs of
+one bug), the first recording is kept: a later run cannot overwrite the responses
+that an earlier trajectory is replayed from.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Callable, Optional, TypeVar
+
+from autogpt.config.resources import PROJECT_ROOT
+from autogpt.logs import logger
+
+T = TypeVar("T")
+
+MODES = ("passthrough", "record", "replay")
+
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "passthrough")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(PROJECT_ROOT / "llm_cache.sqlite"))
+
+
+class LLMCacheMiss(Exception):
+    """A request was not found in the cache while replaying"""
+
+
+def request_key(request: dict) -> str:
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class LLMCache:
+    """Stores and serves LLM responses by request hash and occurrence"""
+
+    def __init__(self, mode: str = "passthrough", path: Optional[str] = None):
+        if mode not in MODES:
+            raise ValueError(
+                "Unknown LLM cache mode {}, expected one of {}".format(
+                    mode, ", ".join(MODES)
+                )
+            )
+        self.mode = mode
+        self.path = path
+        self.lock = threading.Lock()
+        self.occurrences: Counter[str] = Counter()
+        self.db: Optional[sqlite3.Connection] = None
+        if mode != "passthrough":
+            self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT, occurrence INTEGER, request TEXT, response TEXT, "
+                "PRIMARY KEY (key, occurrence))"
+            )
+            self.db.commit()
+
+    def fetch(
+        self,
+        request: dict,
+        create: Callable[[], T],
+        dump: Callable[[T], Any] = lambda response: response,
+        load: Callable[[Any], T] = lambda data: data,
+    ) -> T:
+        """Return the response to request, calling create only if it must be sent
+
+        dump and load convert the response to and from JSON-serializable data.
+        """
+        if self.mode == "passthrough":
+            return create()
+
+        key = request_key(request)
+        with self.lock:
+            occurrence = self.occurrences[key]
+            self.occurrences[key] += 1
+
+        if self.mode == "replay":
+            with self.lock:
+                row = self.db.execute(
+                    "SELECT response FROM responses WHERE key = ? AND occurrence = ?",
+                    (key, occurrence),
+                ).fetchone()
+            if row is None:
+                raise LLMCacheMiss(
+                    "No recorded response for request {} (occurrence {}) in {}".format(
+                        key[:12], occurrence, self.path
+                    )
+                )
+            return load(json.loads(row[0]))
+
+        response = create()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?)",
+                (
+                    key,
+                    occurrence,
+                    json.dumps(request, default=str),
+                    json.dumps(dump(response)),
+                ),
+            )
+            self.db.commit()
+        return response
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    """Return the LLM cache of the process, configured from the environment"""
+    global _cache
+    if _cache is None:
+        _cache = LLMCache(LLM_CACHE_MODE, LLM_CACHE_PATH)
+        if _cache.mode != "passthrough":
+            logger.info(
+                "LLM cache: {} mode, using {}".format(_cache.mode, LLM_CACHE_PATH)
+            )
+    return _cache
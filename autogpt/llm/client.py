@@ -0,0 +1,158 @@
+"""The LLM client shared by the agent loop and the Defects4J helper commands.
+
+All chat completions of a process go through one `LLMClient`: it sends them over a
+single pooled HTTP session, so connections to the API are reused across calls and
+threads, and through `create_chat_completion` of the OpenAI provider, so every call
+gets the same rate-limit-aware retries and is metered by the ApiManager. Requests,
+and each of their retries, are only sent once the LLM scheduler grants them capacity
+under the rate limits.
+
+Requests that do not depend on each other can be issued concurrently with
+`LLMClient.submit`, which runs them on the client's thread pool.
+
+The endpoint can be swapped for any OpenAI-compatible server (e.g. a local mock)
+with the LLM_API_BASE environment variable, or by installing another client with
+`set_llm_client`.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+import openai
+import requests
+from openai.openai_object import OpenAIObject
+from requests.adapters import HTTPAdapter
+
+from autogpt.llm.base import MessageDict
+from autogpt.llm.cache import get_llm_cache
+from autogpt.llm.providers import openai as iopenai
+from autogpt.llm.scheduler import AUXILIARY, MAIN, get_scheduler
+from autogpt.logs import logger
+
+T = TypeVar("T")
+
+POOL_SIZE = 16
+
+
+class LLMClient:
+    """Chat completions over a pooled HTTP session, with shared retries and metering"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_base: Optional[str] = None,
+        pool_size: int = POOL_SIZE,
+    ):
+        self.api_key = api_key
+        self.api_base = api_base
+        """Overrides the API base of every request if set"""
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        openai.requestssession = self.session
+        self.executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="llm"
+        )
+
+    def chat_completion(
+        self, messages: list[MessageDict], priority: int = MAIN, **kwargs
+    ) -> OpenAIObject:
+        """Send a chat completion request once the scheduler allows it
+
+        kwargs are passed to the OpenAI API.
+        """
+        if kwargs.get("api_key") is None and self.api_key is not None:
+            kwargs["api_key"] = self.api_key
+        if self.api_base is not None:
+            kwargs["api_base"] = self.api_base
+
+        model = kwargs.get("model", "")
+        estimated_tokens = estimate_tokens(messages, model) + (
+            kwargs.get("max_tokens") or 0
+        )
+        scheduler = get_scheduler()
+
+        def acquire():
+            waited = scheduler.acquire(model, estimated_tokens, priority)
+            if waited > 1:
+                logger.debug(f"Waited {waited:.1f}s for the rate limits of {model}")
+
+        def reacquire():
+            # The rejected attempt used no tokens; the retry is a new request
+            scheduler.settle(model, estimated_tokens, 0)
+            acquire()
+
+        acquire()
+        response = iopenai.create_chat_completion(
+            messages=messages, before_retry=reacquire, **kwargs
+        )
+        usage = response.get("usage")
+        if usage and "total_tokens" in usage:
+            scheduler.settle(model, estimated_tokens, usage["total_tokens"])
+        return response
+
+    def chat(self, messages: list[MessageDict], model: str, **kwargs) -> str:
+        """Return the content of the reply to messages, through the LLM cache
+
+        These are auxiliary requests: the scheduler serves the agent loop first.
+        """
+        request = {"model": model, "messages": messages, **kwargs}
+        response = get_llm_cache().fetch(
+            request,
+            lambda: self.chat_completion(
+                messages, priority=AUXILIARY, model=model, **kwargs
+            ),
+            dump=lambda response: response.to_dict_recursive(),
+            load=openai.util.convert_to_openai_object,
+        )
+        return response.choices[0].message["content"]
+
+    def submit(self, request: Callable[..., T], *args, **kwargs) -> Future[T]:
+        """Run an LLM request in the background, to join it where its result is used"""
+        return self.executor.submit(request, *args, **kwargs)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if openai.requestssession is self.session:
+            openai.requestssession = None
+        self.session.close()
+
+
+def estimate_tokens(messages: list[MessageDict], model: str) -> int:
+    from autogpt.llm.base import Message
+    from autogpt.llm.utils.token_counter import count_message_tokens
+
+    try:
+        return count_message_tokens(
+            [Message(m["role"], m["content"]) for m in messages], model
+        )
+    except NotImplementedError:
+        # About four characters per token for models without a known tokenizer
+        return sum(len(m["content"]) for m in messages) // 4
+
+
+_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Return the LLM client of the process, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = LLMClient(
+            api_key=os.getenv("OPENAI_KEY") or os.getenv("OPENAI_API_KEY"),
+            api_base=os.getenv("LLM_API_BASE"),
+        )
+    return _client
+
+
+def set_llm_client(client: Optional[LLMClient]):
+    """Replace the LLM client of the process, e.g. with one for a local stand-in"""
+    global _client
+    if _client is not None and _client is not client:
+        _client.close()
+    _client = client
@@ -0,0 +1,328 @@
+"""Local OpenAI-compatible server standing in for the LLM, for offline benchmarks.
+
+The server implements the parts of the OpenAI API that the agent uses
+(`POST /v1/chat/completions` and `GET /v1/models`) and answers without any model,
+so that runs measure the agent's own overhead: prompt building, parsing, logging
+and the Defects4J commands. Replies are taken, in order of preference, from:
+
+* responses recorded in an LLM cache database (see autogpt/llm/cache.py), matched
+  on model and messages and served in their recorded order;
+* a script, a JSON list of replies: plain strings are served in turn, objects
+  {"match": ..., "content": ...} whenever the last message contains "match";
+* a default reply that has the agent run the tests of the bug named in its goals
+  (or, for prompts that name no bug, declare the goals accomplished).
+
+Every reply is delayed by a configurable latency (fixed, plus jitter, plus a
+per-completion-token delay), and a share of the requests can be answered with
+rate-limit errors to exercise the retries and the LLM scheduler.
+
+Start it in-process with `MockLLMServer(...).start()`, or as a process with
+`python -m autogpt.llm.mock_server [--address host:port] [--cache llm_cache.sqlite]
+[--script replies.json] [--latency 1.5]`, and point the agent at it by exporting
+LLM_API_BASE and OPENAI_API_BASE_URL=http://host:port/v1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+from autogpt.logs import logger
+
+DEFAULT_ADDRESS = "localhost:6030"
+
+DEFAULT_REPLY = json.dumps(
+    {
+        "thoughts": "Mock reply: no bug is named in the prompt.",
+        "command": {"name": "goals_accomplished", "args": {"reason": "Mock reply"}},
+    }
+)
+
+# How the agent's goals name its bug (see prepare_ai_settings.py)
+BUG_GOAL = re.compile(r'bug within the project "?([\w.-]+)"? and bug index "?(\d+)"?')
+
+MODELS = ["gpt-3.5-turbo", "gpt-3.5-turbo-16k", "gpt-4"]
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port)
+
+
+def conversation_key(model: str, messages: list[dict]) -> str:
+    """Key of a conversation, ignoring the sampling parameters and message names"""
+    conversation = [(m.get("role"), m.get("content")) for m in messages]
+    return hashlib.sha256(json.dumps([model, conversation]).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    # About four characters per token, without loading a tokenizer
+    return max(1, len(text) // 4)
+
+
+def default_reply_to(messages: list[dict]) -> str:
+    """Run the tests of the bug named in the messages, else DEFAULT_REPLY"""
+    for message in messages:
+        match = BUG_GOAL.search(str(message.get("content") or ""))
+        if match:
+            return json.dumps(
+                {
+                    "thoughts": "Mock reply: running the test cases.",
+                    "command": {
+                        "name": "run_tests",
+                        "args": {
+                            "project_name": match.group(1),
+                            "bug_index": match.group(2),
+                        },
+                    },
+                }
+            )
+    return DEFAULT_REPLY
+
+
+def load_recorded_responses(path: str) -> dict[str, list[dict]]:
+    """The chat responses of an LLM cache database by conversation, in recorded order"""
+    recorded = defaultdict(list)
+    with sqlite3.connect(path) as db:
+        rows = db.execute(
+            "SELECT request, response FROM responses ORDER BY key, occurrence"
+        ).fetchall()
+    for request, response in rows:
+        request, response = json.loads(request), json.loads(response)
+        if "messages" in request and "choices" in response:
+            recorded[
+                conversation_key(request.get("model", ""), request["messages"])
+            ].append(response)
+    return dict(recorded)
+
+
+@dataclass
+class MockLLM:
+    """Chooses the reply to a chat completion request"""
+
+    recorded: dict[str, list[dict]] = field(default_factory=dict)
+    script: list[str | dict] = field(default_factory=list)
+    default_reply: Optional[str] = None
+    """Served when no recording or script applies, instead of default_reply_to()"""
+    latency: float = 0.0
+    """Seconds before every reply"""
+    jitter: float = 0.0
+    """Up to this many seconds added at random to the latency"""
+    latency_per_token: float = 0.0
+    """Seconds per completion token, as a model streaming its reply would take"""
+    rate_limit_rate: float = 0.0
+    """Share of the requests answered with a rate-limit error"""
+
+    def __post_init__(self):
+        self.lock = threading.Lock()
+        self.served: dict[str, int] = defaultdict(int)
+        self.turns = itertools.cycle(
+            [r for r in self.script if isinstance(r, str)] or [None]
+        )
+        self.requests = 0
+
+    def rate_limited(self) -> bool:
+        return self.rate_limit_rate > 0 and random.random() < self.rate_limit_rate
+
+    def reply(self, request: dict) -> dict:
+        """The chat completion responding to request"""
+        model = request.get("model", "")
+        messages = request.get("messages", [])
+        with self.lock:
+            self.requests += 1
+            key = conversation_key(model, messages)
+            if key in self.recorded:
+                responses = self.recorded[key]
+                # Repeated conversations get the next recording, then the last one again
+                response = responses[min(self.served[key], len(responses) - 1)]
+                self.served[key] += 1
+                return response
+            content = self.scripted_reply(messages)
+
+        prompt_tokens = sum(
+            estimate_tokens(str(m.get("content") or "")) for m in messages
+        )
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": "chatcmpl-mock-{}".format(self.requests),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def scripted_reply(self, messages: list[dict]) -> str:
+        last = str(messages[-1].get("content") or "") if messages else ""
+        for reply in self.script:
+            if isinstance(reply, dict) and reply.get("match", "") in last:
+                return reply["content"]
+        return next(self.turns) or self.default_reply or default_reply_to(messages)
+
+    def delay(self, response: dict) -> float:
+        completion_tokens = response.get("usage", {}).get("completion_tokens", 0)
+        return (
+            self.latency
+            + random.uniform(0, self.jitter)
+            + completion_tokens * self.latency_per_token
+        )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _MockHTTPServer
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self.send_json(
+                200,
+                {
+                    "object": "list",
+                    "data": [
+                        {"id": name, "object": "model", "owned_by": "mock"}
+                        for name in MODELS
+                    ],
+                },
+            )
+        else:
+            self.send_error_json(
+                404, f"Unknown path {self.path}", "invalid_request_error"
+            )
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error_json(
+                404, f"Unknown path {self.path}", "invalid_request_error"
+            )
+            return
+        try:
+            request = json.loads(
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            )
+        except (ValueError, json.JSONDecodeError) as e:
+            self.send_error_json(
+                400, f"Invalid request body: {e}", "invalid_request_error"
+            )
+            return
+
+        llm = self.server.llm
+        if llm.rate_limited():
+            time.sleep(llm.latency)
+            self.send_error_json(
+                429, "Rate limit reached (mock)", "rate_limit_exceeded"
+            )
+            return
+        response = llm.reply(request)
+        time.sleep(llm.delay(response))
+        self.send_json(200, response)
+
+    def send_json(self, status: int, body: Any):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status: int, message: str, error_type: str):
+        self.send_json(
+            status,
+            {"error": {"message": message, "type": error_type, "code": error_type}},
+        )
+
+    def log_message(self, format: str, *args):
+        logger.debug("Mock LLM server: " + format % args)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], llm: MockLLM):
+        super().__init__(address, _Handler)
+        self.llm = llm
+
+
+class MockLLMServer:
+    """The mock LLM served over HTTP on a background thread"""
+
+    def __init__(self, llm: Optional[MockLLM] = None, address: str = "localhost:0"):
+        self.llm = llm if llm is not None else MockLLM()
+        self.httpd = _MockHTTPServer(parse_address(address), self.llm)
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> MockLLMServer:
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> MockLLMServer:
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--address", default=DEFAULT_ADDRESS)
+    arg_parser.add_argument(
+        "--cache", help="LLM cache database to serve recorded responses from"
+    )
+    arg_parser.add_argument("--script", help="JSON file listing the replies to serve")
+    arg_parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds before every reply"
+    )
+    arg_parser.add_argument(
+        "--jitter", type=float, default=0.0, help="random extra seconds, at most"
+    )
+    arg_parser.add_argument("--latency-per-token", type=float, default=0.0)
+    arg_parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = arg_parser.parse_args()
+
+    script = []
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    llm = MockLLM(
+        recorded=load_recorded_responses(args.cache) if args.cache else {},
+        script=script,
+        latency=args.latency,
+        jitter=args.jitter,
+        latency_per_token=args.latency_per_token,
+        rate_limit_rate=args.rate_limit_rate,
+    )
+    server = MockLLMServer(llm, args.address)
+    logger.info(f"Mock LLM server listening on {server.api_base}")
+    try:
+        server.httpd.serve_forever()
+    finally:
+        server.httpd.server_close()
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import functools
+import random
+import threading
 import time
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Callable, List, Optional
+from typing import Any, Callable, List, Optional
 from unittest.mock import patch
 
 import openai
@@ -19,6 +22,7 @@ from autogpt.llm.base import (
     TextModelInfo,
     TText,
 )
+from autogpt.llm.scheduler import get_scheduler
 from autogpt.logs import logger
 from autogpt.models.command_registry import CommandRegistry
 
@@ -117,6 +121,40 @@ OPEN_AI_MODELS: dict[str, ChatModelInfo | EmbeddingModelInfo | TextModelInfo] =
 }
 
 
+_metering_lock = threading.Lock()
+_metered_calls = 0
+_metering_patch = None
+_call_usage = threading.local()
+"""Usage of the metered call in flight on each thread"""
+
+
+@contextmanager
+def _metering(wrapper: Callable):
+    """Route converted API responses through wrapper while metered calls are running
+
+    The conversion function is patched once for all the metered calls in flight, so
+    that calls made concurrently from several threads do not undo each other's patch.
+    """
+    global _metered_calls, _metering_patch
+    with _metering_lock:
+        if _metered_calls == 0:
+            _metering_patch = patch.object(
+                engine_api_resource.util,
+                "convert_to_openai_object",
+                side_effect=wrapper,
+            )
+            _metering_patch.start()
+        _metered_calls += 1
+    try:
+        yield
+    finally:
+        with _metering_lock:
+            _metered_calls -= 1
+            if _metered_calls == 0:
+                _metering_patch.stop()
+                _metering_patch = None
+
+
 def meter_api(func: Callable):
     """Adds ApiManager metering to functions which make OpenAI API calls"""
     from autogpt.llm.api_manager import ApiManager
@@ -129,11 +167,14 @@ def meter_api(func: Callable):
         try:
             usage = response.usage
             logger.debug(f"Reported usage from call to model {response.model}: {usage}")
-            api_manager.update_cost(
-                response.usage.prompt_tokens,
-                response.usage.completion_tokens if "completion_tokens" in usage else 0,
-                response.model,
-            )
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens if "completion_tokens" in usage else 0
+            cost = api_manager.update_cost(prompt_tokens, completion_tokens, response.model)
+            _call_usage.value = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost": cost,
+            }
         except Exception as err:
             logger.warn(f"Failed to update API costs: {err.__class__.__name__}: {err}")
 
@@ -144,12 +185,18 @@ def meter_api(func: Callable):
         return openai_obj
 
     def metered_func(*args, **kwargs):
-        with patch.object(
-            engine_api_resource.util,
-            "convert_to_openai_object",
-            side_effect=metering_wrapper,
-        ):
-            return func(*args, **kwargs)
+        _call_usage.value = {}
+        status = "error"
+        start = time.perf_counter()
+        try:
+            with _metering(metering_wrapper):
+                result = func(*args, **kwargs)
+            status = "ok"
+            return result
+        finally:
+            api_manager.record_call(
+                kwargs.get("model", ""), time.perf_counter() - start, status, **_call_usage.value
+            )
 
     return metered_func
 
@@ -165,6 +212,9 @@ def retry_api(
         num_retries int: Number of retries. Defaults to 10.
         backoff_base float: Base for exponential backoff. Defaults to 2.
         warn_user bool: Whether to warn the user. Defaults to True.
+
+    The wrapped function takes an optional `before_retry` callback, which is called
+    before each retry (e.g. to acquire capacity from the LLM scheduler again).
     """
     error_messages = {
         ServiceUnavailableError: f"{Fore.RED}Error: The OpenAI API engine is currently overloaded{Fore.RESET}",
@@ -179,10 +229,11 @@ def retry_api(
 
     def _wrapper(func: Callable):
         @functools.wraps(func)
-        def _wrapped(*args, **kwargs):
+        def _wrapped(*args, before_retry: Optional[Callable[[], Any]] = None, **kwargs):
             user_warned = not warn_user
             max_attempts = max_retries + 1  # +1 for the first attempt
             for attempt in range(1, max_attempts + 1):
+                rate_limited = False
                 try:
                     return func(*args, **kwargs)
 
@@ -195,6 +246,7 @@ def retry_api(
                     ):
                         raise
 
+                    rate_limited = isinstance(e, RateLimitError)
                     error_msg = error_messages[type(e)]
                     logger.warn(error_msg)
                     if not user_warned:
@@ -207,10 +259,18 @@ def retry_api(
                 except (APIError, Timeout) as e:
                     if (e.http_status not in [429, 502]) or (attempt == max_attempts):
                         raise
+                    rate_limited = e.http_status == 429
 
                 backoff = backoff_base ** (attempt + 2)
-                logger.warn(backoff_msg.format(backoff=backoff))
+                # Jitter the backoff so that agents limited at the same time do not retry in sync
+                backoff = random.uniform(backoff / 2, backoff)
+                if rate_limited and kwargs.get("model"):
+                    # Pause the model for every agent sharing the scheduler, not just this one
+                    get_scheduler().penalize(kwargs["model"], backoff)
+                logger.warn(backoff_msg.format(backoff=f"{backoff:.1f}"))
                 time.sleep(backoff)
+                if before_retry is not None:
+                    before_retry()
 
         return _wrapped
 
@@ -0,0 +1,339 @@
+"""Rate-limit-aware scheduling of the LLM requests of one or many agents.
+
+Every request sent to the API first acquires capacity from a scheduler, which keeps
+two token buckets per model, one for requests per minute and one for tokens per
+minute, sized to just under the account's quota. Requests of the agent loop have
+priority over auxiliary ones (mutants, external fixes, helper commands): when a
+model's buckets are short, waiting main-loop requests are served first. When the
+API still answers with a rate-limit error, the model is paused for everyone using
+the scheduler, instead of each agent backing off on its own and retrying in sync.
+
+When many bugs are repaired in parallel, the agents share one scheduler process:
+start it with `python -m autogpt.llm.scheduler [--address host:port]` and export
+LLM_SCHEDULER=host:port. Without that variable, or when the scheduler cannot be
+reached, each process schedules its own requests with the same buckets.
+
+Requests are pickled, so the scheduler and its agents must share a secret key, given
+in LLM_SCHEDULER_AUTHKEY and generated anew for every run (run_on_defects4j.sh does
+so); there is no default key, and the scheduler refuses to start without one.
+
+The quotas are read from LLM_RATE_LIMITS, a JSON object mapping model names (or
+name prefixes) to {"rpm": ..., "tpm": ...}, on top of DEFAULT_LIMITS.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Optional
+
+from autogpt.logs import logger
+
+ADDRESS_ENV = "LLM_SCHEDULER"
+AUTHKEY_ENV = "LLM_SCHEDULER_AUTHKEY"
+LIMITS_ENV = "LLM_RATE_LIMITS"
+DEFAULT_ADDRESS = "localhost:6020"
+
+MAIN = 0
+"""Priority of the requests of the agent loop"""
+AUXILIARY = 1
+"""Priority of the other requests (mutants, external fixes, helper commands)"""
+
+HEADROOM = 0.95
+"""Share of the quota that the buckets hand out, to stay just under the limit"""
+
+DEFAULT_LIMITS = {
+    "gpt-3.5-turbo": {"rpm": 3500, "tpm": 160000},
+    "gpt-4": {"rpm": 500, "tpm": 80000},
+    "*": {"rpm": 500, "tpm": 80000},
+}
+
+
+class SchedulerError(Exception):
+    """The shared scheduler cannot be started or reached"""
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port)
+
+
+def get_authkey() -> bytes:
+    authkey = os.getenv(AUTHKEY_ENV)
+    if not authkey:
+        raise SchedulerError(f"{AUTHKEY_ENV} is not set")
+    return authkey.encode()
+
+
+def load_limits() -> dict[str, dict[str, int]]:
+    limits = dict(DEFAULT_LIMITS)
+    if os.getenv(LIMITS_ENV):
+        limits.update(json.loads(os.environ[LIMITS_ENV]))
+    return limits
+
+
+def model_limits(limits: dict[str, dict[str, int]], model: str) -> dict[str, int]:
+    """The limits of model: its entry, else its longest matching prefix, else "*" """
+    if model in limits:
+        return limits[model]
+    prefixes = [name for name in limits if name != "*" and model.startswith(name)]
+    if prefixes:
+        return limits[max(prefixes, key=len)]
+    return limits["*"]
+
+
+class TokenBucket:
+    """Capacity refilled continuously at rate_per_minute, up to one minute's worth"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60
+        self.level = rate_per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken
+
+        Amounts above the capacity wait for a full bucket.
+        """
+        self.refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        # The level may go negative: later requests then wait for the debt to refill
+        self.level -= amount
+
+
+@dataclass
+class _ModelState:
+    requests: TokenBucket
+    tokens: TokenBucket
+    paused_until: float = 0.0
+    waiting: list[tuple[int, int]] = field(default_factory=list)
+    """Heap of the (priority, ticket) of the requests waiting for this model"""
+
+
+class RateLimitScheduler:
+    """Hands out request and token capacity per model, main-loop requests first"""
+
+    def __init__(
+        self,
+        limits: Optional[dict[str, dict[str, int]]] = None,
+        headroom: float = HEADROOM,
+    ):
+        self.limits = limits if limits is not None else load_limits()
+        self.headroom = headroom
+        self.models: dict[str, _ModelState] = {}
+        self.condition = threading.Condition()
+        self.tickets = itertools.count()
+
+    def _state(self, model: str) -> _ModelState:
+        if model not in self.models:
+            limits = model_limits(self.limits, model)
+            self.models[model] = _ModelState(
+                TokenBucket(limits["rpm"] * self.headroom),
+                TokenBucket(limits["tpm"] * self.headroom),
+            )
+        return self.models[model]
+
+    def acquire(self, model: str, tokens: int, priority: int = MAIN) -> float:
+        """Block until a request of about `tokens` tokens may be sent
+
+        Returns the time waited.
+        """
+        start = time.monotonic()
+        with self.condition:
+            state = self._state(model)
+            ticket = (priority, next(self.tickets))
+            heapq.heappush(state.waiting, ticket)
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    state.paused_until - now,
+                    state.requests.wait_time(1, now),
+                    state.tokens.wait_time(tokens, now),
+                )
+                if state.waiting[0] == ticket and wait <= 0:
+                    break
+                # Requests behind the head of the queue are woken when it is served
+                self.condition.wait(
+                    timeout=wait if state.waiting[0] == ticket else None
+                )
+            heapq.heappop(state.waiting)
+            state.requests.take(1)
+            state.tokens.take(tokens)
+            self.condition.notify_all()
+        return time.monotonic() - start
+
+    def settle(self, model: str, estimated_tokens: int, used_tokens: int):
+        """Correct the token bucket once the actual usage of a request is known"""
+        with self.condition:
+            self._state(model).tokens.take(used_tokens - estimated_tokens)
+            self.condition.notify_all()
+
+    def penalize(self, model: str, delay: float):
+        """Pause the requests for model after the API answered with a rate limit"""
+        with self.condition:
+            state = self._state(model)
+            state.paused_until = max(state.paused_until, time.monotonic() + delay)
+            self.condition.notify_all()
+
+
+def handle_request(scheduler: RateLimitScheduler, request: dict) -> Any:
+    match request["op"]:
+        case "ping":
+            return "pong"
+        case "acquire":
+            return scheduler.acquire(
+                request["model"], request["tokens"], request["priority"]
+            )
+        case "settle":
+            return scheduler.settle(
+                request["model"], request["estimated_tokens"], request["used_tokens"]
+            )
+        case "penalize":
+            return scheduler.penalize(request["model"], request["delay"])
+        case op:
+            raise ValueError(f"Unknown scheduler operation '{op}'")
+
+
+def _serve_connection(connection: Connection, scheduler: RateLimitScheduler):
+    with connection:
+        while True:
+            try:
+                request = connection.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                connection.send(
+                    {"ok": True, "result": handle_request(scheduler, request)}
+                )
+            except Exception as e:
+                connection.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+def serve(address: str = DEFAULT_ADDRESS):
+    """Run the scheduler until interrupted"""
+    authkey = get_authkey()
+    scheduler = RateLimitScheduler()
+    with Listener(parse_address(address), authkey=authkey) as listener:
+        logger.info(f"LLM scheduler listening on {address}")
+        while True:
+            connection = listener.accept()
+            threading.Thread(
+                target=_serve_connection, args=(connection, scheduler), daemon=True
+            ).start()
+
+
+class SchedulerClient:
+    """Connection of an agent process to the shared scheduler, one per thread"""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.local = threading.local()
+        self._connection()
+
+    def _connection(self) -> Connection:
+        if not hasattr(self.local, "connection"):
+            self.local.connection = Client(
+                parse_address(self.address), authkey=get_authkey()
+            )
+        return self.local.connection
+
+    def request(self, op: str, **kwargs) -> Any:
+        connection = self._connection()
+        connection.send({"op": op, **kwargs})
+        response = connection.recv()
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def acquire(self, model: str, tokens: int, priority: int = MAIN) -> float:
+        return self.request("acquire", model=model, tokens=tokens, priority=priority)
+
+    def settle(self, model: str, estimated_tokens: int, used_tokens: int):
+        self.request(
+            "settle",
+            model=model,
+            estimated_tokens=estimated_tokens,
+            used_tokens=used_tokens,
+        )
+
+    def penalize(self, model: str, delay: float):
+        self.request("penalize", model=model, delay=delay)
+
+
+class _FallbackScheduler:
+    """Uses the shared scheduler, then the local one once the shared one is lost"""
+
+    def __init__(self, remote: SchedulerClient):
+        self.remote: Optional[SchedulerClient] = remote
+        self.local = RateLimitScheduler()
+
+    def _call(self, method: str, *args):
+        if self.remote is not None:
+            try:
+                return getattr(self.remote, method)(*args)
+            except (OSError, EOFError) as e:
+                logger.warn(
+                    f"Lost the LLM scheduler at {self.remote.address},"
+                    f" scheduling locally: {e}"
+                )
+                self.remote = None
+        return getattr(self.local, method)(*args)
+
+    def acquire(self, model: str, tokens: int, priority: int = MAIN) -> float:
+        return self._call("acquire", model, tokens, priority)
+
+    def settle(self, model: str, estimated_tokens: int, used_tokens: int):
+        self._call("settle", model, estimated_tokens, used_tokens)
+
+    def penalize(self, model: str, delay: float):
+        self._call("penalize", model, delay)
+
+
+_scheduler: Optional[RateLimitScheduler | _FallbackScheduler] = None
+
+
+def get_scheduler() -> RateLimitScheduler | _FallbackScheduler:
+    """Return the scheduler of the process
+
+    That is the shared one if it is configured and up, else a local one.
+    """
+    global _scheduler
+    if _scheduler is None:
+        address = os.getenv(ADDRESS_ENV)
+        if address:
+            try:
+                _scheduler = _FallbackScheduler(SchedulerClient(address))
+            except (OSError, EOFError, AuthenticationError, SchedulerError) as e:
+                logger.debug(f"LLM scheduler at {address} is unavailable: {e}")
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler()
+    return _scheduler
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument(
+        "--address", default=os.getenv(ADDRESS_ENV, DEFAULT_ADDRESS)
+    )
+    args = arg_parser.parse_args()
+    try:
+        serve(args.address)
+    except SchedulerError as e:
+        logger.error(f"Not starting the LLM scheduler: {e}")
+        raise SystemExit(1)
@@ -2,11 +2,14 @@ from __future__ import annotations
 
 from typing import List, Literal, Optional
 
+import openai
 from colorama import Fore
 
 from autogpt.config import Config
 
 from ..api_manager import ApiManager
+from ..cache import get_llm_cache
+from ..client import get_llm_client
 from ..base import (
     ChatModelResponse,
     ChatSequence,
@@ -79,13 +82,19 @@ def create_text_completion(
         temperature = config.temperature
 
     kwargs = {"model": model}
+    request = {"prompt": prompt, "temperature": temperature, "max_tokens": max_output_tokens, **kwargs}
     kwargs.update(config.get_openai_credentials(model))
 
-    response = iopenai.create_text_completion(
-        prompt=prompt,
-        **kwargs,
-        temperature=temperature,
-        max_tokens=max_output_tokens,
+    response = get_llm_cache().fetch(
+        request,
+        lambda: iopenai.create_text_completion(
+            prompt=prompt,
+            **kwargs,
+            temperature=temperature,
+            max_tokens=max_output_tokens,
+        ),
+        dump=lambda response: response.to_dict_recursive(),
+        load=openai.util.convert_to_openai_object,
     )
     logger.debug(f"Response: {response}")
 
@@ -153,19 +162,23 @@ def create_chat_completion(
             if message is not None:
                 return message
 
-    chat_completion_kwargs.update(config.get_openai_credentials(model))
-
     if functions:
         chat_completion_kwargs["functions"] = [
             function.schema for function in functions
         ]
+    # The cache key leaves out the credentials
+    request = {"messages": prompt.raw(), **chat_completion_kwargs}
+
+    chat_completion_kwargs.update(config.get_openai_credentials(model))
 
     # Print full prompt to debug log
     logger.debug(prompt.dump())
 
-    response = iopenai.create_chat_completion(
-        messages=prompt.raw(),
-        **chat_completion_kwargs,
+    response = get_llm_cache().fetch(
+        request,
+        lambda: get_llm_client().chat_completion(prompt.raw(), **chat_completion_kwargs),
+        dump=lambda response: response.to_dict_recursive(),
+        load=openai.util.convert_to_openai_object,
     )
     logger.debug(f"Response: {response}")
 
@@ -1,6 +1,15 @@
-"""Functions for counting the number of tokens in a message or string."""
+"""Functions for counting the number of tokens in a message or string.
+
+Encodings are loaded once per process, and the token counts of texts are kept in
+an LRU cache keyed by a hash of the text: the agent counts the same prompt
+sections, messages and summaries every cycle, so only new texts are encoded.
+"""
 from __future__ import annotations
 
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, overload
 
 import tiktoken
@@ -8,6 +17,76 @@ import tiktoken
 from autogpt.llm.base import Message
 from autogpt.logs import logger
 
+TOKEN_COUNT_CACHE_SIZE = 16384
+
+REPLY_PRIMING_TOKENS = 3
+"""Every reply is primed with <|start|>assistant<|message|>"""
+
+_token_counts: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+# The agent loop and the LLM client's threads count tokens concurrently
+_token_counts_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def encoding_for_model(model_name: str) -> tiktoken.Encoding:
+    """Return the encoding of a model, loading it only once per process"""
+    return tiktoken.encoding_for_model(model_name)
+
+
+@lru_cache(maxsize=None)
+def _message_encoding(model: str) -> tuple[int, int, tiktoken.Encoding]:
+    """Return the per-message and per-name token overheads and a model's encoding"""
+    if model.startswith("gpt-3.5-turbo"):
+        tokens_per_message = (
+            4  # every message follows <|start|>{role/name}\n{content}<|end|>\n
+        )
+        tokens_per_name = -1  # if there's a name, the role is omitted
+        encoding_model = "gpt-3.5-turbo"
+    elif model.startswith("gpt-4"):
+        tokens_per_message = 3
+        tokens_per_name = 1
+        encoding_model = "gpt-4"
+    else:
+        raise NotImplementedError(
+            f"count_message_tokens() is not implemented for model {model}.\n"
+            " See https://github.com/openai/openai-python/blob/main/chatml.md for"
+            " information on how messages are converted to tokens."
+        )
+    try:
+        encoding = encoding_for_model(encoding_model)
+    except KeyError:
+        logger.warn("Warning: model not found. Using cl100k_base encoding.")
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return tokens_per_message, tokens_per_name, encoding
+
+
+def count_tokens(text: str, encoding: tiktoken.Encoding) -> int:
+    """Return the number of tokens of text, encoding it only if it is not cached"""
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16)
+    key = (encoding.name, digest.digest())
+    with _token_counts_lock:
+        count = _token_counts.get(key)
+        if count is not None:
+            _token_counts.move_to_end(key)
+            return count
+    count = len(encoding.encode(text))
+    with _token_counts_lock:
+        _token_counts[key] = count
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def count_single_message_tokens(message: Message, model: str) -> int:
+    """Return the tokens taken by one message, without the prompt's reply priming"""
+    tokens_per_message, tokens_per_name, encoding = _message_encoding(model)
+    num_tokens = tokens_per_message
+    for key, value in message.raw().items():
+        num_tokens += count_tokens(value, encoding)
+        if key == "name":
+            num_tokens += tokens_per_name
+    return num_tokens
+
 
 @overload
 def count_message_tokens(messages: Message, model: str = "gpt-3.5-turbo") -> int:
@@ -37,37 +116,12 @@ def count_message_tokens(
     if isinstance(messages, Message):
         messages = [messages]
 
-    if model.startswith("gpt-3.5-turbo"):
-        tokens_per_message = (
-            4  # every message follows <|start|>{role/name}\n{content}<|end|>\n
-        )
-        tokens_per_name = -1  # if there's a name, the role is omitted
-        encoding_model = "gpt-3.5-turbo"
-    elif model.startswith("gpt-4"):
-        tokens_per_message = 3
-        tokens_per_name = 1
-        encoding_model = "gpt-4"
-    else:
-        raise NotImplementedError(
-            f"count_message_tokens() is not implemented for model {model}.\n"
-            " See https://github.com/openai/openai-python/blob/main/chatml.md for"
-            " information on how messages are converted to tokens."
-        )
-    try:
-        encoding = tiktoken.encoding_for_model(encoding_model)
-    except KeyError:
-        logger.warn("Warning: model not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-
-    num_tokens = 0
-    for message in messages:
-        num_tokens += tokens_per_message
-        for key, value in message.raw().items():
-            num_tokens += len(encoding.encode(value))
-            if key == "name":
-                num_tokens += tokens_per_name
-    num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
-    return num_tokens
+    # Fail on unsupported models even if there are no messages to count
+    _message_encoding(model)
+    num_tokens = sum(
+        count_single_message_tokens(message, model) for message in messages
+    )
+    return num_tokens + REPLY_PRIMING_TOKENS
 
 
 def count_string_tokens(string: str, model_name: str) -> int:
@@ -81,5 +135,4 @@ def count_string_tokens(string: str, model_name: str) -> int:
     Returns:
         int: The number of tokens in the text string.
     """
-    encoding = tiktoken.encoding_for_model(model_name)
-    return len(encoding.encode(string))
+    return count_tokens(string, encoding_for_model(model_name))
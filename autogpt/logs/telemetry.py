@@ -0,0 +1,157 @@
+"""Structured latency and cost telemetry of a repair run.
+
+Every cycle of the agent, every command it executes, every LLM call and every
+Defects4J or parser subprocess is recorded as one JSON line: its kind, name and
+duration, plus token and cost counts for LLM calls. Each event is tagged with the
+project, bug and cycle it belongs to, so a run's wall-clock can be split between
+thinking, mutant generation, compilation, test runs, checkouts and parsing.
+
+The events of a bug are appended to
+experimental_setups/<experiment>/telemetry/telemetry_<project>_<bug>.jsonl, next to
+the prompt logs (which the analysis scripts read file by file, so the telemetry is
+kept out of that folder). `python -m scripts.summarize_telemetry <experiment folder>`
+prints the p50/p95 breakdowns of an experiment.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from .logger import logger
+
+# Number of events kept in memory, for inspection within the process
+MAX_EVENTS = 1000
+
+TELEMETRY_DIR_NAME = "telemetry"
+
+
+def telemetry_path(
+    experiment_dir: str | Path, project_name: str, bug_index: str
+) -> Path:
+    return Path(
+        experiment_dir,
+        TELEMETRY_DIR_NAME,
+        f"telemetry_{project_name}_{bug_index}.jsonl",
+    )
+
+
+class Telemetry:
+    """Records timed events, tagged with the current project, bug and cycle"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.context: dict[str, Any] = {}
+        self.events: deque[dict] = deque(maxlen=MAX_EVENTS)
+        self.lock = threading.Lock()
+
+    def open(self, path: Path, **context):
+        """Start writing the events to path, tagged with context (e.g. project, bug)"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.context = dict(context)
+
+    def set_context(self, **context):
+        self.context.update(context)
+
+    def record(self, kind: str, name: str, seconds: float, **fields) -> dict:
+        event = {
+            "time": round(time.time(), 3),
+            **self.context,
+            "kind": kind,
+            "name": name,
+            "seconds": round(seconds, 4),
+            **fields,
+        }
+        with self.lock:
+            self.events.append(event)
+            if self.path is not None:
+                try:
+                    with open(self.path, "a") as f:
+                        f.write(json.dumps(event, default=str) + "\n")
+                except OSError as e:
+                    logger.debug(f"Could not write telemetry to {self.path}: {e}")
+        return event
+
+    @contextmanager
+    def span(self, kind: str, name: str, **fields) -> Iterator[dict]:
+        """Time the body and record it, with the fields added to the yielded dict"""
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException:
+            fields["status"] = "error"
+            raise
+        finally:
+            fields.setdefault("status", "ok")
+            self.record(kind, name, time.perf_counter() - start, **fields)
+
+
+def read_events(path: str | Path) -> list[dict]:
+    events = []
+    with open(path) as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                # The last line of a run that was killed may be cut short
+                continue
+    return events
+
+
+def percentile(values: list[float], q: float) -> float:
+    """The q-th percentile (0-100) of values, by the nearest-rank method"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def event_key(event: dict) -> str:
+    """Commands, models and subprocesses are broken down by name, cycles are not"""
+    if event["name"] == event["kind"]:
+        return event["kind"]
+    return "{}:{}".format(event["kind"], event["name"])
+
+
+def summarize_events(events: list[dict]) -> dict[str, dict[str, dict[str, float]]]:
+    """Count, total, p50 and p95 durations, tokens and cost per project and event key"""
+    groups: dict[str, dict[str, list[dict]]] = {}
+    for event in events:
+        project = event.get("project", "?")
+        groups.setdefault(project, {}).setdefault(event_key(event), []).append(event)
+
+    summary = {}
+    for project, keys in groups.items():
+        summary[project] = {}
+        for key, key_events in sorted(keys.items()):
+            seconds = [e["seconds"] for e in key_events]
+            summary[project][key] = {
+                "count": len(key_events),
+                "errors": sum(1 for e in key_events if e.get("status") == "error"),
+                "total": sum(seconds),
+                "p50": percentile(seconds, 50),
+                "p95": percentile(seconds, 95),
+                "tokens": sum(
+                    e.get("prompt_tokens", 0) + e.get("completion_tokens", 0)
+                    for e in key_events
+                ),
+                "cost": sum(e.get("cost", 0.0) for e in key_events),
+            }
+    return summary
+
+
+_telemetry: Optional[Telemetry] = None
+
+
+def get_telemetry() -> Telemetry:
+    """Return the telemetry of the process, which keeps events in memory until opened"""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry()
+    return _telemetry
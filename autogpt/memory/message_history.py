@@ -105,7 +105,7 @@ Latest Development:
             result_message = messages[i + 1]
             try:
                 assert (
-                    extract_dict_from_response(ai_message.content) != {}
+                    ai_message.parsed_response() != {}
                 ), "AI response is not a valid JSON object"
                 assert result_message.type == "action_result"
 
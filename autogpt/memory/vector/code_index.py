@@ -0,0 +1,240 @@
+"""Embedding index over the method bodies of a Java project.
+
+Method bodies are located with the token-level Java extractor, embedded in batches
+and stacked into a normalized NumPy matrix, so that a query is answered with a
+single matrix-vector product followed by a top-k partition. Embeddings are cached
+by the hash of the method's content: re-indexing a checkout only embeds methods that
+changed since the cache was written.
+
+Two embedders are available: "openai" goes through `get_embedding` and the
+configured embedding model, "local" is a feature-hashing embedder over identifier
+sub-words that needs no network access.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from autogpt.commands.java_extractor import (
+    AmbiguousSourceError,
+    extract_declarations,
+    read_source,
+)
+from autogpt.config import Config
+from autogpt.logs import logger
+from create_files_index import list_java_files
+
+from .utils import get_embedding
+
+Embedder = Callable[[list[str]], np.ndarray]
+"""Maps a batch of texts to a (len(texts), dim) float32 matrix"""
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z_$][\w$]*|\d+|[^\s\w]")
+SUBWORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# text-embedding-ada-002 accepts at most 8191 tokens per input
+MAX_EMBEDDED_CHARS = 16000
+
+
+class HashingEmbedder:
+    """Offline embedder hashing identifier sub-words and token bigrams into a vector"""
+
+    name = "local"
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def features(self, text: str) -> list[str]:
+        tokens = TOKEN_PATTERN.findall(text)
+        features = []
+        for token in tokens:
+            subwords = SUBWORD_PATTERN.findall(token)
+            features.extend(s.lower() for s in subwords or [token])
+        features.extend(a + " " + b for a, b in zip(tokens, tokens[1:]))
+        return features
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.array(
+                [zlib.crc32(f.encode()) for f in self.features(text)], dtype=np.uint32
+            )
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix[row], hashes % self.dim, signs)
+        return matrix
+
+
+class OpenAIEmbedder:
+    """Embedder using the configured embedding model through get_embedding"""
+
+    name = "openai"
+
+    def __init__(self, config: Config):
+        self.config = config
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        embeddings = get_embedding([t[:MAX_EMBEDDED_CHARS] for t in texts], self.config)
+        return np.array(embeddings, dtype=np.float32)
+
+
+def get_embedder(name: str, config: Optional[Config] = None) -> Embedder:
+    match name:
+        case "local":
+            return HashingEmbedder()
+        case "openai":
+            return OpenAIEmbedder(config)
+        case _:
+            raise ValueError(f"Unknown embedder '{name}', expected 'local' or 'openai'")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+@dataclass
+class MethodEntry:
+    """A method body of the indexed project"""
+
+    file_path: str
+    class_name: str
+    method_name: str
+    start_line: int
+    end_line: int
+    content_hash: str
+
+
+@dataclass
+class MethodMatch:
+    entry: MethodEntry
+    score: float
+
+
+class CodeEmbeddingIndex:
+    """Cosine-similarity index over the method bodies of a project"""
+
+    def __init__(self, embedder: Embedder, batch_size: int = 64):
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.entries: list[MethodEntry] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.cache: dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts in batches of batch_size"""
+        batches = [
+            self.embedder(texts[i : i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        return np.vstack(batches).astype(np.float32)
+
+    def index_methods(self, methods: list[tuple[MethodEntry, str]]):
+        """Set the indexed methods, as (entry, body) pairs, embedding unseen bodies"""
+        missing = {}
+        for entry, body in methods:
+            if entry.content_hash not in self.cache:
+                missing[entry.content_hash] = body
+        if missing:
+            logger.debug(f"Embedding {len(missing)} of {len(methods)} method bodies")
+            vectors = self.embed(list(missing.values()))
+            self.cache.update(zip(missing.keys(), vectors))
+
+        self.entries = [entry for entry, _ in methods]
+        if self.entries:
+            self.matrix = normalize_rows(
+                np.stack([self.cache[entry.content_hash] for entry in self.entries])
+            )
+
+    def index_project(self, project_dir: str):
+        methods = []
+        for java_file in list_java_files(project_dir):
+            file_path = os.path.relpath(
+                os.path.join(project_dir, java_file), project_dir
+            )
+            source = read_source(os.path.join(project_dir, file_path))
+            try:
+                _, spans = extract_declarations(source)
+            except AmbiguousSourceError as e:
+                logger.debug(f"Skipping {file_path} in the embedding index: {e}")
+                continue
+            lines = source.splitlines(keepends=True)
+            for span in spans:
+                if not span.has_body:
+                    continue
+                body = "".join(lines[span.start_line - 1 : span.end_line])
+                entry = MethodEntry(
+                    file_path,
+                    span.class_name,
+                    span.name,
+                    span.start_line,
+                    span.end_line,
+                    content_hash(body),
+                )
+                methods.append((entry, body))
+        self.index_methods(methods)
+
+    def query(self, text: str, k: int = 10) -> list[MethodMatch]:
+        """Return the k methods most similar to text, best first"""
+        if not self.entries:
+            return []
+        query_vector = normalize_rows(self.embed([text]))[0]
+        scores = self.matrix @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [MethodMatch(self.entries[i], float(scores[i])) for i in top]
+
+    def load_cache(self, cache_path: str):
+        if not os.path.exists(cache_path):
+            return
+        with np.load(cache_path) as cached:
+            self.cache.update(zip(cached["hashes"].tolist(), cached["vectors"]))
+
+    def save_cache(self, cache_path: str):
+        if not self.cache:
+            return
+        np.savez(
+            cache_path,
+            hashes=np.array(list(self.cache.keys())),
+            vectors=np.stack(list(self.cache.values())),
+        )
+
+
+_loaded_indexes: dict[str, CodeEmbeddingIndex] = {}
+
+
+def get_code_index(
+    workspace: str,
+    project_dir: str,
+    embedder_name: str,
+    config: Optional[Config] = None,
+) -> CodeEmbeddingIndex:
+    """Return the embedding index of a checkout, building it on first use
+
+    The embedding cache is saved as `<project_dir>_embeddings_<embedder>.npz` in the
+    workspace, outside of the checkout, so it survives re-checkouts and later runs.
+    """
+    cache_path = os.path.join(
+        workspace, f"{project_dir}_embeddings_{embedder_name}.npz"
+    )
+    if cache_path not in _loaded_indexes:
+        index = CodeEmbeddingIndex(get_embedder(embedder_name, config))
+        index.load_cache(cache_path)
+        index.index_project(os.path.join(workspace, project_dir))
+        index.save_cache(cache_path)
+        _loaded_indexes[cache_path] = index
+    return _loaded_indexes[cache_path]
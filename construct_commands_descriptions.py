@@ -18,6 +18,18 @@ goals_accomplished_desc = """goals_accomplished: Call this function when you are
 
 search_code_desc = """search_code_base: This utility function scans all Java files within a specified project for a given list of keywords. It generates a dictionary as output, organized by file names, classes, and method names. Within each method name, it provides a list of keywords that match the method's content. The resulting structure is as follows: { file_name: { class_name: { method_name: [...list of matched keywords...] } } }. This functionality proves beneficial for identifying pre-existing methods that may be reusable or for locating similar code to gain insights into implementing specific functionalities. It's important to note that this function does not return the actual code but rather the names of matched methods containing at least one of the specified keywords. It requires the following params params: (project_name: string, bug_index: integer, key_words: list). Once the method names are obtained, the extract_method_code command can be used to retrieve their corresponding code snippets (only do it for the ones that are relevant)"""
 
+search_text_desc = """search_code_text: This function searches the text of all Java files of the project for a string or a regular expression and returns the matching lines with their file path and line number. Use it to find where a string literal, a field, a constant or an expression is used, which search_code_base cannot do since it only matches the names of methods and files. It requires the following params: (project_name: string, bug_index: integer, query: string, is_regex: boolean)"""
+
+semantic_search_desc = """semantic_code_search: This function finds the methods of the project whose code is the most similar to a given code snippet (for example the buggy code), even when they do not share the same names. It returns the file, class, name and lines of each similar method, which you can then read with read_range or extract_method_code. It requires the following params: (project_name: string, bug_index: integer, code_snippet: string)"""
+
+find_definition_desc = """find_definition: This function finds where the symbol (method, field, variable or type) written at a given line and column of a file is declared, and returns the file, line and code of its declaration. Use the line numbers given by read_range; the column is the position of the symbol in that line, starting at 1. It requires the following params: (project_name: string, bug_index: integer, file_path: string, line_number: integer, column: integer)"""
+
+find_references_desc = """find_references: This function finds all the places where the symbol (method, field, variable or type) written at a given line and column of a file is used, and returns the file, line and code of each use. It requires the following params: (project_name: string, bug_index: integer, file_path: string, line_number: integer, column: integer)"""
+
+type_hierarchy_desc = """type_hierarchy: This function lists the super types and sub types of the class or interface written at a given line and column of a file, with the file and line where each of them is declared. It requires the following params: (project_name: string, bug_index: integer, file_path: string, line_number: integer, column: integer)"""
+
+compile_diagnostics_desc = """compile_diagnostics: This function returns the compilation errors and warnings of a file, with their line and column, without running the tests. It requires the following params: (project_name: string, bug_index: integer, file_path: string)"""
+
 get_classes_desc = """get_classes_and_methods: This function allows you to get all classes and methods names within a file. It returns a dictinary where keys are classes names and values are list of methods names within each class. The required params are: (project_name: string, bug_index: integer, file_path: string)"""
 
 get_similar_desc = """extract_similar_functions_calls: For a provided buggy code snippet in 'code_snippet' within the file 'file_path', this function extracts similar function calls. This aids in understanding how functions are utilized in comparable code snippets, facilitating the determination of appropriate parameters to pass to a function., params: (project_name: string, bug_index: string, file_path: string, code_snippet: string)"""
@@ -38,7 +50,7 @@ commands_dict = {
     "trying out candidate fixes": "\n".join(["{}. {}".format(i+1, t) for i, t in enumerate(
         [write_fix_desc, read_range_desc, go_back_desc, discard_hypothesis, goals_accomplished_desc])]),
     "collect information to fix the bug": "\n".join(["{}. {}".format(i+1, t) for i, t in enumerate(
-        [search_code_desc, get_classes_desc, get_similar_desc, extract_method_desc, write_fix_desc, read_range_desc, generate_method_desc])]),
+        [search_code_desc, search_text_desc, semantic_search_desc, find_definition_desc, find_references_desc, type_hierarchy_desc, compile_diagnostics_desc, get_classes_desc, get_similar_desc, extract_method_desc, write_fix_desc, read_range_desc, generate_method_desc])]),
     "collect information to understand the bug": "\n".join(["{}. {}".format(i+1, t) for i, t in enumerate(
         [extract_test_desc, express_hypo_desc, read_range_desc])])
 }
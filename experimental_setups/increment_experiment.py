@@ -16,4 +16,5 @@ with open("experimental_setups/experiments_list.txt", "r+") as expl:
     os.mkdir("experimental_setups/experiment_{}/external_fixes".format(last_exp + 1))
     os.mkdir("experimental_setups/experiment_{}/saved_contexts".format(last_exp + 1))
     os.mkdir("experimental_setups/experiment_{}/mutations_history".format(last_exp + 1))
-    os.mkdir("experimental_setups/experiment_{}/plausible_patches".format(last_exp + 1))
\ No newline at end of file
+    os.mkdir("experimental_setups/experiment_{}/plausible_patches".format(last_exp + 1))
+    os.mkdir("experimental_setups/experiment_{}/telemetry".format(last_exp + 1))
\ No newline at end of file
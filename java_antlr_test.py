@@ -1,8 +1,6 @@
-from antlr4 import FileStream, CommonTokenStream
-from JavaLexer import JavaLexer
-from JavaParser import JavaParser
 from JavaListener import JavaListener
 from antlr4 import ParseTreeWalker
+from autogpt.commands.java_parsing import parse_file, summarize_parse_timings
 
 class FunctionExtractor(JavaListener):
     def __init__(self):
@@ -23,15 +21,10 @@ class FunctionExtractor(JavaListener):
 
 if __name__ == "__main__":
     file_path = "auto_gpt_workspace/closure_10_buggy/src/com/google/javascript/jscomp/AbstractCommandLineRunner.java"
-    input_stream = FileStream(file_path)
-    
-    lexer = JavaLexer(input_stream)
-    token_stream = CommonTokenStream(lexer)
-    parser = JavaParser(token_stream)
-    
-    tree = parser.compilationUnit()
+    tree = parse_file(file_path)
     
     extractor = FunctionExtractor()
     walker = ParseTreeWalker()
     walker.walk(extractor, tree)
     print(extractor.matched_methods[0])
+    print(summarize_parse_timings())
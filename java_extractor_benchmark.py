@@ -0,0 +1,139 @@
+"""Compare the token-level extractor and the SLL-first parse with the full ANTLR parse.
+
+Usage:
+    python java_extractor_benchmark.py auto_gpt_workspace/closure_10_buggy [max_files]
+
+Each parse strategy is timed over all the files, starting from empty DFA caches.
+"""
+
+import sys
+import time
+
+from antlr4 import CommonTokenStream, InputStream, ParseTreeWalker
+from antlr4.dfa.DFA import DFA
+from antlr4.PredictionContext import PredictionContextCache
+
+from autogpt.commands.java_extractor import (
+    AmbiguousSourceError,
+    extract_declarations,
+    read_source,
+)
+from autogpt.commands.java_parsing import (
+    parse_compilation_unit,
+    summarize_parse_timings,
+)
+from create_files_index import list_java_files
+from JavaLexer import JavaLexer
+from JavaListener import JavaListener
+from JavaParser import JavaParser
+
+
+class MethodCollector(JavaListener):
+    def __init__(self):
+        self.methods = []
+
+    def enterMethodDeclaration(self, ctx):
+        self.methods.append((ctx.Identifier().getText(), ctx.start.line, ctx.stop.line))
+
+
+def reset_dfa_caches():
+    """Start the lexer and the parser over with empty DFA caches"""
+    JavaLexer.decisionsToDFA = [
+        DFA(state, i) for i, state in enumerate(JavaLexer.atn.decisionToState)
+    ]
+    JavaParser.decisionsToDFA = [
+        DFA(state, i) for i, state in enumerate(JavaParser.atn.decisionToState)
+    ]
+    JavaParser.sharedContextCache = PredictionContextCache()
+
+
+def antlr_methods(source):
+    parser = JavaParser(CommonTokenStream(JavaLexer(InputStream(source))))
+    parser.removeErrorListeners()
+    collector = MethodCollector()
+    ParseTreeWalker().walk(collector, parser.compilationUnit())
+    return collector.methods
+
+
+def two_stage_methods(source, file_path):
+    collector = MethodCollector()
+    ParseTreeWalker().walk(collector, parse_compilation_unit(source, file_path))
+    return collector.methods
+
+
+def fast_methods(source):
+    _, methods = extract_declarations(source)
+    return [(m.name, m.start_line, m.end_line) for m in methods if not m.is_constructor]
+
+
+if __name__ == "__main__":
+    project_dir = sys.argv[1]
+    max_files = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    java_files = sorted(list_java_files(project_dir))[:max_files]
+    sources = {
+        java_file: read_source(
+            java_file
+            if java_file.startswith(project_dir)
+            else "{}/{}".format(project_dir, java_file)
+        )
+        for java_file in java_files
+    }
+
+    # Each parse strategy runs over all the files on a DFA cache that it builds itself
+    reset_dfa_caches()
+    references = {}
+    start = time.perf_counter()
+    for java_file, source in sources.items():
+        references[java_file] = antlr_methods(source)
+    antlr_time = time.perf_counter() - start
+
+    reset_dfa_caches()
+    two_stage_time = 0.0
+    for java_file, source in sources.items():
+        start = time.perf_counter()
+        methods = two_stage_methods(source, java_file)
+        two_stage_time += time.perf_counter() - start
+        if methods != references[java_file]:
+            print("TWO-STAGE MISMATCH {}".format(java_file))
+
+    fast_time = 0.0
+    ambiguous = mismatched = 0
+    for java_file, source in sources.items():
+        start = time.perf_counter()
+        try:
+            extracted = fast_methods(source)
+        except AmbiguousSourceError as e:
+            ambiguous += 1
+            print("AMBIGUOUS {}: {}".format(java_file, e))
+            continue
+        finally:
+            fast_time += time.perf_counter() - start
+
+        # Interface methods are not methodDeclarations in the grammar, so only
+        # methods found by ANTLR are required to match
+        reference = references[java_file]
+        if not set(reference) <= set(extracted):
+            mismatched += 1
+            print(
+                "MISMATCH {}: {}".format(
+                    java_file, sorted(set(reference) - set(extracted))
+                )
+            )
+
+    print(
+        "Files: {}, ambiguous: {}, mismatched: {}".format(
+            len(java_files), ambiguous, mismatched
+        )
+    )
+    print(
+        "ANTLR parse: {:.2f}s, token extractor: {:.2f}s, speedup: {:.1f}x".format(
+            antlr_time,
+            fast_time,
+            antlr_time / fast_time if fast_time else float("inf"),
+        )
+    )
+    print(
+        "SLL-first parse: {:.2f}s ({})".format(
+            two_stage_time, summarize_parse_timings()
+        )
+    )
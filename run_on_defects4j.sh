@@ -9,6 +9,31 @@ for LANG in en_AU.UTF-8 en_GB.UTF-8 C.UTF-8 C; do
 done
 export LC_COLLATE=C
 
+# Keep the ANTLR caches warm across bugs when a parse service address is configured
+if [ -n "$JAVA_PARSE_SERVICE" ]; then
+    # The service unpickles requests: only processes of this run may know its key
+    export JAVA_PARSE_SERVICE_AUTHKEY=$(openssl rand -hex 16)
+    python3 -m autogpt.commands.parse_service --address "$JAVA_PARSE_SERVICE" &
+    PARSE_SERVICE_PID=$!
+fi
+
+# Share the LLM rate limits between all the agents when a scheduler address is configured
+if [ -n "$LLM_SCHEDULER" ]; then
+    # The scheduler unpickles requests: only processes of this run may know its key
+    export LLM_SCHEDULER_AUTHKEY=$(openssl rand -hex 16)
+    python3 -m autogpt.llm.scheduler --address "$LLM_SCHEDULER" &
+    LLM_SCHEDULER_PID=$!
+fi
+
+# Answer the LLM requests with a local mock server, to benchmark the agent offline
+if [ -n "$MOCK_LLM_SERVER" ]; then
+    python3 -m autogpt.llm.mock_server --address "$MOCK_LLM_SERVER" $MOCK_LLM_ARGS &
+    MOCK_LLM_PID=$!
+    export LLM_API_BASE="http://$MOCK_LLM_SERVER/v1"
+    export OPENAI_API_BASE_URL="$LLM_API_BASE"
+fi
+trap 'kill $PARSE_SERVICE_PID $LLM_SCHEDULER_PID $MOCK_LLM_PID 2>/dev/null' EXIT
+
 python3 experimental_setups/increment_experiment.py
 python3 construct_commands_descriptions.py
 input="$1"
@@ -0,0 +1,77 @@
+"""Print the latency and cost breakdowns of an experiment, per project.
+
+Usage:
+    python -m scripts.summarize_telemetry experimental_setups/experiment_N [--project X]
+
+Relative experiment folders that do not exist in the working directory are taken
+from the project root.
+
+Durations of concurrent work (e.g. the external fix query running alongside the
+agent's own completion) overlap, so the totals of a project can exceed its cycles.
+"""
+
+import argparse
+import sys
+
+from autogpt.config.resources import get_resources
+from autogpt.logs.telemetry import TELEMETRY_DIR_NAME, read_events, summarize_events
+
+COLUMNS = ("count", "errors", "total", "p50", "p95", "tokens", "cost")
+
+
+def format_summary(project: str, rows: dict[str, dict[str, float]], bugs: int) -> str:
+    width = max(len(key) for key in rows)
+    lines = [
+        "== {} ({} bugs) ==".format(project, bugs),
+        "{:<{}}  {:>6} {:>6} {:>10} {:>8} {:>8} {:>10} {:>8}".format(
+            "event", width, *COLUMNS
+        ),
+    ]
+    for key, row in rows.items():
+        lines.append(
+            "{:<{}}  {:>6} {:>6} {:>9.1f}s {:>7.2f}s {:>7.2f}s {:>10} {:>7.3f}$".format(
+                key,
+                width,
+                row["count"],
+                row["errors"],
+                row["total"],
+                row["p50"],
+                row["p95"],
+                row["tokens"],
+                row["cost"],
+            )
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "experiment",
+        help="the experiment folder, e.g. experimental_setups/experiment_3",
+    )
+    parser.add_argument("--project", help="only summarize this project")
+    args = parser.parse_args()
+
+    telemetry_dir = get_resources().resolve(args.experiment) / TELEMETRY_DIR_NAME
+    files = sorted(telemetry_dir.glob("telemetry_*.jsonl"))
+    if not files:
+        print("No telemetry found in {}".format(telemetry_dir))
+        sys.exit(1)
+
+    events = []
+    bugs: dict[str, set] = {}
+    for path in files:
+        for event in read_events(path):
+            if args.project and event.get("project") != args.project:
+                continue
+            events.append(event)
+            bugs.setdefault(event.get("project", "?"), set()).add(event.get("bug"))
+
+    for project, rows in sorted(summarize_events(events).items()):
+        print(format_summary(project, rows, len(bugs[project])))
+        print()
+
+
+if __name__ == "__main__":
+    main()
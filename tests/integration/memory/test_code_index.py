@@ -0,0 +1,65 @@
+"""Tests for the method embedding index"""
+
+import numpy as np
+
+from autogpt.memory.vector.code_index import (
+    CodeEmbeddingIndex,
+    HashingEmbedder,
+    get_code_index,
+)
+
+FILE_A = """class Parser {
+    int parseNumber(String text) {
+        return Integer.parseInt(text.trim());
+    }
+
+    String renderNode(Node node) {
+        return node.toString();
+    }
+}
+"""
+
+FILE_B = """class Lexer {
+    int readNumber(String input) {
+        return Integer.parseInt(input.trim(), 10);
+    }
+}
+"""
+
+
+def write_project(root):
+    project = root / "proj_1_buggy"
+    project.mkdir()
+    (project / "Parser.java").write_text(FILE_A)
+    (project / "Lexer.java").write_text(FILE_B)
+    return project
+
+
+def test_query_ranks_similar_methods_first(tmp_path):
+    index = CodeEmbeddingIndex(HashingEmbedder(), batch_size=2)
+    index.index_project(str(write_project(tmp_path)))
+
+    assert len(index) == 3
+    matches = index.query("return Integer.parseInt(value.trim());", k=2)
+    assert {m.entry.method_name for m in matches} == {"parseNumber", "readNumber"}
+    assert matches[0].score >= matches[1].score > 0
+
+
+def test_embeddings_are_cached_by_content_hash(tmp_path):
+    write_project(tmp_path)
+    calls = []
+
+    class CountingEmbedder(HashingEmbedder):
+        def __call__(self, texts):
+            calls.append(len(texts))
+            return super().__call__(texts)
+
+    index = get_code_index(str(tmp_path), "proj_1_buggy", "local")
+    cache_path = tmp_path / "proj_1_buggy_embeddings_local.npz"
+    assert cache_path.exists()
+
+    reloaded = CodeEmbeddingIndex(CountingEmbedder())
+    reloaded.load_cache(str(cache_path))
+    reloaded.index_project(str(tmp_path / "proj_1_buggy"))
+    assert calls == []
+    assert np.allclose(reloaded.matrix, index.matrix)
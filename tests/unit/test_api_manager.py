@@ -4,6 +4,7 @@ import pytest
 from pytest_mock import MockerFixture
 
 from autogpt.llm.api_manager import ApiManager
+from autogpt.logs.telemetry import get_telemetry
 from autogpt.llm.providers.openai import OPEN_AI_CHAT_MODELS, OPEN_AI_EMBEDDING_MODELS
 
 api_manager = ApiManager()
@@ -84,3 +85,15 @@ class TestApiManager:
 
             assert result[0]["id"] == "gpt-3.5-turbo"
             assert api_manager.models[0]["id"] == "gpt-3.5-turbo"
+
+    @staticmethod
+    def test_record_call():
+        """Test if API calls are recorded in the telemetry with their cost."""
+        cost = api_manager.update_cost(100, 20, "gpt-3.5-turbo")
+        assert cost == pytest.approx((100 * 0.0013 + 20 * 0.0025) / 1000)
+
+        api_manager.record_call("gpt-3.5-turbo", 1.5, "ok", 100, 20, cost)
+        event = get_telemetry().events[-1]
+        assert (event["kind"], event["name"], event["seconds"]) == ("llm", "gpt-3.5-turbo", 1.5)
+        assert (event["prompt_tokens"], event["completion_tokens"]) == (100, 20)
+        assert event["cost"] == pytest.approx(cost)
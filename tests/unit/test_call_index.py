@@ -0,0 +1,69 @@
+from autogpt.commands.call_index import CallSiteIndex, extract_calls, get_call_index
+
+FILE_A = """class A {
+    void f(String s) {
+        log.info("start", s);
+        log.info(s);
+        int x = compute(1, 2);
+    }
+    int compute(int a, int b) { return a + b; }
+}
+"""
+
+FILE_B = """class B {
+    void g() {
+        log.info("other", this);
+        new StringBuilder(16).append("x");
+    }
+}
+"""
+
+
+def test_extract_calls_skips_declarations():
+    calls = extract_calls(FILE_A, "A.java")
+    assert [(c.callee, c.line) for c in calls] == [
+        ("info", 3),
+        ("info", 4),
+        ("compute", 5),
+    ]
+    assert calls[0].expression == 'log.info("start", s)'
+    assert calls[0].shape == ("string", "name")
+
+
+def test_constructor_and_chained_calls():
+    calls = extract_calls(FILE_B, "B.java")
+    assert [c.expression for c in calls] == [
+        'log.info("other", this)',
+        "new StringBuilder(16)",
+        'append("x")',
+    ]
+
+
+def test_similar_calls_ranked_by_argument_shape(tmp_path):
+    project = tmp_path / "proj_1_buggy"
+    project.mkdir()
+    (project / "A.java").write_text(FILE_A)
+    (project / "B.java").write_text(FILE_B)
+
+    index = CallSiteIndex.build(str(project))
+    (snippet_call,) = extract_calls('log.info("msg", value);', "A.java")
+    ranked = index.similar_calls(snippet_call)
+    assert [(c.file_path, c.line) for c in ranked] == [
+        ("A.java", 3),
+        ("B.java", 3),
+        ("A.java", 4),
+    ]
+    assert [c.line for c in index.similar_calls(snippet_call, file_path="B.java")] == [
+        3
+    ]
+
+
+def test_index_is_persisted_outside_the_checkout(tmp_path):
+    project = tmp_path / "proj_1_buggy"
+    project.mkdir()
+    (project / "A.java").write_text(FILE_A)
+
+    index = get_call_index(str(tmp_path), "proj_1_buggy")
+    assert (tmp_path / "proj_1_buggy_calls_index.json").exists()
+    reloaded = CallSiteIndex.load(str(tmp_path / "proj_1_buggy_calls_index.json"))
+    assert reloaded.query("compute") == index.query("compute")
@@ -0,0 +1,96 @@
+from autogpt.agents.context_packer import (
+    OMISSION_NOTE,
+    TRUNCATION_NOTE,
+    ContextPacker,
+    ContextSection,
+)
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def entry(word, size=20):
+    return " ".join([word] * size) + "\n"
+
+
+def make_sections():
+    return [
+        ContextSection("bug report", "## Bug:\n", ["the test fails\n"], priority=100),
+        ContextSection(
+            "read files",
+            "## Read lines:\n",
+            [entry("a"), entry("b"), entry("c")],
+            priority=80,
+        ),
+        ContextSection(
+            "search queries",
+            "## Searches:\n",
+            [entry("q1"), entry("q2"), entry("q3")],
+            priority=40,
+            empty_text="No search queries executed so far.\n",
+        ),
+    ]
+
+
+def test_everything_fits():
+    packer = ContextPacker(word_count)
+    sections = make_sections()
+    packed = packer.pack(sections, budget=1000)
+    assert packed == "\n".join(section.render() for section in make_sections())
+    assert all(section.omitted == 0 for section in sections)
+
+
+def test_oldest_entries_of_lowest_priority_go_first():
+    packer = ContextPacker(word_count)
+    sections = make_sections()
+    budget = packer.total_tokens(sections) - 10
+    packer.pack(sections, budget)
+    bug_report, read_files, searches = sections
+    assert read_files.omitted == 0
+    assert searches.kept == [entry("q3")]
+    assert bug_report.kept == bug_report.entries
+
+
+def test_latest_entries_are_kept_until_older_ones_are_gone():
+    packer = ContextPacker(word_count)
+    sections = make_sections()
+    packed = packer.pack(sections, budget=90)
+    assert packer.total_tokens(sections) <= 90
+    assert [len(s.kept) for s in sections] == [1, 1, 1]
+    assert OMISSION_NOTE.format(2) in packed
+
+
+def test_sections_are_capped_to_their_share():
+    packer = ContextPacker(word_count)
+    sections = make_sections()
+    sections[1].max_share = 0.1
+    packer.pack(sections, budget=200)
+    assert sections[1].kept == [entry("c")]
+    assert sections[2].omitted == 0
+
+
+def test_large_entries_are_truncated():
+    packer = ContextPacker(word_count)
+    section = ContextSection(
+        "read files", "## Read lines:\n", [" ".join(["w"] * 200)], priority=80
+    )
+    packed = packer.pack([section], budget=50)
+    assert packed.endswith(TRUNCATION_NOTE)
+    assert packer.total_tokens([section]) <= 50
+
+
+def test_token_counts_are_cached():
+    calls = []
+
+    def counting(text):
+        calls.append(text)
+        return word_count(text)
+
+    packer = ContextPacker(counting, cache_size=2)
+    assert packer.tokens("a b") == 2
+    assert packer.tokens("a b") == 2
+    assert calls == ["a b"]
+    packer.tokens("c")
+    packer.tokens("d")
+    assert "a b" not in packer.token_counts
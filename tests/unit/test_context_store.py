@@ -0,0 +1,153 @@
+from unittest.mock import patch
+
+from autogpt.agents.context_store import LAST_COMMAND_PREFIX, ContextStore
+from autogpt.json_utils import utilities
+from autogpt.json_utils.utilities import load_commands_interface
+from autogpt.llm.base import Message
+
+
+def command(name, thoughts="because", **args):
+    return Message(
+        "assistant",
+        str({"thoughts": thoughts, "command": {"name": name, "args": args}}),
+    )
+
+
+def result(content):
+    return Message("user", content)
+
+
+def test_sections_are_folded_from_command_result_pairs():
+    store = ContextStore()
+    store.sync(
+        [
+            Message("user", "prompt"),
+            command(
+                "read_range",
+                project_name="Chart",
+                bug_index=1,
+                filepath="A.java",
+                startline=1,
+                endline=3,
+            ),
+            result("Line 1:class A {"),
+            command(
+                "search_code_base", project_name="Chart", bug_index=1, key_words=["foo"]
+            ),
+            result("{'A.java': {}}"),
+            command("express_hypothesis", hypothesis="off by one"),
+            result("Hypothesis saved"),
+            command(
+                "write_fix",
+                project_name="Chart",
+                bug_index=1,
+                changes_dicts=[{"file_name": "A.java"}],
+            ),
+            result("0 failing test cases"),
+            command(
+                "extract_test_code",
+                project_name="Chart",
+                bug_index=1,
+                test_file_path="ATest",
+            ),
+            result("void testA() {}"),
+            Message("system", "Human feedback: try harder"),
+        ]
+    )
+
+    assert store.read_files == {"A.java": {(1, 1): "Line 1:class A {"}}
+    assert store.search_queries == [{"query": ["foo"], "result": "{'A.java': {}}"}]
+    assert store.hypothesises == ["off by one"]
+    assert store.suggested_fixes == [[{"file_name": "A.java"}]]
+    assert (
+        store.failing_test_code
+        == "Extracting test code from file ATest returned: void testA() {}\n"
+    )
+    assert store.bug_report()["failing_test_code"] == store.failing_test_code
+    assert store.human_feedback == ["Human feedback: try harder"]
+    assert (
+        store.commands_history[0]
+        == "read_range , Your reasoning for calling this command was: 'because'"
+    )
+    assert len(store.commands_history) == 5
+
+
+def test_commands_wait_for_their_result():
+    store = ContextStore()
+    messages = [
+        command(
+            "read_range",
+            project_name="Chart",
+            bug_index=1,
+            filepath="A.java",
+            startline=1,
+            endline=2,
+        )
+    ]
+    store.sync(messages)
+    assert store.read_files == {}
+
+    messages.append(result("Line 1:x"))
+    store.sync(messages)
+    assert store.read_files == {"A.java": {(1, 1): "Line 1:x"}}
+
+    # Messages that were already consumed are not applied twice
+    store.sync(messages)
+    assert len(store.commands_history) == 1
+
+
+def test_invalid_and_unknown_commands():
+    store = ContextStore()
+    store.sync(
+        [
+            command("read_range", filepath="A.java"),
+            result("Error"),
+            command("run_all_tests"),
+            result(
+                "Command run_all_tests returned: unknown command."
+                " Do not try to use this command again."
+            ),
+            Message("assistant", "not a command"),
+            result("Could not parse"),
+        ]
+    )
+    assert store.read_files == {}
+    assert store.unknown_commands == ["run_all_tests"]
+    assert "{'name': 'run_all_tests', 'args': {}}" in store.issued_commands
+
+
+def test_last_command_summaries_are_not_repeated_in_history():
+    store = ContextStore()
+    summary = command("express_hypothesis", hypothesis="again")
+    summary.content = LAST_COMMAND_PREFIX + "\n" + summary.content
+    store.sync([summary, result("done")])
+    assert store.hypothesises == []
+    assert store.commands_history == []
+
+
+def test_messages_are_parsed_once_per_content():
+    message = command("express_hypothesis", hypothesis="off by one")
+    with patch.object(
+        utilities,
+        "extract_dict_from_response",
+        wraps=utilities.extract_dict_from_response,
+    ) as extract:
+        assert message.parsed_response()["command"]["name"] == "express_hypothesis"
+        assert message.has_valid_command()
+        assert message.parsed_response() is message.parsed_response()
+        assert extract.call_count == 1
+
+        message.content = str({"command": {"name": "express_hypothesis", "args": {}}})
+        assert not message.has_valid_command()
+        assert extract.call_count == 2
+
+
+def test_commands_interface_is_loaded_once():
+    assert load_commands_interface() is load_commands_interface()
+    assert load_commands_interface()["read_range"] == [
+        "project_name",
+        "bug_index",
+        "filepath",
+        "startline",
+        "endline",
+    ]
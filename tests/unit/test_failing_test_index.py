@@ -0,0 +1,83 @@
+from autogpt.commands.failing_test_index import build_test_index, parse_failing_test_ids
+
+BASE_TEST = """package org.example;
+
+import junit.framework.TestCase;
+
+public abstract class BaseTest extends TestCase {
+    @Test
+    protected void testInherited() {
+        assertTrue(false);
+    }
+}
+"""
+
+FOO_TEST = """package org.example;
+
+public class FooTest extends BaseTest {
+    @Override
+    public void setUp() {
+    }
+
+    @Test(expected = IllegalStateException.class)
+    public void testFoo() {
+        assertEquals(1, 2);
+    }
+
+    public static class Nested {
+        public void testNested() {
+        }
+    }
+}
+"""
+
+FAIL_REPORT = """There are 3 failing test cases, here is the full log of failing cases:
+--- org.example.FooTest::testFoo
+junit.framework.AssertionFailedError
+\tat org.example.FooTest.testFoo(FooTest.java:10)
+
+--- org.example.FooTest::testInherited
+junit.framework.AssertionFailedError
+
+--- org.example.FooTest$Nested::testNested
+--- org.example.FooTest::testMissing
+--- org.example.FooTest::testFoo
+"""
+
+
+def test_parse_failing_test_ids():
+    assert parse_failing_test_ids(FAIL_REPORT) == [
+        "org.example.FooTest::testFoo",
+        "org.example.FooTest::testInherited",
+        "org.example.FooTest$Nested::testNested",
+        "org.example.FooTest::testMissing",
+    ]
+
+
+def test_failing_tests_are_located_through_superclasses(tmp_path):
+    package_dir = tmp_path / "proj_1_buggy" / "test" / "org" / "example"
+    package_dir.mkdir(parents=True)
+    (package_dir / "BaseTest.java").write_text(BASE_TEST)
+    (package_dir / "FooTest.java").write_text(FOO_TEST)
+
+    index = build_test_index(str(tmp_path), "proj_1_buggy", FAIL_REPORT)
+    assert index.unresolved == ["org.example.FooTest::testMissing"]
+
+    foo = index.locations["org.example.FooTest::testFoo"]
+    assert (foo.start_line, foo.end_line, foo.inherited) == (9, 11, False)
+    assert index.test_code("org.example.FooTest::testFoo").startswith(
+        "    public void testFoo()"
+    )
+
+    inherited = index.locations["org.example.FooTest::testInherited"]
+    assert inherited.file_path.endswith("BaseTest.java")
+    assert (inherited.class_name, inherited.start_line, inherited.inherited) == (
+        "BaseTest",
+        7,
+        True,
+    )
+
+    assert (
+        index.locations["org.example.FooTest$Nested::testNested"].class_name == "Nested"
+    )
+    assert "inherited from BaseTest" in index.render()
@@ -0,0 +1,33 @@
+from autogpt.commands.file_view import get_file_view, invalidate_file_view
+
+
+def test_lines_are_sliced_and_clamped(tmp_path):
+    source = tmp_path / "A.java"
+    source.write_bytes(b"class A {\r\n  int x;\n}")
+
+    view = get_file_view(str(source))
+    assert view.line_count == 3
+    assert view.lines(2, 3) == ["  int x;\n", "}"]
+    assert view.clamp(0, 10) == (1, 3)
+    assert view.lines(-5, 1) == ["class A {\n"]
+    assert view.lines(4, 8) == []
+
+
+def test_views_are_cached_until_the_file_changes(tmp_path):
+    source = tmp_path / "A.java"
+    source.write_text("one\ntwo\n")
+
+    view = get_file_view(str(source))
+    assert get_file_view(str(source)) is view
+
+    invalidate_file_view(str(source))
+    source.write_text("one\ntwo\nthree\n")
+    reloaded = get_file_view(str(source))
+    assert reloaded is not view
+    assert reloaded.lines(3, 3) == ["three\n"]
+
+
+def test_empty_file(tmp_path):
+    source = tmp_path / "Empty.java"
+    source.write_text("")
+    assert get_file_view(str(source)).line_count == 0
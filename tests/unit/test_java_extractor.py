@@ -0,0 +1,84 @@
+import pytest
+
+from autogpt.commands.java_extractor import (
+    AmbiguousSourceError,
+    classes_and_methods,
+    extract_declarations,
+    find_methods,
+)
+
+JAVA_SOURCE = """package org.example;
+
+@SuppressWarnings({"unchecked"})
+public class Sample {
+    private static final int[] ARR = {1, 2, 3};
+    private String brace = "}";
+    private Runnable r = new Runnable() {
+        public void run() {
+        }
+    };
+
+    static {
+        System.out.println("init");
+    }
+
+    public Sample(int x) {
+    }
+
+    @Override
+    public String toString() {
+        return "{";
+    }
+
+    public <E> java.util.List<E> generic(E[] items)
+        throws java.io.IOException {
+        return null;
+    }
+
+    abstract int abstractMethod();
+
+    enum Op {
+        PLUS {
+            int apply(int a) { return a; }
+        };
+
+        abstract int apply(int a);
+    }
+}
+"""
+
+
+def test_find_methods_returns_line_spans():
+    spans = find_methods(JAVA_SOURCE, "toString")
+    assert [(m.start_line, m.end_line) for m in spans] == [(20, 22)]
+    assert spans[0].params == "()"
+
+
+def test_find_methods_multiline_header():
+    (method,) = find_methods(JAVA_SOURCE, "generic")
+    assert (method.start_line, method.end_line) == (24, 27)
+    assert method.params == "(E[] items)"
+
+
+def test_find_methods_excludes_constructors():
+    assert find_methods(JAVA_SOURCE, "Sample") == []
+    _, methods = extract_declarations(JAVA_SOURCE)
+    assert [m.name for m in methods if m.is_constructor] == ["Sample"]
+
+
+def test_anonymous_and_enum_constant_bodies():
+    assert [(m.class_name, m.start_line) for m in find_methods(JAVA_SOURCE, "run")] == [
+        ("Runnable", 8)
+    ]
+    assert [m.has_body for m in find_methods(JAVA_SOURCE, "apply")] == [True, False]
+
+
+def test_classes_and_methods():
+    assert classes_and_methods(JAVA_SOURCE) == {
+        "Sample": ["toString", "generic", "abstractMethod"]
+    }
+
+
+def test_unbalanced_source_is_ambiguous():
+    with pytest.raises(AmbiguousSourceError):
+        extract_declarations("class A { void f() { }")
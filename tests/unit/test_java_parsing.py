@@ -0,0 +1,15 @@
+from autogpt.commands.java_parsing import parse_compilation_unit, parse_timings
+
+
+def test_valid_source_parses_in_sll_mode():
+    tree = parse_compilation_unit(
+        "class A { int f(int x) { return x + 1; } }", "A.java"
+    )
+    assert tree.typeDeclaration(0).classDeclaration().Identifier().getText() == "A"
+    assert (parse_timings[-1].file_path, parse_timings[-1].mode) == ("A.java", "SLL")
+
+
+def test_syntax_errors_fall_back_to_ll_with_recovery():
+    tree = parse_compilation_unit("class B { int f( { return; } }", "B.java")
+    assert parse_timings[-1].mode == "LL"
+    assert tree.typeDeclaration(0).classDeclaration().Identifier().getText() == "B"
@@ -0,0 +1,69 @@
+import pytest
+
+from autogpt.llm.cache import LLMCache, LLMCacheMiss, request_key
+
+REQUEST = {
+    "model": "gpt-3.5-turbo",
+    "messages": [{"role": "user", "content": "fix it"}],
+}
+
+
+def replies(*contents):
+    calls = []
+
+    def create():
+        calls.append(len(calls))
+        return contents[len(calls) - 1]
+
+    return create, calls
+
+
+def test_request_key_ignores_key_order():
+    assert request_key({"a": 1, "b": [1, 2]}) == request_key({"b": [1, 2], "a": 1})
+    assert request_key({"a": 1}) != request_key({"a": 2})
+
+
+def test_passthrough_always_calls_the_api():
+    cache = LLMCache("passthrough")
+    create, calls = replies("one", "two")
+    assert cache.fetch(REQUEST, create) == "one"
+    assert cache.fetch(REQUEST, create) == "two"
+    assert len(calls) == 2
+
+
+def test_replay_returns_recorded_responses_in_order(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    recorder = LLMCache("record", path)
+    create, _ = replies({"content": "one"}, {"content": "two"})
+    assert recorder.fetch(REQUEST, create)["content"] == "one"
+    assert recorder.fetch(REQUEST, create)["content"] == "two"
+    recorder.close()
+
+    replayer = LLMCache("replay", path)
+    create, calls = replies()
+    assert replayer.fetch(REQUEST, create) == {"content": "one"}
+    assert replayer.fetch(REQUEST, create) == {"content": "two"}
+    assert calls == []
+    with pytest.raises(LLMCacheMiss):
+        replayer.fetch(REQUEST, create)
+    with pytest.raises(LLMCacheMiss):
+        replayer.fetch({**REQUEST, "temperature": 1}, create)
+
+
+def test_responses_are_converted_with_dump_and_load(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    LLMCache("record", path).fetch(REQUEST, lambda: ("a", 1), dump=list)
+    assert LLMCache("replay", path).fetch(REQUEST, None, load=tuple) == ("a", 1)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        LLMCache("offline")
+
+
+def test_parallel_recordings_keep_the_first_response(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first, second = LLMCache("record", path), LLMCache("record", path)
+    first.fetch(REQUEST, lambda: "first run")
+    second.fetch(REQUEST, lambda: "second run")
+    assert LLMCache("replay", path).fetch(REQUEST, None) == "first run"
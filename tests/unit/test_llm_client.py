@@ -0,0 +1,144 @@
+import threading
+
+import openai
+import openai.api_resources.abstract.engine_api_resource as engine_api_resource
+import pytest
+from langchain.schema.messages import HumanMessage, SystemMessage
+from openai.error import RateLimitError
+
+from autogpt.commands.defects4j_static import invoke_chat
+from autogpt.llm import client as llm_client
+from autogpt.llm.client import LLMClient, get_llm_client, set_llm_client
+from autogpt.llm.providers.openai import meter_api
+
+
+def completion(content):
+    return openai.util.convert_to_openai_object(
+        {
+            "model": "gpt-3.5-turbo-0125",
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+        }
+    )
+
+
+@pytest.fixture
+def requests_sent(monkeypatch):
+    sent = []
+
+    def create_chat_completion(messages, **kwargs):
+        sent.append({"messages": messages, **kwargs})
+        return completion("reply {}".format(len(sent)))
+
+    monkeypatch.setattr(
+        llm_client.iopenai, "create_chat_completion", create_chat_completion
+    )
+    monkeypatch.setattr(
+        llm_client,
+        "estimate_tokens",
+        lambda messages, model: sum(len(m["content"].split()) for m in messages),
+    )
+    yield sent
+    set_llm_client(None)
+
+
+def test_requests_share_the_pooled_session(requests_sent):
+    client = LLMClient(api_key="sk-env")
+    assert openai.requestssession is client.session
+    assert (
+        client.chat([{"role": "user", "content": "hi"}], "gpt-3.5-turbo") == "reply 1"
+    )
+    client.chat_completion([], model="gpt-4", api_key="sk-config")
+    assert requests_sent[0]["api_key"] == "sk-env"
+    assert requests_sent[1]["api_key"] == "sk-config"
+    client.close()
+    assert openai.requestssession is None
+
+
+def test_api_base_override(requests_sent):
+    client = LLMClient(api_base="http://localhost:8000/v1")
+    client.chat_completion([], model="gpt-4", api_base="https://api.openai.com/v1")
+    assert requests_sent[0]["api_base"] == "http://localhost:8000/v1"
+    client.close()
+
+
+def test_helpers_use_the_shared_client(requests_sent):
+    set_llm_client(LLMClient(api_key="sk-env"))
+    reply = invoke_chat(
+        [SystemMessage(content="be brief"), HumanMessage(content="fix it")],
+        model="gpt-4",
+    )
+    assert reply == "reply 1"
+    assert requests_sent[0]["model"] == "gpt-4"
+    assert requests_sent[0]["messages"] == [
+        {"role": "system", "content": "be brief"},
+        {"role": "user", "content": "fix it"},
+    ]
+    assert get_llm_client() is get_llm_client()
+
+
+def test_submitted_requests_run_concurrently():
+    client = LLMClient(pool_size=2)
+    barrier = threading.Barrier(2, timeout=5)
+
+    def request(name):
+        barrier.wait()
+        return name
+
+    futures = [client.submit(request, "fix"), client.submit(request, "reply")]
+    assert [future.result(timeout=5) for future in futures] == ["fix", "reply"]
+    client.close()
+
+
+def test_concurrent_metered_calls_restore_the_conversion():
+    original = engine_api_resource.util.convert_to_openai_object
+    barrier = threading.Barrier(2, timeout=5)
+
+    @meter_api
+    def request():
+        barrier.wait()
+        assert engine_api_resource.util.convert_to_openai_object is not original
+        return True
+
+    client = LLMClient(pool_size=2)
+    futures = [client.submit(request), client.submit(request)]
+    assert all(future.result(timeout=5) for future in futures)
+    assert engine_api_resource.util.convert_to_openai_object is original
+    client.close()
+
+
+def test_retries_acquire_capacity_again(monkeypatch):
+    calls = []
+
+    class Scheduler:
+        def acquire(self, model, tokens, priority):
+            calls.append(("acquire", tokens))
+            return 0.0
+
+        def settle(self, model, estimated_tokens, used_tokens):
+            calls.append(("settle", used_tokens))
+
+        def penalize(self, model, delay):
+            calls.append(("penalize",))
+
+    replies = iter([RateLimitError("Rate limit reached"), completion("fixed")])
+
+    def create(**kwargs):
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    scheduler = Scheduler()
+    monkeypatch.setattr(llm_client, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(llm_client.iopenai, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(llm_client.iopenai.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(llm_client, "estimate_tokens", lambda messages, model: 10)
+    monkeypatch.setattr(openai.ChatCompletion, "create", create)
+
+    client = LLMClient()
+    response = client.chat_completion(
+        [{"role": "user", "content": "hi"}], model="gpt-4"
+    )
+    assert response.choices[0].message["content"] == "fixed"
+    assert calls == [("acquire", 10), ("penalize",), ("settle", 0), ("acquire", 10)]
+    client.close()
@@ -0,0 +1,108 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from autogpt.llm.scheduler import (
+    AUXILIARY,
+    MAIN,
+    RateLimitScheduler,
+    SchedulerClient,
+    SchedulerError,
+    TokenBucket,
+    get_scheduler,
+    model_limits,
+    serve,
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def test_model_limits_match_the_longest_prefix():
+    limits = {
+        "gpt-3.5-turbo": {"rpm": 1},
+        "gpt-3.5-turbo-16k": {"rpm": 2},
+        "*": {"rpm": 3},
+    }
+    assert model_limits(limits, "gpt-3.5-turbo-0125") == {"rpm": 1}
+    assert model_limits(limits, "gpt-3.5-turbo-16k-0613") == {"rpm": 2}
+    assert model_limits(limits, "llama") == {"rpm": 3}
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    # Amounts above the capacity wait for a full bucket instead of forever
+    assert bucket.wait_time(1000, now + 60) == 0
+
+
+def test_requests_wait_for_the_token_budget():
+    scheduler = RateLimitScheduler({"*": {"rpm": 600, "tpm": 6000}}, headroom=1)
+    assert scheduler.acquire("m", 6000) < 0.05
+    # 6000 tokens per minute refill 100 tokens per second
+    assert scheduler.acquire("m", 20) == pytest.approx(0.2, abs=0.1)
+
+
+def test_main_loop_requests_go_first():
+    scheduler = RateLimitScheduler({"*": {"rpm": 600, "tpm": 60000}}, headroom=1)
+    scheduler.penalize("m", 0.2)
+    served = []
+
+    def request(priority, name):
+        scheduler.acquire("m", 1, priority)
+        served.append(name)
+
+    auxiliary = threading.Thread(target=request, args=(AUXILIARY, "mutants"))
+    auxiliary.start()
+    time.sleep(0.05)
+    main = threading.Thread(target=request, args=(MAIN, "think"))
+    main.start()
+    auxiliary.join(5)
+    main.join(5)
+    assert served == ["think", "mutants"]
+
+
+def test_settle_returns_unused_tokens():
+    scheduler = RateLimitScheduler({"*": {"rpm": 600, "tpm": 6000}}, headroom=1)
+    scheduler.acquire("m", 6000)
+    scheduler.settle("m", 6000, 100)
+    assert scheduler.acquire("m", 5000) < 0.05
+
+
+def test_client_round_trip(monkeypatch):
+    address = "localhost:{}".format(free_port())
+    monkeypatch.setenv("LLM_SCHEDULER_AUTHKEY", "test-key")
+    threading.Thread(target=serve, args=(address,), daemon=True).start()
+    for _ in range(50):
+        try:
+            client = SchedulerClient(address)
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    assert client.request("ping") == "pong"
+    assert client.acquire("gpt-3.5-turbo-0125", 100, MAIN) < 1
+    client.settle("gpt-3.5-turbo-0125", 100, 80)
+    client.penalize("gpt-3.5-turbo-0125", 0.01)
+    with pytest.raises(RuntimeError):
+        client.request("unknown")
+
+
+def test_no_authkey_configured(monkeypatch):
+    from autogpt.llm import scheduler
+
+    monkeypatch.delenv("LLM_SCHEDULER_AUTHKEY", raising=False)
+    with pytest.raises(SchedulerError):
+        serve("localhost:{}".format(free_port()))
+    monkeypatch.setenv("LLM_SCHEDULER", "localhost:{}".format(free_port()))
+    monkeypatch.setattr(scheduler, "_scheduler", None)
+    assert isinstance(get_scheduler(), RateLimitScheduler)
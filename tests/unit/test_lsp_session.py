@@ -0,0 +1,314 @@
+import sys
+import textwrap
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from autogpt.commands import lsp_session
+from autogpt.commands.lsp_session import (
+    METHOD_NOT_FOUND,
+    LspError,
+    LspSession,
+    answer_server_request,
+    path_to_uri,
+)
+
+# Minimal language server: answers requests out of order, publishes diagnostics
+# after every document change (preceded by stale ones for the previous version)
+# and asks the client for its configuration once initialized
+FAKE_SERVER = textwrap.dedent("""
+    import json, sys
+
+    def read():
+        length = None
+        while True:
+            line = sys.stdin.buffer.readline()
+            if not line:
+                sys.exit(0)
+            if not line.strip():
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return json.loads(sys.stdin.buffer.read(length))
+
+    def send(message):
+        body = json.dumps(message).encode()
+        sys.stdout.buffer.write(b"Content-Length: %d\\r\\n\\r\\n" % len(body) + body)
+        sys.stdout.buffer.flush()
+
+    def respond(message, result):
+        send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+    def publish(document, version, diagnostics):
+        params = {"uri": document["uri"], "version": version,
+                  "diagnostics": diagnostics}
+        send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+              "params": params})
+
+    def span(start, end):
+        return {"start": {"line": 0, "character": start},
+                "end": {"line": 0, "character": end}}
+
+    held = None
+    served = 0
+    while True:
+        message = read()
+        method = message.get("method")
+        if method == "initialize":
+            respond(message, {"capabilities": {"hoverProvider": True}})
+        elif method == "initialized":
+            send({"jsonrpc": "2.0", "id": "config", "method": "workspace/configuration",
+                  "params": {"items": [{"section": "java"}]}})
+        elif method in ("textDocument/didOpen", "textDocument/didChange"):
+            document = message["params"]["textDocument"]
+            changes = message["params"].get("contentChanges")
+            text = document.get("text") or changes[0]["text"]
+            error = {"message": "syntax error", "severity": 1, "range": span(0, 1)}
+            diagnostics = [] if "class" in text else [error]
+            if document["version"] > 1:
+                # A late publish for the previous text comes first
+                stale = dict(error, message="stale")
+                publish(document, document["version"] - 1, [stale])
+            publish(document, document["version"], diagnostics)
+        elif method == "textDocument/hover":
+            position = message["params"]["position"]
+            served += 1
+            value = "hover %(line)d:%(character)d" % position + " #%d" % served
+            response = {"jsonrpc": "2.0", "id": message["id"],
+                        "result": {"contents": {"kind": "plaintext", "value": value}}}
+            # A hover at the very start is held back and answered after the next one
+            if position == {"line": 0, "character": 0}:
+                held = response
+            else:
+                send(response)
+                if held is not None:
+                    send(held)
+                    held = None
+        elif method == "textDocument/definition":
+            uri = message["params"]["textDocument"]["uri"]
+            respond(message, [{"uri": uri, "range": span(6, 7)}])
+        elif method == "shutdown":
+            respond(message, None)
+        elif method == "exit":
+            sys.exit(0)
+        elif "id" in message and "method" in message:
+            error = {"code": -32601, "message": "unknown " + method}
+            send({"jsonrpc": "2.0", "id": message["id"], "error": error})
+    """)
+
+
+def start_fake_server(project_path):
+    server = project_path / "fake_server.py"
+    server.write_text(FAKE_SERVER)
+    return LspSession(str(project_path), [sys.executable, str(server)])
+
+
+@pytest.fixture
+def session(tmp_path):
+    (tmp_path / "A.java").write_text("class A {}\n")
+    fake_session = start_fake_server(tmp_path)
+    yield fake_session
+    fake_session.close()
+
+
+def test_initialize_reads_capabilities(session):
+    assert session.capabilities == {"hoverProvider": True}
+    assert session.alive
+
+
+def test_responses_are_matched_by_id(session, tmp_path):
+    file_path = str(tmp_path / "A.java")
+    first = session.connection.request_async(
+        "textDocument/hover", session.position_params(file_path, 1, 1)
+    )
+    second = session.connection.request_async(
+        "textDocument/hover", session.position_params(file_path, 3, 5)
+    )
+    assert second.result(timeout=5)["contents"]["value"] == "hover 2:4 #2"
+    assert first.result(timeout=5)["contents"]["value"] == "hover 0:0 #1"
+
+
+def test_error_responses_raise(session):
+    with pytest.raises(LspError, match="unknown textDocument/implementation"):
+        session.request("textDocument/implementation", {}, timeout=5)
+
+
+def test_responses_are_cached_until_a_document_changes(session, tmp_path):
+    file_path = tmp_path / "A.java"
+    assert session.hover(str(file_path), 2, 3)["contents"]["value"] == "hover 1:2 #1"
+    assert session.hover(str(file_path), 2, 3)["contents"]["value"] == "hover 1:2 #1"
+    assert session.hover(str(file_path), 2, 4)["contents"]["value"] == "hover 1:3 #2"
+
+    file_path.write_text("class A { int x; }\n")
+    assert session.hover(str(file_path), 2, 3)["contents"]["value"] == "hover 1:2 #3"
+
+
+def test_definition_and_location_formatting(session, tmp_path):
+    from autogpt.commands.defects4j import format_locations
+
+    file_path = str(tmp_path / "A.java")
+    locations = session.definition(file_path, 1, 7)
+    assert (
+        format_locations(locations, str(tmp_path), "definitions")
+        == "A.java:1: class A {}"
+    )
+    assert format_locations([], str(tmp_path), "references") == "No references found."
+    missing = {
+        "uri": path_to_uri(str(tmp_path / "Gone.java")),
+        "range": locations[0]["range"],
+    }
+    assert format_locations([missing], str(tmp_path), "definitions") == "Gone.java:1"
+
+
+def test_documents_are_versioned(session, tmp_path):
+    file_path = str(tmp_path / "A.java")
+    assert session.sync_document(file_path) == 1
+    assert session.sync_document(file_path) == 1
+    assert session.sync_document(file_path, "class A { int x; }\n") == 2
+
+
+def test_wait_for_diagnostics(session, tmp_path):
+    file_path = str(tmp_path / "A.java")
+    assert session.wait_for_diagnostics(file_path, timeout=5) == []
+    diagnostics = session.wait_for_diagnostics(file_path, "A {\n", timeout=5)
+    assert [d["message"] for d in diagnostics] == ["syntax error"]
+    assert session.diagnostics[path_to_uri(file_path)] == diagnostics
+    # Unchanged documents are not published again
+    assert session.wait_for_diagnostics(file_path, "A {\n", timeout=1) == diagnostics
+
+
+def test_changes_are_sent_without_blocking_the_reader(session, tmp_path, monkeypatch):
+    file_path = str(tmp_path / "A.java")
+    session.wait_for_diagnostics(file_path, timeout=5)
+    free_while_sending = []
+    notify = session.connection.notify
+
+    def probe():
+        acquired = session.diagnostics_updated.acquire(timeout=1)
+        if acquired:
+            session.diagnostics_updated.release()
+        free_while_sending.append(acquired)
+
+    def checked_notify(method, params):
+        # The reader thread must be able to take the condition to publish diagnostics
+        reader = threading.Thread(target=probe)
+        reader.start()
+        reader.join()
+        notify(method, params)
+
+    monkeypatch.setattr(session.connection, "notify", checked_notify)
+    session.wait_for_diagnostics(file_path, "A {\n", timeout=5)
+    assert free_while_sending == [True]
+
+
+def test_server_requests_are_answered():
+    items = {"items": [{"section": "java"}, {"section": "java.format"}]}
+    assert answer_server_request("workspace/configuration", items) == {
+        "result": [None, None]
+    }
+    assert answer_server_request("client/registerCapability", {}) == {"result": None}
+    assert (
+        answer_server_request("workspace/applyEdit", {})["error"]["code"]
+        == METHOD_NOT_FOUND
+    )
+
+
+def test_failed_initialization_stops_the_server(tmp_path, monkeypatch):
+    started = []
+    popen = lsp_session.subprocess.Popen
+
+    def record_popen(*args, **kwargs):
+        started.append(popen(*args, **kwargs))
+        return started[-1]
+
+    monkeypatch.setattr(lsp_session.subprocess, "Popen", record_popen)
+    monkeypatch.setattr(lsp_session, "REQUEST_TIMEOUT", 0.1)
+    with pytest.raises(LspError, match="initialize"):
+        LspSession(str(tmp_path), [sys.executable, "-c", "import time; time.sleep(60)"])
+    assert started[0].poll() is not None
+
+
+def test_exited_server_fails_pending_requests(session):
+    session.connection.notify("exit", None)
+    deadline = time.time() + 5
+    while session.alive and time.time() < deadline:
+        time.sleep(0.01)
+    assert not session.alive
+    with pytest.raises(LspError):
+        session.request("textDocument/hover", {}, timeout=5)
+
+
+def test_new_compile_errors_ignores_existing_errors():
+    from autogpt.commands.defects4j import new_compile_errors
+
+    unresolved = {"message": "junit cannot be resolved", "severity": 1}
+    warning = {"message": "unused variable", "severity": 2}
+    mismatch = {"message": "Type mismatch", "severity": 1}
+    assert new_compile_errors([unresolved], [unresolved, warning]) == []
+    assert new_compile_errors([unresolved], [unresolved, mismatch]) == [mismatch]
+    assert new_compile_errors([mismatch], [mismatch, mismatch]) == [mismatch]
+
+
+def test_prevalidation_rejects_patches_that_do_not_compile(tmp_path, monkeypatch):
+    from autogpt.commands.defects4j import prevalidate_changes
+
+    project = tmp_path / "chart_1_buggy"
+    project.mkdir()
+    java_file = project / "A.java"
+    java_file.write_text("class A {\n}\n")
+    fake_session = start_fake_server(project)
+    monkeypatch.setitem(lsp_session._sessions, str(project), fake_session)
+    agent = SimpleNamespace(config=SimpleNamespace(workspace_path=tmp_path))
+
+    def change(modified_line):
+        return [
+            {
+                "file_name": str(java_file),
+                "modifications": [{"line_number": 1, "modified_line": modified_line}],
+            }
+        ]
+
+    try:
+        rejection = prevalidate_changes("Chart", 1, change("klass A {"), agent)
+        assert "does not compile" in rejection
+        assert "A.java:\nLine 1, column 1: error: syntax error" in rejection
+        assert java_file.read_text() == "class A {\n}\n"
+
+        assert prevalidate_changes("Chart", 1, change("class A { "), agent) is None
+    finally:
+        fake_session.close()
+
+
+def test_prevalidation_applies_the_changes_of_a_file_cumulatively(
+    tmp_path, monkeypatch
+):
+    from autogpt.commands.defects4j import prevalidate_changes
+
+    project = tmp_path / "chart_1_buggy"
+    project.mkdir()
+    java_file = project / "A.java"
+    java_file.write_text("class A {\n}\n// class\n")
+    fake_session = start_fake_server(project)
+    monkeypatch.setitem(lsp_session._sessions, str(project), fake_session)
+    agent = SimpleNamespace(config=SimpleNamespace(workspace_path=tmp_path))
+
+    # Each change compiles on its own, but not together
+    changes = [
+        {
+            "file_name": str(java_file),
+            "modifications": [{"line_number": 1, "modified_line": "klass A {"}],
+        },
+        {
+            "file_name": str(java_file),
+            "modifications": [{"line_number": 3, "modified_line": "// klass"}],
+        },
+    ]
+    try:
+        assert prevalidate_changes("Chart", 1, changes[:1], agent) is None
+        assert prevalidate_changes("Chart", 1, changes[1:], agent) is None
+        assert "does not compile" in prevalidate_changes("Chart", 1, changes, agent)
+    finally:
+        fake_session.close()
@@ -0,0 +1,90 @@
+import json
+import time
+
+import openai
+import pytest
+from openai.error import RateLimitError
+
+from autogpt.llm.cache import LLMCache
+from autogpt.llm.mock_server import (
+    DEFAULT_REPLY,
+    MockLLM,
+    MockLLMServer,
+    load_recorded_responses,
+)
+
+
+def chat(server, content, model="gpt-3.5-turbo"):
+    return openai.ChatCompletion.create(
+        model=model,
+        messages=[{"role": "user", "content": content}],
+        api_key="sk-mock",
+        api_base=server.api_base,
+    )
+
+
+def test_scripted_replies():
+    script = ["first", "second", {"match": "mutants", "content": "[]"}]
+    with MockLLMServer(MockLLM(script=script)) as server:
+        replies = [chat(server, "next").choices[0].message["content"] for _ in range(3)]
+        assert replies == ["first", "second", "first"]
+        response = chat(server, "give me mutants")
+        assert response.choices[0].message["content"] == "[]"
+        assert response.usage.total_tokens > 0
+        assert [
+            m["id"]
+            for m in openai.Model.list(api_key="sk-mock", api_base=server.api_base)[
+                "data"
+            ]
+        ]
+
+
+def test_default_reply_and_latency():
+    with MockLLMServer(MockLLM(latency=0.2)) as server:
+        start = time.perf_counter()
+        assert chat(server, "hi").choices[0].message["content"] == DEFAULT_REPLY
+        assert time.perf_counter() - start >= 0.2
+
+
+def test_default_reply_runs_the_tests_of_the_bug():
+    goal = 'Locate the Bug: ... the bug within the project "Gson" and bug index "15".'
+    with MockLLMServer() as server:
+        command = json.loads(chat(server, goal).choices[0].message["content"])[
+            "command"
+        ]
+    assert command == {
+        "name": "run_tests",
+        "args": {"project_name": "Gson", "bug_index": "15"},
+    }
+
+
+def test_recorded_responses_are_replayed_in_order(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    cache = LLMCache("record", path)
+    messages = [{"role": "user", "content": "fix the bug"}]
+    for content in ("patch 1", "patch 2"):
+        cache.fetch(
+            {"messages": messages, "model": "gpt-4", "temperature": 0},
+            lambda: {
+                "model": "gpt-4",
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+            },
+        )
+    cache.close()
+
+    with MockLLMServer(MockLLM(recorded=load_recorded_responses(path))) as server:
+        replies = [
+            chat(server, "fix the bug", "gpt-4").choices[0].message["content"]
+            for _ in range(3)
+        ]
+        assert replies == ["patch 1", "patch 2", "patch 2"]
+        assert (
+            chat(server, "something else", "gpt-4").choices[0].message["content"]
+            == DEFAULT_REPLY
+        )
+
+
+def test_rate_limit_errors():
+    with MockLLMServer(MockLLM(rate_limit_rate=1)) as server:
+        with pytest.raises(RateLimitError):
+            chat(server, "hi")
@@ -0,0 +1,77 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from autogpt.commands.parse_service import (
+    ParseServiceError,
+    drop_parse_service,
+    get_parse_service,
+    handle_request,
+    serve,
+)
+
+SOURCE = """class A {
+    int f() { return 1; }
+    int f(int x) {
+        return x;
+    }
+    interface I { void g(); }
+}
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def test_handle_request():
+    assert handle_request(
+        {"op": "method_spans", "source": SOURCE, "method_name": "f"}
+    ) == [
+        (2, 2),
+        (3, 5),
+    ]
+    assert handle_request({"op": "classes_and_methods", "source": SOURCE}) == {
+        "A": ["f", "f"]
+    }
+    assert handle_request({"op": "parse", "source": SOURCE})["mode"] == "SLL"
+
+
+def test_client_round_trip(tmp_path, monkeypatch):
+    address = "localhost:{}".format(free_port())
+    monkeypatch.setenv("JAVA_PARSE_SERVICE_AUTHKEY", "test-key")
+    threading.Thread(target=serve, args=(address,), daemon=True).start()
+    monkeypatch.setenv("JAVA_PARSE_SERVICE", address)
+
+    source_file = tmp_path / "A.java"
+    source_file.write_text(SOURCE)
+    for _ in range(50):
+        client = get_parse_service()
+        if client is not None:
+            break
+        time.sleep(0.05)
+
+    try:
+        assert client.method_spans(str(source_file), "f") == [(2, 2), (3, 5)]
+        assert client.classes_and_methods(SOURCE) == {"A": ["f", "f"]}
+        with pytest.raises(ParseServiceError):
+            client.request("unknown", source=SOURCE)
+    finally:
+        drop_parse_service()
+
+
+def test_no_service_configured(monkeypatch):
+    monkeypatch.delenv("JAVA_PARSE_SERVICE", raising=False)
+    assert get_parse_service() is None
+
+
+def test_no_authkey_configured(monkeypatch):
+    monkeypatch.delenv("JAVA_PARSE_SERVICE_AUTHKEY", raising=False)
+    with pytest.raises(ParseServiceError):
+        serve("localhost:{}".format(free_port()))
+    monkeypatch.setenv("JAVA_PARSE_SERVICE", "localhost:{}".format(free_port()))
+    assert get_parse_service() is None
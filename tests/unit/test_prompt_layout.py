@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from autogpt.agents.base import CONTEXT_PROMPT_END, BaseAgent
+from autogpt.agents.context_packer import ContextPacker, ContextSection
+
+
+def make_agent():
+    agent = SimpleNamespace(
+        context_packer=ContextPacker(lambda text: len(text.split())),
+        context_log=[],
+        logged_entries={},
+        searches=[],
+        hypothesises=[],
+    )
+    agent.construct_context_sections = lambda: [
+        ContextSection("bug report", "## Bug:\n", ["the test fails\n"], priority=100),
+        ContextSection(
+            "hypothesis", "## Hypothesis:\n", list(agent.hypothesises), priority=90
+        ),
+        ContextSection("extracted methods", "## Methods:\n", [], priority=60),
+        ContextSection("suggested fixes", "## Fixes:\n", [], priority=70),
+        ContextSection(
+            "search queries", "## Searches:\n", list(agent.searches), priority=40
+        ),
+        ContextSection("similar calls", "## Calls:\n", [], priority=50),
+    ]
+    return agent
+
+
+def construct(agent, cycle_instruction, budget=10_000):
+    return BaseAgent.construct_prefix_stable_messages(
+        agent, "## Goals\n", cycle_instruction, budget
+    )
+
+
+def test_earlier_messages_stay_a_prefix():
+    agent = make_agent()
+    agent.searches.append("search one\n")
+    first = construct(agent, "You have 39 commands left.")
+
+    agent.searches.append("search two\n")
+    agent.hypothesises.append("off by one\n")
+    second = construct(agent, "You have 38 commands left.")
+
+    assert second[: len(first) - 1] == first[:-1]
+    assert second[-2].content == "## Searches:\nsearch two\n"
+    assert second[-1].content.endswith(
+        CONTEXT_PROMPT_END + "\n\nYou have 38 commands left."
+    )
+    assert "off by one" in second[-1].content
+
+
+def test_cycles_without_new_entries_add_no_message():
+    agent = make_agent()
+    agent.searches.append("search one\n")
+    first = construct(agent, "a")
+    second = construct(agent, "b")
+    assert len(first) == len(second) == 3
+
+
+def test_log_is_compacted_when_it_outgrows_the_budget():
+    agent = make_agent()
+    for i in range(20):
+        agent.searches.append(" ".join(["result"] * 20) + " {}\n".format(i))
+        messages = construct(agent, "go", budget=300)
+    assert len(agent.context_log) < 20
+    total = sum(agent.context_packer.tokens(m.content) for m in messages)
+    assert total <= 300
+
+
+def test_prefix_stays_stable_for_several_cycles_after_a_compaction():
+    agent = make_agent()
+    previous, broken = None, []
+    for i in range(30):
+        agent.searches.append(" ".join(["result"] * 20) + " {}\n".format(i))
+        messages = construct(agent, "go", budget=300)
+        if previous is not None and messages[: len(previous) - 1] != previous[:-1]:
+            broken.append(i)
+        previous = messages
+    assert broken
+    assert all(later - earlier >= 3 for earlier, later in zip(broken, broken[1:]))
@@ -0,0 +1,74 @@
+import os
+
+from autogpt.agents.context_store import ContextStore
+from autogpt.agents.read_ranges import FileRanges, parse_read_lines, resolve_source_file
+from autogpt.commands.file_view import get_file_view
+from autogpt.llm.base import Message
+
+
+def read_output(start, end, text="code"):
+    return "".join("Line {}:{} {}\n".format(i, text, i) for i in range(start, end + 1))
+
+
+def test_parse_read_lines():
+    assert parse_read_lines("Line 3:a\nLine 4:  b\n") == {3: "a\n", 4: "  b\n"}
+    assert parse_read_lines("The filepath A.java does not exist.") == {}
+
+
+def test_overlapping_and_adjacent_ranges_are_merged():
+    ranges = FileRanges()
+    ranges.add(100, 150, parse_read_lines(read_output(100, 150)))
+    ranges.add(120, 180, parse_read_lines(read_output(120, 180)))
+    ranges.add(181, 190, parse_read_lines(read_output(181, 190)))
+    ranges.add(10, 20, parse_read_lines(read_output(10, 20)))
+
+    assert list(ranges) == [(10, 20), (100, 190)]
+    assert ranges[(100, 190)] == read_output(100, 190)
+    assert ranges[(100, 190)].count("Line 130:") == 1
+
+
+def test_lines_are_refreshed_when_the_file_changes(tmp_path):
+    source = tmp_path / "A.java"
+    source.write_text("class A {\n  int x;\n}\n")
+    ranges = FileRanges()
+    ranges.add(1, 2, parse_read_lines("Line 1:class A {\nLine 2:  int x;\n"))
+
+    ranges.refresh(get_file_view(str(source)))
+    assert ranges[(1, 2)] == "Line 1:class A {\nLine 2:  int x;\n"
+
+    source.write_text("class A {\n  long x;\n}\n")
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    ranges.refresh(get_file_view(str(source)))
+    assert ranges[(1, 2)] == "Line 1:class A {\nLine 2:  long x;\n"
+
+
+def test_store_merges_reads_of_the_same_file(tmp_path):
+    (tmp_path / "org" / "foo").mkdir(parents=True)
+    (tmp_path / "org" / "foo" / "A.java").write_text(
+        "".join("l{}\n".format(i) for i in range(1, 11))
+    )
+    store = ContextStore()
+    for start, end in [(1, 4), (3, 6)]:
+        args = {
+            "project_name": "Chart",
+            "bug_index": 1,
+            "filepath": "org.foo.A.java",
+            "startline": start,
+            "endline": end,
+        }
+        store.append(
+            Message(
+                "assistant",
+                str({"thoughts": "", "command": {"name": "read_range", "args": args}}),
+            )
+        )
+        store.append(Message("user", read_output(start, end)))
+
+    assert list(store.read_files["org.foo.A.java"]) == [(1, 6)]
+    store.refresh_read_files(
+        lambda filepath: resolve_source_file(str(tmp_path), filepath)
+    )
+    assert store.read_files["org.foo.A.java"][(1, 6)] == "".join(
+        "Line {}:l{}\n".format(i, i) for i in range(1, 7)
+    )
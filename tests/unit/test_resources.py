@@ -0,0 +1,78 @@
+import json
+import os
+from pathlib import Path
+
+from autogpt.config.resources import PROJECT_ROOT, ResourceBundle, get_resources
+
+
+def test_resources_are_resolved_from_the_project_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    resources = get_resources()
+    assert "read_range" in resources.commands_interface
+    assert "collect information to understand the bug" in resources.commands_by_state
+    assert resources.resolve("hyperparams.json") == PROJECT_ROOT / "hyperparams.json"
+    assert "commands_limit" in resources.load_json("hyperparams.json")
+
+
+def test_resources_are_reloaded_when_modified(tmp_path):
+    interface = tmp_path / "commands_interface.json"
+    interface.write_text(json.dumps({"read_range": ["filepath"]}))
+    resources = ResourceBundle(tmp_path)
+    resources.preload()
+    first = resources.commands_interface
+    assert first == {"read_range": ["filepath"]}
+    assert resources.commands_interface is first
+
+    interface.write_text(json.dumps({"write_fix": ["changes_dicts"]}))
+    stat = interface.stat()
+    os.utime(interface, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert resources.commands_interface == {"write_fix": ["changes_dicts"]}
+
+
+def test_experiment_outputs_are_resolved_from_the_project_root(tmp_path, monkeypatch):
+    (tmp_path / "experimental_setups").mkdir()
+    (tmp_path / "experimental_setups" / "experiments_list.txt").write_text(
+        "experiment_1\nexperiment_2\n"
+    )
+    monkeypatch.chdir(tmp_path.parent)
+    resources = ResourceBundle(tmp_path)
+    assert resources.experiment_dir == tmp_path / "experimental_setups" / "experiment_2"
+
+
+def test_user_paths_prefer_existing_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "my_experiment.json").write_text("{}")
+    resources = ResourceBundle()
+    assert resources.resolve("my_experiment.json") == Path("my_experiment.json")
+    assert resources.resolve(tmp_path / "x.json") == tmp_path / "x.json"
+
+
+def test_agents_see_edited_states(tmp_path, monkeypatch):
+    from autogpt.agents.base import BaseAgent
+    from autogpt.config import resources
+
+    class StubAgent:
+        cmds_by_state = BaseAgent.cmds_by_state
+        descriptions = BaseAgent.descriptions
+        update_prompt_state = BaseAgent.update_prompt_state
+
+    by_state = tmp_path / "commands_by_state.json"
+    by_state.write_text(json.dumps({"fix": "write_fix"}))
+    (tmp_path / "states_description.json").write_text(
+        json.dumps({"fix": "Fix the bug"})
+    )
+    monkeypatch.setattr(resources, "_bundle", ResourceBundle(tmp_path))
+
+    agent = StubAgent()
+    agent.prompt_dictionary = {"commands": [None, None, None]}
+    agent.update_prompt_state("fix")
+    assert agent.prompt_dictionary == {
+        "commands": [None, None, "write_fix"],
+        "current state": "Fix the bug",
+    }
+
+    by_state.write_text(json.dumps({"fix": "write_fix, run_tests"}))
+    stat = by_state.stat()
+    os.utime(by_state, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    agent.update_prompt_state("fix")
+    assert agent.prompt_dictionary["commands"][2] == "write_fix, run_tests"
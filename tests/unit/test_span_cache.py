@@ -0,0 +1,84 @@
+from autogpt.commands.java_extractor import extract_declarations
+from autogpt.commands.span_cache import LineEdit, MethodSpanCache, file_signature
+
+SOURCE = """class A {
+    int f() {
+        return 1;
+    }
+
+    void g() {
+        Runnable r = new Runnable() {
+            public void run() {
+            }
+        };
+    }
+
+    int h() {
+        return 3;
+    }
+}
+"""
+
+
+def spans(methods):
+    return [(m.name, m.start_line, m.end_line) for m in methods]
+
+
+def test_edit_inside_a_method_rescans_only_that_method(tmp_path):
+    source_file = tmp_path / "A.java"
+    source_file.write_text(SOURCE)
+    cache = MethodSpanCache()
+    cache.methods(str(source_file))
+
+    lines = SOURCE.splitlines(keepends=True)
+    lines[8:8] = ["                int x = 0;\n", "                x++;\n"]
+    before = file_signature(str(source_file))
+    source_file.write_text("".join(lines))
+    rescanned = cache.apply_patch(str(source_file), [LineEdit(9, 8, 2)], before)
+
+    assert spans(rescanned) == [("g", 6, 13), ("run", 8, 11)]
+    _, expected = extract_declarations("".join(lines))
+    assert spans(cache.methods(str(source_file))) == spans(expected)
+    assert (cache.full_extractions, cache.incremental_updates) == (1, 1)
+
+
+def test_edits_outside_methods_fall_back_to_full_extraction(tmp_path):
+    source_file = tmp_path / "A.java"
+    source_file.write_text(SOURCE)
+    cache = MethodSpanCache()
+    cache.methods(str(source_file))
+
+    lines = SOURCE.splitlines(keepends=True)
+    lines[12:12] = ["    int added() { return 0; }\n"]
+    before = file_signature(str(source_file))
+    source_file.write_text("".join(lines))
+    assert cache.apply_patch(str(source_file), [LineEdit(13, 12, 1)], before) is None
+    assert ("added", 13, 13) in spans(cache.methods(str(source_file)))
+    assert cache.full_extractions == 2
+
+
+def test_renamed_method_is_not_patched_incrementally(tmp_path):
+    source_file = tmp_path / "A.java"
+    source_file.write_text(SOURCE)
+    cache = MethodSpanCache()
+    cache.methods(str(source_file))
+
+    before = file_signature(str(source_file))
+    source_file.write_text(SOURCE.replace("int h()", "int k()"))
+    assert cache.apply_patch(str(source_file), [LineEdit(14, 14, 1)], before) is None
+    assert [m.name for m in cache.find(str(source_file), "k")] == ["k"]
+
+
+def test_spans_of_a_reverted_file_are_not_patched(tmp_path):
+    source_file = tmp_path / "A.java"
+    source_file.write_text(SOURCE.replace("return 3;", "return 3; // patched"))
+    cache = MethodSpanCache()
+    cache.methods(str(source_file))
+
+    # A checkout restores the original file behind the cache's back
+    source_file.write_text(SOURCE)
+    before = file_signature(str(source_file))
+    source_file.write_text(SOURCE.replace("return 1;", "return 2;"))
+    assert cache.apply_patch(str(source_file), [LineEdit(3, 3, 1)], before) is None
+    assert spans(cache.find(str(source_file), "f")) == [("f", 2, 4)]
+    assert cache.full_extractions == 2
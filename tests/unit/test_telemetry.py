@@ -0,0 +1,67 @@
+import pytest
+
+from autogpt.logs.telemetry import (
+    Telemetry,
+    percentile,
+    read_events,
+    summarize_events,
+    telemetry_path,
+)
+
+
+def test_events_are_appended_with_the_context(tmp_path):
+    telemetry = Telemetry()
+    path = telemetry_path(tmp_path, "Chart", "1")
+    telemetry.open(path, project="Chart", bug="1", cycle=0)
+
+    telemetry.set_context(cycle=3)
+    with telemetry.span("subprocess", "test") as span:
+        span["returncode"] = 1
+    with pytest.raises(RuntimeError):
+        with telemetry.span("command", "write_fix"):
+            raise RuntimeError("boom")
+
+    events = read_events(path)
+    assert [(e["kind"], e["name"], e["status"]) for e in events] == [
+        ("subprocess", "test", "ok"),
+        ("command", "write_fix", "error"),
+    ]
+    assert events[0]["project"] == "Chart" and events[0]["cycle"] == 3
+    assert events[0]["returncode"] == 1
+
+
+def test_truncated_lines_are_skipped(tmp_path):
+    path = tmp_path / "telemetry.jsonl"
+    path.write_text('{"kind": "cycle", "name": "cycle", "seconds": 1}\n{"kind": "cy')
+    assert len(read_events(path)) == 1
+
+
+def test_percentile_uses_the_nearest_rank():
+    values = list(range(1, 21))
+    assert percentile(values, 50) == 10
+    assert percentile(values, 95) == 19
+    assert percentile([4.0], 95) == 4.0
+
+
+def test_summary_per_project_and_key():
+    telemetry = Telemetry()
+    telemetry.set_context(project="Lang", bug="1")
+    for seconds in (1.0, 2.0, 3.0):
+        telemetry.record(
+            "llm",
+            "gpt-3.5-turbo",
+            seconds,
+            prompt_tokens=100,
+            completion_tokens=10,
+            cost=0.01,
+        )
+    telemetry.record("cycle", "cycle", 5.0)
+    telemetry.set_context(project="Math")
+    telemetry.record("subprocess", "checkout", 2.0, status="error")
+
+    summary = summarize_events(list(telemetry.events))
+    llm = summary["Lang"]["llm:gpt-3.5-turbo"]
+    assert (llm["count"], llm["p50"], llm["p95"], llm["tokens"]) == (3, 2.0, 3.0, 330)
+    assert llm["cost"] == pytest.approx(0.03)
+    assert summary["Lang"]["cycle"]["total"] == 5.0
+    assert summary["Math"]["subprocess:checkout"]["errors"] == 1
@@ -1,7 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from autogpt.llm.base import Message
-from autogpt.llm.utils import count_message_tokens, count_string_tokens
+from autogpt.llm import utils
+from autogpt.llm.base import ChatSequence, Message
+from autogpt.llm.utils import (
+    REPLY_PRIMING_TOKENS,
+    count_message_tokens,
+    count_string_tokens,
+    count_tokens,
+)
 
 
 def test_count_message_tokens():
@@ -53,3 +61,56 @@ def test_count_string_tokens_gpt_4():
 
     string = "Hello, world!"
     assert count_string_tokens(string, model_name="gpt-4-0314") == 4
+
+
+class FakeEncoding:
+    name = "fake"
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return text.split()
+
+
+def test_token_counts_are_cached_by_content():
+    encoding = FakeEncoding()
+    assert count_tokens("a b c", encoding) == 3
+    assert count_tokens("a b" + " c", encoding) == 3
+    assert count_tokens("a b", encoding) == 2
+    assert encoding.encoded == ["a b c", "a b"]
+
+
+def test_token_counts_are_cached_across_threads(monkeypatch):
+    from autogpt.llm.utils import token_counter
+
+    monkeypatch.setattr(token_counter, "TOKEN_COUNT_CACHE_SIZE", 8)
+    encoding = FakeEncoding()
+
+    def count(offset):
+        return [count_tokens("w " * (i % 16 + offset), encoding) for i in range(500)]
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(count, range(4)))
+    assert results[0][:16] == list(range(16))
+    assert len(token_counter._token_counts) <= 8
+
+def test_chat_sequence_counts_only_changed_messages(monkeypatch):
+    counted = []
+
+    def fake_count(message, model):
+        counted.append(message.content)
+        return len(message.content.split())
+
+    monkeypatch.setattr(utils, "count_single_message_tokens", fake_count)
+    prompt = ChatSequence.for_model("gpt-3.5-turbo", [Message("system", "you are"), Message("user", "fix it")])
+    assert prompt.token_length == 4 + REPLY_PRIMING_TOKENS
+
+    prompt.append(Message("assistant", "on it now"))
+    assert prompt.token_length == 7 + REPLY_PRIMING_TOKENS
+    assert counted == ["you are", "fix it", "on it now"]
+
+    prompt[1].content = "fix"
+    assert prompt.token_length == 6 + REPLY_PRIMING_TOKENS
+    assert counted[3:] == ["fix", "on it now"]
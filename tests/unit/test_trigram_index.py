@@ -0,0 +1,77 @@
+import pytest
+
+from autogpt.commands.trigram_index import TrigramIndex, required_literals
+
+FILE_A = """class A {
+    static final String NAME = "node.type";
+    int count;
+    void f() { count = count + 1; }
+}
+"""
+
+FILE_B = """class B {
+    void g(A a) { System.out.println(a.count); }
+}
+"""
+
+
+@pytest.fixture
+def index():
+    index = TrigramIndex()
+    index.add("A.java", FILE_A)
+    index.add("B.java", FILE_B)
+    return index
+
+
+def test_literal_search(index):
+    hits = index.search('"node.type"')
+    assert [(h.file_path, h.line, h.text) for h in hits] == [
+        ("A.java", 2, 'static final String NAME = "node.type";')
+    ]
+    assert [(h.file_path, h.line) for h in index.search("count")] == [
+        ("A.java", 3),
+        ("A.java", 4),
+        ("B.java", 2),
+    ]
+    assert index.candidates(["println"]) == [1]
+    assert index.search("missing_literal") == []
+
+
+def test_regex_search(index):
+    assert [
+        (h.file_path, h.line) for h in index.search(r"count\s*=", is_regex=True)
+    ] == [("A.java", 4)]
+    assert [h.line for h in index.search(r"^\s+void \w+\(", is_regex=True)] == [4, 2]
+    assert len(index.search("co.nt", is_regex=True, max_hits=2)) == 2
+
+
+def test_required_literals():
+    assert required_literals(r"count\s*=") == ["count"]
+    assert required_literals(r"getType\(\)\.equals") == ["getType().equals"]
+    assert required_literals(r"foos?bar") == ["foo", "bar"]
+    assert required_literals(r"ab{2,3}cde") == ["cde"]
+    assert required_literals(r"(abc)?def") == ["def"]
+    assert required_literals("abc|def") == []
+
+
+def test_required_literals_skip_character_codes():
+    assert required_literals(r"\x41bc") == []
+    assert required_literals(r"\x41bcdef") == ["bcdef"]
+    assert required_literals(r"\u0041bcd") == ["bcd"]
+    assert required_literals(r"\N{LATIN SMALL LETTER A}bcd") == ["bcd"]
+    assert required_literals(r"\0123abc") == ["3abc"]
+    assert required_literals(r"(ab)\1cde") == ["cde"]
+
+
+def test_required_literals_skip_whole_character_classes():
+    assert required_literals(r"[a\]bcd]xyz") == ["xyz"]
+    assert required_literals(r"[a\]bcd]xy") == []
+    assert required_literals(r"[]abcd]xyz") == ["xyz"]
+    assert required_literals(r"[^]abcd]xyz") == ["xyz"]
+
+
+def test_hex_escapes_do_not_prune_matches(index):
+    # \x53ystem is "System": its hex digits must not become a required literal
+    assert [
+        (h.file_path, h.line) for h in index.search(r"\x53ystem\.out", is_regex=True)
+    ] == [("B.java", 2)]